@@ -0,0 +1,149 @@
+"""
+toc_results.xlsx 写入基准：对比写出耗时、进程峰值内存（RSS）与文件大小。
+
+  - pandas    : 旧实现，rows 先全部放进 list，再 pd.DataFrame(rows).to_excel
+  - openpyxl  : utils.excel.write_rows_to_xlsx(backend="openpyxl")，openpyxl write_only 流式写
+  - xlsxwriter: utils.excel.write_rows_to_xlsx(backend="xlsxwriter")，constant_memory 流式写（需安装 xlsxwriter）
+
+行由生成器按 DEFAULT_COLUMNS 合成（流式方法不物化全部行）。每个方法在独立子进程里跑。用法（在仓库根目录）：
+  python -m benchmarks.bench_excel_write --rows 100000 1000000 --out bench_excel_write.json
+  python -m benchmarks.bench_excel_write --rows 1000000 --methods openpyxl xlsxwriter
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.bench_json_load import _peak_rss_mb  # noqa: E402
+
+METHODS = ("pandas", "openpyxl", "xlsxwriter")
+
+
+def iter_toc_rows(n: int, seed: int = 0) -> Iterator[Dict[str, Any]]:
+    """合成 n 行与 main.export_toc_xlsx 相同结构的目录行（每 200 行换一个“文档”）"""
+    rnd = random.Random(seed)
+    words = ["范围", "规范性引用文件", "术语和定义", "一般要求", "施工准备", "质量检验", "安全", "附录"]
+    for i in range(n):
+        doc = i // 200
+        depth = rnd.randint(1, 4)
+        clause_id = ".".join(str(rnd.randint(1, 12)) for _ in range(depth))
+        yield {
+            "order_index": i % 200 + 1,
+            "std_no": f"DB37/T {4000 + doc}-2025_道路工程施工技术规范",
+            "std_title": "道路工程施工技术规范",
+            "clause_id": clause_id,
+            "clause_text": "".join(rnd.choice(words) for _ in range(rnd.randint(1, 6))),
+            "level": depth,
+            "parent_id": clause_id.rsplit(".", 1)[0] if depth > 1 else "",
+            "model_json_path": f"/data/out/doc_{doc}/unzipped/{doc}_model.json",
+            "image": f"图{doc}_1.jpg;表{doc}_2.jpg",
+        }
+
+
+def _run_method(method: str, n_rows: int, out_path: str) -> Dict[str, Any]:
+    """子进程内执行：返回耗时、峰值 RSS、文件大小"""
+    from toc_extract.export_excel import DEFAULT_COLUMNS
+    from utils.excel import write_rows_to_xlsx
+
+    base_rss = _peak_rss_mb()
+    t0 = time.perf_counter()
+    if method == "pandas":
+        import pandas as pd
+
+        rows = list(iter_toc_rows(n_rows))
+        df = pd.DataFrame(rows)[list(DEFAULT_COLUMNS)]
+        df.to_excel(out_path, index=False)
+    elif method in ("openpyxl", "xlsxwriter"):
+        write_rows_to_xlsx(iter_toc_rows(n_rows), out_path, DEFAULT_COLUMNS, backend=method)
+    else:
+        raise ValueError(f"未知方法：{method}")
+    seconds = time.perf_counter() - t0
+    return {
+        "method": method,
+        "rows": n_rows,
+        "seconds": round(seconds, 3),
+        "rows_per_sec": round(n_rows / seconds) if seconds else None,
+        "file_mb": round(os.path.getsize(out_path) / 1024 ** 2, 1),
+        "base_rss_mb": base_rss,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def _available(method: str) -> bool:
+    module = {"pandas": "pandas", "openpyxl": "openpyxl", "xlsxwriter": "xlsxwriter"}[method]
+    try:
+        __import__(module)
+        return True
+    except ImportError:
+        return False
+
+
+def _spawn(method: str, n_rows: int, out_path: str) -> Dict[str, Any]:
+    out = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_excel_write", "--worker", method, str(n_rows), out_path],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def run_benchmark(sizes: List[int], repeat: int = 1, methods=METHODS, tmp_dir: str = "") -> List[Dict[str, Any]]:
+    results: List[Dict[str, Any]] = []
+    for n_rows in sizes:
+        for method in methods:
+            if not _available(method):
+                print(f"{n_rows:>9} rows  {method:<10} 跳过（未安装）")
+                continue
+            out_path = os.path.join(tmp_dir, f"toc_{method}_{n_rows}.xlsx")
+            runs = [_spawn(method, n_rows, out_path) for _ in range(repeat)]
+            best = min(runs, key=lambda r: r["seconds"])
+            best["repeat"] = repeat
+            best["peak_rss_mb"] = max((r["peak_rss_mb"] or 0) for r in runs) or None
+            results.append(best)
+            os.remove(out_path)
+            print(
+                f"{n_rows:>9} rows  {method:<10} {best['seconds']:>8.2f} s  "
+                f"peak RSS {best['peak_rss_mb']} MB  file {best['file_mb']} MB"
+            )
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="toc_results.xlsx 写入耗时 / 峰值内存基准")
+    ap.add_argument("--worker", nargs=3, metavar=("METHOD", "ROWS", "OUT"), help=argparse.SUPPRESS)
+    ap.add_argument("--rows", nargs="*", type=int, default=[100_000, 1_000_000], help="行数（Excel 上限 1048575）")
+    ap.add_argument("--repeat", type=int, default=1)
+    ap.add_argument("--methods", nargs="*", default=list(METHODS), choices=METHODS)
+    ap.add_argument("--out", default="", help="结果写入 JSON 文件")
+    args = ap.parse_args(argv)
+
+    if args.worker:
+        method, n_rows, out_path = args.worker
+        print(json.dumps(_run_method(method, int(n_rows), out_path)))
+        return 0
+
+    with tempfile.TemporaryDirectory(prefix="bench_excel_") as tmp:
+        results = run_benchmark(args.rows, repeat=args.repeat, methods=args.methods, tmp_dir=tmp)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入：{args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,166 @@
+"""
+model.json 读取基准：对比解析耗时与进程峰值内存（RSS）。
+
+  - stdlib   : 旧实现，open(..., encoding="utf-8") + json.load，再 extract_titles_by_pattern
+  - load_json: utils.io.load_json（orjson + 大文件 mmap；无 orjson 时为标准库），再 extract_titles_by_pattern
+  - stream   : toc_extract.model_parser.extract_titles_from_model_json，逐页逐块流式抽取
+
+每个方法在独立子进程里跑，峰值 RSS 互不影响。用法（在仓库根目录）：
+  python -m benchmarks.bench_json_load --sizes 20 100 --repeat 3 --out bench_json_load.json
+  python -m benchmarks.bench_json_load --files path/to/model.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+METHODS = ("stdlib", "load_json", "stream")
+
+
+def make_model_json(path: str, target_mb: float, seed: int = 0) -> str:
+    """生成近似 MinerU model.json 结构（顶层 list[page]，page 为 list[block]）的合成文件"""
+    rnd = random.Random(seed)
+    target = int(target_mb * 1024 * 1024)
+    words = ["范围", "规范性引用文件", "术语和定义", "一般要求", "施工准备", "质量检验", "安全", "附录"]
+    written = 0
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("[")
+        page_no = 0
+        while written < target:
+            blocks = []
+            for i in range(rnd.randint(20, 60)):
+                if rnd.random() < 0.1:
+                    depth = rnd.randint(1, 4)
+                    label = ".".join(str(rnd.randint(1, 12)) for _ in range(depth))
+                    content = f"{label} {rnd.choice(words)}"
+                else:
+                    content = "".join(rnd.choice(words) for _ in range(rnd.randint(5, 40)))
+                blocks.append(
+                    {
+                        "type": rnd.choice(["text", "title", "table", "image"]),
+                        "bbox": [rnd.randint(0, 600) for _ in range(4)],
+                        "angle": 0,
+                        "score": round(rnd.random(), 4),
+                        "content": content,
+                    }
+                )
+            chunk = ("," if page_no else "") + json.dumps(blocks, ensure_ascii=False)
+            f.write(chunk)
+            written += len(chunk.encode("utf-8"))
+            page_no += 1
+        f.write("]")
+    return path
+
+
+def _peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux 单位为 KB，macOS 为字节
+        return round(peak / 1024 / (1024 if sys.platform == "darwin" else 1), 1)
+    except ImportError:
+        pass
+    try:
+        import psutil
+
+        return round(psutil.Process().memory_info().peak_wset / 1024 ** 2, 1)
+    except Exception:
+        return None
+
+
+def _run_method(method: str, path: str) -> Dict[str, Any]:
+    """子进程内执行：返回耗时、抽到的标题数、峰值 RSS"""
+    from toc_extract.model_parser import extract_titles_by_pattern, extract_titles_from_model_json
+    from utils.io import JSON_BACKEND, load_json
+
+    base_rss = _peak_rss_mb()
+    t0 = time.perf_counter()
+    if method == "stdlib":
+        with open(path, "r", encoding="utf-8") as f:
+            items = extract_titles_by_pattern(json.load(f))
+    elif method == "load_json":
+        items = extract_titles_by_pattern(load_json(path, default=None))
+    elif method == "stream":
+        items = extract_titles_from_model_json(path) or []
+    else:
+        raise ValueError(f"未知方法：{method}")
+    seconds = time.perf_counter() - t0
+    return {
+        "method": method,
+        "backend": JSON_BACKEND if method == "load_json" else "json",
+        "seconds": round(seconds, 4),
+        "titles": len(items),
+        "base_rss_mb": base_rss,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def _spawn(method: str, path: str) -> Dict[str, Any]:
+    out = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_json_load", "--worker", method, path],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def run_benchmark(files: List[str], repeat: int = 3, methods=METHODS) -> List[Dict[str, Any]]:
+    results: List[Dict[str, Any]] = []
+    for path in files:
+        size_mb = round(os.path.getsize(path) / 1024 ** 2, 1)
+        for method in methods:
+            runs = [_spawn(method, path) for _ in range(repeat)]
+            best = min(runs, key=lambda r: r["seconds"])
+            best.update({"file": path, "size_mb": size_mb, "repeat": repeat})
+            best["peak_rss_mb"] = max((r["peak_rss_mb"] or 0) for r in runs) or None
+            results.append(best)
+            print(
+                f"{os.path.basename(path):<24} {size_mb:>8.1f} MB  {method:<10} "
+                f"{best['seconds']:>8.3f} s  peak RSS {best['peak_rss_mb']} MB  titles={best['titles']}"
+            )
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="model.json 解析耗时 / 峰值内存基准")
+    ap.add_argument("--worker", nargs=2, metavar=("METHOD", "PATH"), help=argparse.SUPPRESS)
+    ap.add_argument("--files", nargs="*", default=[], help="已有的 model.json 文件")
+    ap.add_argument("--sizes", nargs="*", type=float, default=[20, 100], help="合成 model.json 大小（MB）")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--methods", nargs="*", default=list(METHODS), choices=METHODS)
+    ap.add_argument("--out", default="", help="结果写入 JSON 文件")
+    args = ap.parse_args(argv)
+
+    if args.worker:
+        print(json.dumps(_run_method(*args.worker)))
+        return 0
+
+    with tempfile.TemporaryDirectory(prefix="bench_json_") as tmp:
+        files = list(args.files)
+        for mb in ([] if args.files else args.sizes):
+            files.append(make_model_json(os.path.join(tmp, f"model_{mb:g}mb.json"), mb))
+        results = run_benchmark(files, repeat=args.repeat, methods=args.methods)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入：{args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,252 @@
+"""
+解析 / 导出函数的微基准：每个用例在独立子进程里跑，记录单次耗时、吞吐与进程峰值内存（RSS）。
+
+  - extract_titles_by_pattern                : model.json（已加载）-> 标题候选
+  - clean_toc_list                           : 标题候选 -> 清洗后的目录
+  - parse_image_title_fields                 : content_list 中全部图/表标题逐个解析
+  - extract_title_and_stdno_from_content_list: content_list（已加载）-> (标题, 标准号)
+  - export_image_rows_with_embedded_images   : image.xlsx 行 -> 嵌图 xlsx（读图、缩放、重压缩、写出）
+
+输入由 benchmarks.synthetic 按页数合成（seed 固定，同样参数每次生成同样的数据），也可用 --dirs 指定真实的解压目录。
+结果（含 git commit、Python 版本等环境信息）写成 JSON；--compare 与之前某次的结果逐项对比，
+耗时变慢超过 --max-regression 时返回码为 1。用法（在仓库根目录）：
+  python -m benchmarks.bench_parsers --pages 50 500 --out bench/$(git rev-parse --short HEAD).json
+  python -m benchmarks.bench_parsers --pages 50 500 --compare bench/abc1234.json
+  python -m benchmarks.bench_parsers --cases parse_image_title_fields clean_toc_list --repeat 5
+"""
+from __future__ import annotations
+
+import argparse
+import glob
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.bench_json_load import _peak_rss_mb  # noqa: E402
+
+CASES = (
+    "extract_titles_by_pattern",
+    "clean_toc_list",
+    "parse_image_title_fields",
+    "extract_title_and_stdno_from_content_list",
+    "export_image_rows_with_embedded_images",
+)
+
+# 便宜的用例循环调用，直到累计耗时不少于该值（同 timeit.autorange 的思路），再取单次平均
+MIN_TIME = 0.2
+
+
+def _find_inputs(data_dir: str) -> Tuple[str, str]:
+    """解压目录 -> (content_list.json 路径, model.json 路径)"""
+    def _one(patterns: List[str]) -> str:
+        for pat in patterns:
+            hits = sorted(glob.glob(os.path.join(data_dir, "**", pat), recursive=True))
+            if hits:
+                return hits[0]
+        raise FileNotFoundError(f"{data_dir} 下没有 {' / '.join(patterns)}")
+
+    return _one(["*content_list.json"]), _one(["*_model.json", "model.json"])
+
+
+def _prepare(case: str, data_dir: str, out_dir: str) -> Tuple[Callable[[], Any], int]:
+    """子进程内：加载输入（不计时），返回 (被测调用, 处理的条目数)"""
+    from pdf_rename.content_list_parser import extract_title_and_stdno_from_content_list
+    from toc_extract.image_excel import export_image_rows_with_embedded_images, parse_image_title_fields
+    from toc_extract.model_parser import clean_toc_list, extract_titles_by_pattern
+    from utils.io import load_json
+
+    cl_path, model_path = _find_inputs(data_dir)
+    if case == "extract_titles_by_pattern":
+        model = load_json(model_path, default=[])
+        return (lambda: extract_titles_by_pattern(model)), sum(len(p) for p in model if isinstance(p, list))
+    if case == "clean_toc_list":
+        candidates = extract_titles_by_pattern(load_json(model_path, default=[]))
+        return (lambda: clean_toc_list(candidates)), len(candidates)
+    if case == "extract_title_and_stdno_from_content_list":
+        content_list = load_json(cl_path, default=[])
+        return (lambda: extract_title_and_stdno_from_content_list(content_list)), len(content_list)
+
+    from benchmarks.synthetic import make_image_rows
+
+    rows = make_image_rows(load_json(cl_path, default=[]), os.path.dirname(cl_path))
+    if case == "parse_image_title_fields":
+        titles = [r["image_title"] for r in rows]
+        return (lambda: [parse_image_title_fields(t) for t in titles]), len(titles)
+    if case == "export_image_rows_with_embedded_images":
+        out_path = os.path.join(out_dir, "image.xlsx")
+        return (lambda: export_image_rows_with_embedded_images(rows, out_path, verbose=False)), len(rows)
+    raise ValueError(f"未知用例：{case}")
+
+
+def _run_case(case: str, data_dir: str, out_dir: str) -> Dict[str, Any]:
+    """子进程内执行：返回单次耗时、循环次数、吞吐、峰值 RSS"""
+    fn, items = _prepare(case, data_dir, out_dir)
+    base_rss = _peak_rss_mb()
+    loops = 0
+    t0 = time.perf_counter()
+    while True:
+        fn()
+        loops += 1
+        elapsed = time.perf_counter() - t0
+        if elapsed >= MIN_TIME:
+            break
+    seconds = elapsed / loops
+    return {
+        "case": case,
+        "items": items,
+        "loops": loops,
+        "seconds": round(seconds, 6),
+        "items_per_sec": round(items / seconds) if seconds else None,
+        "base_rss_mb": base_rss,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def _spawn(case: str, data_dir: str, out_dir: str) -> Dict[str, Any]:
+    out = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_parsers", "--worker", case, data_dir, out_dir],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def run_benchmark(
+    datasets: List[Tuple[str, str]],
+    repeat: int = 3,
+    cases=CASES,
+    tmp_dir: str = "",
+) -> List[Dict[str, Any]]:
+    """
+    【输入】
+      - datasets: [(数据集名, 解压目录)]，名如 "50p" 或目录名
+      - repeat: 每个用例跑几次子进程，取最快的一次（峰值 RSS 取最大）
+
+    【输出】
+      - List[dict]: 每个 (数据集, 用例) 一条
+    """
+    results: List[Dict[str, Any]] = []
+    for name, data_dir in datasets:
+        for case in cases:
+            runs = [_spawn(case, data_dir, tmp_dir) for _ in range(repeat)]
+            best = min(runs, key=lambda r: r["seconds"])
+            best.update({"dataset": name, "repeat": repeat})
+            best["peak_rss_mb"] = max((r["peak_rss_mb"] or 0) for r in runs) or None
+            results.append(best)
+            print(
+                f"{name:<10} {case:<42} {best['seconds'] * 1000:>10.3f} ms  "
+                f"{best['items']:>8} items  peak RSS {best['peak_rss_mb']} MB"
+            )
+    return results
+
+
+def _git(*args: str) -> str:
+    try:
+        out = subprocess.run(["git", *args], cwd=REPO_ROOT, capture_output=True, text=True, timeout=30)
+        return out.stdout.strip() if out.returncode == 0 else ""
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def environment() -> Dict[str, Any]:
+    """结果里附带的环境信息：用于判断两次结果是否可比"""
+    from utils.excel import EXCEL_BACKEND
+    from utils.io import JSON_BACKEND
+
+    return {
+        "commit": _git("rev-parse", "HEAD"),
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "json_backend": JSON_BACKEND,
+        "excel_backend": EXCEL_BACKEND,
+    }
+
+
+def compare(results: List[Dict[str, Any]], baseline: Dict[str, Any], max_regression: float) -> List[str]:
+    """
+    与基线结果逐项（数据集 + 用例）对比耗时，打印比值；返回变慢超过 max_regression（如 0.15 = 15%）的项。
+    """
+    base = {(r["dataset"], r["case"]): r for r in baseline.get("results", [])}
+    env = baseline.get("environment", {})
+    print(f"\n对比基线：commit={env.get('commit', '')[:10]} {env.get('timestamp', '')}")
+    regressions: List[str] = []
+    for r in results:
+        b = base.get((r["dataset"], r["case"]))
+        if b is None or not b.get("seconds"):
+            continue
+        ratio = r["seconds"] / b["seconds"]
+        flag = ""
+        if ratio > 1 + max_regression:
+            flag = "  <-- 变慢"
+            regressions.append(f"{r['dataset']} {r['case']} x{ratio:.2f}")
+        print(
+            f"{r['dataset']:<10} {r['case']:<42} {b['seconds'] * 1000:>10.3f} -> {r['seconds'] * 1000:>10.3f} ms  "
+            f"x{ratio:.2f}  RSS {b.get('peak_rss_mb')} -> {r.get('peak_rss_mb')} MB{flag}"
+        )
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="解析 / 导出函数耗时与峰值内存基准")
+    ap.add_argument("--worker", nargs=3, metavar=("CASE", "DATA_DIR", "OUT_DIR"), help=argparse.SUPPRESS)
+    ap.add_argument("--pages", nargs="*", type=int, default=[50, 500], help="合成文档页数")
+    ap.add_argument("--dirs", nargs="*", default=[], help="已有的 MinerU 解压目录（给出时不合成）")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--cases", nargs="*", default=list(CASES), choices=CASES)
+    ap.add_argument("--out", default="", help="结果写入 JSON 文件")
+    ap.add_argument("--compare", default="", help="与之前 --out 写出的 JSON 对比")
+    ap.add_argument("--max-regression", type=float, default=0.15, help="--compare 时允许的变慢比例")
+    args = ap.parse_args(argv)
+
+    if args.worker:
+        print(json.dumps(_run_case(*args.worker)))
+        return 0
+
+    from benchmarks.synthetic import write_mineru_output
+
+    with tempfile.TemporaryDirectory(prefix="bench_parsers_") as tmp:
+        datasets = [(os.path.basename(os.path.normpath(d)), d) for d in args.dirs]
+        for pages in ([] if args.dirs else args.pages):
+            info = write_mineru_output(os.path.join(tmp, f"{pages}p"), pages, seed=args.seed)
+            print(
+                f"合成 {pages}p：content_list {info['blocks']} 块，model {info['model_blocks']} 块，"
+                f"图片 {info['images']} 张 / {info['image_mb']} MB"
+            )
+            datasets.append((f"{pages}p", os.path.join(tmp, f"{pages}p")))
+        out_dir = os.path.join(tmp, "out")
+        os.makedirs(out_dir)
+        results = run_benchmark(datasets, repeat=args.repeat, cases=args.cases, tmp_dir=out_dir)
+
+    report = {"environment": environment(), "seed": args.seed, "results": results}
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入：{args.out}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.max_regression)
+        if regressions:
+            print(f"变慢超过 {args.max_regression:.0%}：" + "；".join(regressions))
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,203 @@
+"""
+端到端吞吐压测：对本地 MinerU 替身（benchmarks.mineru_stub）跑完整的 main.main 流程
+（上传 -> 轮询 -> 下载 -> 解压 -> 后处理），报告每分钟完成的文档数。
+
+  - 默认在进程内启动替身；--url 指向已启动的替身（或其它兼容服务）时直接使用
+  - 输入为 --docs 个内容各不相同的假 PDF（替身不解析内容，只计上传字节）
+  - --mode serial / batched / pipeline 对应 main 的三种调度方式，并发参数可调
+  - main 的日志写到 --log（默认输出目录下 run.log），终端只打印汇总
+
+用法（在仓库根目录）：
+  python -m benchmarks.load_mineru --docs 40 --mode pipeline --max-in-flight 16 --max-running 8
+  python -m benchmarks.load_mineru --docs 40 --mode batched --batch-size 20 --failure-rate 0.05 --out load.json
+  python -m benchmarks.load_mineru --docs 40 --mode serial --rate-limit-rps 5 --error-rate 0.02
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import dataclasses
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.mineru_stub import MinerUStub, add_stub_arguments, stub_config_from_args  # noqa: E402
+
+MODES = ("serial", "batched", "pipeline")
+
+
+def make_fake_pdfs(pdf_dir: str, n: int, size_kb: int = 256, seed: int = 0) -> List[str]:
+    """n 个内容互不相同的“PDF”（合法的头尾 + 填充），保证 journal / 缓存按内容哈希时各是一个文档"""
+    os.makedirs(pdf_dir, exist_ok=True)
+    paths = []
+    filler = os.urandom(max(0, size_kb * 1024 - 64))
+    for i in range(n):
+        path = os.path.join(pdf_dir, f"doc_{i:05d}.pdf")
+        with open(path, "wb") as f:
+            f.write(b"%PDF-1.7\n% load test " + f"{seed}:{i}".encode() + b"\n")
+            f.write(filler)
+            f.write(b"\n%%EOF\n")
+        paths.append(path)
+    return paths
+
+
+def build_config(args: argparse.Namespace, base_url: str, pdf_dir: str, out_dir: str):
+    from config import Config
+
+    return dataclasses.replace(
+        Config(),
+        mineru_base_url=base_url,
+        input_pdf_dir=pdf_dir,
+        output_root_dir=out_dir,
+        poll_interval_sec=args.poll_interval,
+        poll_max_interval_sec=args.poll_max_interval,
+        task_deadline_sec=args.deadline,
+        result_cache_enabled=False,
+        pipeline_enabled=args.mode == "pipeline",
+        submit_batch_size=args.batch_size if args.mode == "batched" else 1,
+        max_in_flight=args.max_in_flight,
+        upload_workers=args.upload_workers,
+        download_workers=args.download_workers,
+        post_workers=args.post_workers,
+        output_formats=tuple(args.formats.split(",")),
+    )
+
+
+def run_load_test(args: argparse.Namespace, work_dir: str) -> Dict[str, Any]:
+    """
+    【输入】
+      - args: 命令行参数（压测规模、调度方式、替身参数）
+      - work_dir: 放假 PDF 与输出的目录
+
+    【输出】
+      - dict: 耗时、完成/失败数、docs_per_min、替身统计、连接复用统计
+    """
+    import main as app
+    from http_pool import connection_stats
+    from journal import STAGE_DONE, open_journal
+
+    pdf_dir = os.path.join(work_dir, "pdfs")
+    out_dir = os.path.join(work_dir, "out")
+    make_fake_pdfs(pdf_dir, args.docs, args.pdf_kb, seed=args.seed)
+
+    stub: Optional[MinerUStub] = None
+    base_url = args.url
+    if not base_url:
+        stub = MinerUStub(stub_config_from_args(args, token=args.token))
+        base_url = stub.start()
+        print(f"替身已启动：{base_url}")
+
+    cfg = build_config(args, base_url, pdf_dir, out_dir)
+    log_path = args.log or os.path.join(out_dir, "run.log")
+    os.makedirs(os.path.dirname(os.path.abspath(log_path)), exist_ok=True)
+    old_token = os.environ.get(cfg.mineru_token_env)
+    os.environ[cfg.mineru_token_env] = args.token or "stub-token"
+    try:
+        print(f"开始：{args.docs} 个文档，mode={args.mode}，日志 {log_path}")
+        t0 = time.perf_counter()
+        with open(log_path, "w", encoding="utf-8") as log_f, contextlib.redirect_stdout(log_f):
+            app.main(cfg)
+        seconds = time.perf_counter() - t0
+        stub_stats = stub.stats() if stub is not None else _fetch_stats(base_url)
+    finally:
+        if old_token is None:
+            os.environ.pop(cfg.mineru_token_env, None)
+        else:
+            os.environ[cfg.mineru_token_env] = old_token
+        if stub is not None:
+            stub.stop()
+
+    journal = open_journal(cfg)
+    summary = journal.summary() if journal is not None else {}
+    failed = len(journal.failed()) if journal is not None else 0
+    done = summary.get(STAGE_DONE, 0)
+    return {
+        "mode": args.mode,
+        "docs": args.docs,
+        "done": done,
+        "not_done": args.docs - done,
+        "docs_with_errors": failed,
+        "seconds": round(seconds, 2),
+        "docs_per_min": round(done / seconds * 60, 1) if seconds else None,
+        "journal": summary,
+        "config": {
+            "max_in_flight": cfg.max_in_flight,
+            "upload_workers": cfg.upload_workers,
+            "download_workers": cfg.download_workers,
+            "post_workers": cfg.post_workers,
+            "submit_batch_size": cfg.submit_batch_size,
+            "poll_interval_sec": cfg.poll_interval_sec,
+        },
+        "stub": stub_stats,
+        "http": connection_stats(),
+    }
+
+
+def _fetch_stats(base_url: str) -> Dict[str, Any]:
+    from http_pool import get_session
+
+    root = base_url.rsplit("/api/", 1)[0]
+    try:
+        return get_session().get(f"{root}/_stats", timeout=10).json()
+    except Exception as e:
+        return {"error": str(e)}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="对本地 MinerU 替身做端到端吞吐压测")
+    ap.add_argument("--docs", type=int, default=40)
+    ap.add_argument("--pdf-kb", type=int, default=256, help="每个假 PDF 的大小（KB）")
+    ap.add_argument("--mode", choices=MODES, default="pipeline")
+    ap.add_argument("--batch-size", type=int, default=20, help="batched 模式每批文件数")
+    ap.add_argument("--max-in-flight", type=int, default=20)
+    ap.add_argument("--upload-workers", type=int, default=4)
+    ap.add_argument("--download-workers", type=int, default=4)
+    ap.add_argument("--post-workers", type=int, default=2)
+    ap.add_argument("--poll-interval", type=float, default=0.5)
+    ap.add_argument("--poll-max-interval", type=float, default=5)
+    ap.add_argument("--deadline", type=float, default=600, help="单文档截止时间（秒）")
+    ap.add_argument("--formats", default="xlsx", help="输出格式，如 xlsx,csv")
+    ap.add_argument("--url", default="", help="已启动的替身 base_url（如 http://127.0.0.1:8765/api/v4）")
+    ap.add_argument("--token", default="", help="替身校验的 token（同时作为 MINERU_TOKEN）")
+    ap.add_argument("--work-dir", default="", help="假 PDF 与输出目录（默认临时目录，结束后删除）")
+    ap.add_argument("--log", default="", help="main 的日志文件")
+    ap.add_argument("--out", default="", help="结果写入 JSON 文件")
+    add_stub_arguments(ap)
+    args = ap.parse_args(argv)
+
+    if args.work_dir:
+        os.makedirs(args.work_dir, exist_ok=True)
+        result = run_load_test(args, args.work_dir)
+    else:
+        with tempfile.TemporaryDirectory(prefix="load_mineru_") as tmp:
+            if not args.log:
+                args.log = os.path.join(tempfile.gettempdir(), "load_mineru_run.log")
+            result = run_load_test(args, tmp)
+
+    stub = result["stub"]
+    print(
+        f"{result['mode']}: {result['done']}/{result['docs']} 完成，用时 {result['seconds']} s，"
+        f"{result['docs_per_min']} docs/min"
+    )
+    print(
+        f"替身：API 请求 {stub.get('api_requests', 0)}（限流 {stub.get('throttled', 0)}，"
+        f"注入错误 {stub.get('injected_errors', 0)}），解析失败 {stub.get('docs_failed', 0)}，"
+        f"排队等待 {stub.get('queue_wait_sec', {})}"
+    )
+    print(f"连接复用：{result['http']}")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入：{args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,652 @@
+"""
+本地 MinerU API 替身（stdlib http.server），用于离线端到端 / 并发压测，不需要真实 Token 与网络：
+
+  POST /api/v4/file-urls/batch               申请上传链接（返回 batch_id + 预签名风格的 PUT URL）
+  PUT  /upload/<batch_id>/<i>?sig=...         上传文件（不校验 Authorization，与 OSS 预签名一致）
+  GET  /api/v4/extract-results/batch/<id>     批量结果：waiting-file / pending / running(extract_progress) / done / failed
+  POST /api/v4/extract/task                   URL 任务
+  GET  /api/v4/extract/task/<task_id>         URL 任务结果
+  GET  /zips/<name>                           full_zip_url 下载（支持 Range，可被分段/续传下载）
+  GET  /_stats                                替身自身的计数（请求数、限流、注入错误、排队时间等）
+
+模拟的服务端行为（StubConfig）：
+  - 每个 API 请求的固定延迟 + 抖动；按比例注入 HTTP 500；令牌桶限流（超出返回 429）
+  - 上传完成 queue_delay_sec 后进入调度队列；同时解析的文档数 max_running，其余排队（pending）
+  - 解析耗时 = 页数 * sec_per_page；按 failure_rate 比例以 failed 结束
+  - 上传 / 下载的服务端总带宽上限
+结果 zip 取自 zip_dir（已有的 MinerU result zip），为空时启动时用 benchmarks.synthetic 合成。
+
+用法（在仓库根目录）：
+  python -m benchmarks.mineru_stub --port 8765 --max-running 4 --sec-per-page 0.1 --failure-rate 0.05
+  然后把 Config.mineru_base_url 设为 http://127.0.0.1:8765/api/v4
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import uuid
+import zipfile
+from collections import Counter, deque
+from dataclasses import asdict, dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from downloader import BandwidthLimiter  # noqa: E402
+
+API_PREFIX = "/api/v4"
+
+STATE_WAITING_FILE = "waiting-file"
+STATE_PENDING = "pending"
+STATE_RUNNING = "running"
+STATE_DONE = "done"
+STATE_FAILED = "failed"
+
+
+@dataclass
+class StubConfig:
+    host: str = "127.0.0.1"
+    port: int = 0  # 0：随机空闲端口
+
+    # ====== API 延迟 / 错误 / 限流 ======
+    latency_ms: float = 30
+    latency_jitter_ms: float = 20
+    # API 请求返回 HTTP 500 的比例（瞬时故障）
+    error_rate: float = 0.0
+    # 令牌桶：每秒 API 请求数（0 不限）与桶容量；超出返回 429
+    rate_limit_rps: float = 0
+    rate_limit_burst: int = 20
+    # 非空时校验 Authorization: Bearer <token>
+    token: str = ""
+
+    # ====== 排队 / 解析 ======
+    # 上传完成到进入调度队列的延迟（秒）
+    queue_delay_sec: float = 0.5
+    # 同时解析的文档数；其余为 pending
+    max_running: int = 8
+    pages: int = 20
+    sec_per_page: float = 0.05
+    # 解析以 failed 结束的比例
+    failure_rate: float = 0.0
+
+    # ====== 带宽（字节/秒，0 不限；服务端所有连接共享） ======
+    upload_bytes_per_sec: int = 0
+    download_bytes_per_sec: int = 0
+
+    # ====== 结果 zip ======
+    zip_dir: str = ""
+    synthetic_zips: int = 4
+    synthetic_pages: int = 20
+    seed: int = 0
+
+
+@dataclass
+class _Doc:
+    """替身里的一个解析任务（batch 中的一个文件或一个 URL 任务）"""
+
+    file_name: str
+    data_id: str = ""
+    state: str = STATE_WAITING_FILE
+    pages: int = 0
+    zip_name: str = ""
+    will_fail: bool = False
+    uploaded_at: float = 0.0
+    eligible_at: float = 0.0
+    started_at: float = 0.0
+    end_at: float = 0.0
+    upload_bytes: int = 0
+
+    def progress(self, now: float, sec_per_page: float) -> Dict[str, Any]:
+        done_pages = self.pages if sec_per_page <= 0 else min(self.pages, int((now - self.started_at) / sec_per_page))
+        return {
+            "extracted_pages": done_pages,
+            "total_pages": self.pages,
+            "start_time": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(time.time() - (now - self.started_at))),
+        }
+
+
+class _TokenBucket:
+    """非阻塞令牌桶：try_acquire() 拿不到令牌直接返回 False（由调用方回 429）"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = max(0.0, float(rate))
+        self.capacity = max(1.0, float(burst))
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        if self.rate <= 0:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+def make_synthetic_zips(out_dir: str, n: int, pages: int, seed: int = 0) -> List[str]:
+    """用 benchmarks.synthetic 合成 n 个 MinerU 风格的 result zip（<uuid>_content_list.json / _model.json / images/）"""
+    from benchmarks.synthetic import write_mineru_output
+
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for i in range(n):
+        stem = str(uuid.UUID(int=random.Random(seed * 1000 + i).getrandbits(128)))
+        work = tempfile.mkdtemp(prefix="stub_zip_", dir=out_dir)
+        try:
+            write_mineru_output(
+                work,
+                pages,
+                stem=stem,
+                image_px=(600, 400),
+                seed=seed * 1000 + i,
+                std_no=f"DB37/T {4800 + i}—2025",
+            )
+            zip_path = os.path.join(out_dir, f"result_{i}.zip")
+            with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+                for dirpath, _, files in os.walk(work):
+                    for fn in sorted(files):
+                        full = os.path.join(dirpath, fn)
+                        zf.write(full, os.path.relpath(full, work).replace(os.sep, "/"))
+            paths.append(zip_path)
+        finally:
+            shutil.rmtree(work, ignore_errors=True)
+    return paths
+
+
+class MinerUStub:
+    """
+    MinerU API 替身：start() 在后台线程起 HTTP 服务并返回 base_url（可直接填入 Config.mineru_base_url），
+    stop() 关闭服务并清理合成的 zip。调度线程每 20ms 推进一次各任务状态。
+    """
+
+    TICK_SEC = 0.02
+
+    def __init__(self, cfg: Optional[StubConfig] = None):
+        self.cfg = cfg or StubConfig()
+        self._lock = threading.Lock()
+        self._rnd = random.Random(self.cfg.seed)
+        self._docs: Dict[str, _Doc] = {}          # doc_id -> _Doc
+        self._batches: Dict[str, List[str]] = {}  # batch_id -> [doc_id]
+        self._queue: Deque[str] = deque()         # 已上传、等待调度的 doc_id（按 eligible_at 先后）
+        self._running: List[str] = []
+        self._zips: Dict[str, str] = {}           # 下载名 -> 本地路径
+        self._zip_names: List[str] = []
+        self._tmp_dir = ""
+        self._seq = 0
+        self._counters: Counter = Counter()
+        self._queue_waits: List[float] = []
+        self._api_limit = _TokenBucket(self.cfg.rate_limit_rps, self.cfg.rate_limit_burst)
+        self._upload_bw = BandwidthLimiter(self.cfg.upload_bytes_per_sec)
+        self._download_bw = BandwidthLimiter(self.cfg.download_bytes_per_sec)
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    # ====== 生命周期 ======
+
+    @property
+    def root_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def base_url(self) -> str:
+        return self.root_url + API_PREFIX
+
+    def start(self) -> str:
+        zip_paths: List[str] = []
+        if self.cfg.zip_dir:
+            zip_paths = sorted(
+                os.path.join(self.cfg.zip_dir, fn) for fn in os.listdir(self.cfg.zip_dir) if fn.lower().endswith(".zip")
+            )
+        if not zip_paths:
+            self._tmp_dir = tempfile.mkdtemp(prefix="mineru_stub_")
+            zip_paths = make_synthetic_zips(
+                self._tmp_dir, max(1, self.cfg.synthetic_zips), self.cfg.synthetic_pages, seed=self.cfg.seed
+            )
+        for p in zip_paths:
+            name = f"{uuid.uuid4()}.zip"
+            self._zips[name] = p
+            self._zip_names.append(name)
+
+        self._server = ThreadingHTTPServer((self.cfg.host, self.cfg.port), _make_handler(self))
+        self._server.daemon_threads = True
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._server.serve_forever, name="mineru-stub-http", daemon=True),
+            threading.Thread(target=self._schedule_loop, name="mineru-stub-sched", daemon=True),
+        ]
+        for t in self._threads:
+            t.start()
+        return self.base_url
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        for t in self._threads:
+            t.join(timeout=5)
+        self._threads = []
+        if self._tmp_dir:
+            shutil.rmtree(self._tmp_dir, ignore_errors=True)
+            self._tmp_dir = ""
+
+    def __enter__(self) -> "MinerUStub":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.stop()
+
+    # ====== 调度 ======
+
+    def _schedule_loop(self) -> None:
+        while not self._stop.wait(self.TICK_SEC):
+            self._advance(time.monotonic())
+
+    def _advance(self, now: float) -> None:
+        with self._lock:
+            still = []
+            for doc_id in self._running:
+                doc = self._docs[doc_id]
+                if doc.end_at <= now:
+                    doc.state = STATE_FAILED if doc.will_fail else STATE_DONE
+                    self._counters[f"docs_{doc.state}"] += 1
+                else:
+                    still.append(doc_id)
+            self._running = still
+            while self._queue and len(self._running) < max(1, self.cfg.max_running):
+                doc = self._docs[self._queue[0]]
+                if doc.eligible_at > now:
+                    break
+                self._running.append(self._queue.popleft())
+                doc.state = STATE_RUNNING
+                doc.started_at = now
+                doc.end_at = now + doc.pages * self.cfg.sec_per_page
+                self._queue_waits.append(now - doc.uploaded_at)
+
+    def _new_doc(self, file_name: str, data_id: str = "") -> Tuple[str, _Doc]:
+        """调用方持有 self._lock"""
+        self._seq += 1
+        doc = _Doc(
+            file_name=file_name,
+            data_id=data_id,
+            pages=self.cfg.pages,
+            zip_name=self._zip_names[self._seq % len(self._zip_names)],
+            will_fail=self._rnd.random() < self.cfg.failure_rate,
+        )
+        doc_id = f"{self._seq:08d}"
+        self._docs[doc_id] = doc
+        return doc_id, doc
+
+    def _enqueue(self, doc: _Doc, doc_id: str) -> None:
+        """调用方持有 self._lock：文件已就绪，queue_delay_sec 后可被调度"""
+        now = time.monotonic()
+        doc.state = STATE_PENDING
+        doc.uploaded_at = now
+        doc.eligible_at = now + self.cfg.queue_delay_sec
+        self._queue.append(doc_id)
+
+    def _doc_result(self, doc: _Doc, now: float) -> Dict[str, Any]:
+        res: Dict[str, Any] = {"file_name": doc.file_name, "state": doc.state, "err_msg": ""}
+        if doc.data_id:
+            res["data_id"] = doc.data_id
+        if doc.state == STATE_RUNNING:
+            res["extract_progress"] = doc.progress(now, self.cfg.sec_per_page)
+        elif doc.state == STATE_DONE:
+            res["full_zip_url"] = f"{self.root_url}/zips/{doc.zip_name}"
+        elif doc.state == STATE_FAILED:
+            res["err_msg"] = "stub: simulated parse failure"
+        return res
+
+    # ====== API ======
+
+    def create_batch(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        files = payload.get("files") or []
+        batch_id = str(uuid.uuid4())
+        urls = []
+        with self._lock:
+            ids = []
+            for i, f in enumerate(files):
+                doc_id, _ = self._new_doc(str(f.get("name") or f"file_{i}.pdf"), str(f.get("data_id") or ""))
+                ids.append(doc_id)
+                urls.append(f"{self.root_url}/upload/{batch_id}/{i}?sig={uuid.uuid4().hex}")
+            self._batches[batch_id] = ids
+        return {"batch_id": batch_id, "file_urls": urls}
+
+    def receive_upload(self, batch_id: str, idx: int, nbytes: int) -> bool:
+        with self._lock:
+            ids = self._batches.get(batch_id)
+            if ids is None or not 0 <= idx < len(ids):
+                return False
+            doc = self._docs[ids[idx]]
+            doc.upload_bytes = nbytes
+            self._counters["bytes_uploaded"] += nbytes
+            if doc.state == STATE_WAITING_FILE:
+                self._enqueue(doc, ids[idx])
+        return True
+
+    def batch_results(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        now = time.monotonic()
+        with self._lock:
+            ids = self._batches.get(batch_id)
+            if ids is None:
+                return None
+            return {"batch_id": batch_id, "extract_result": [self._doc_result(self._docs[i], now) for i in ids]}
+
+    def create_task(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        url = str(payload.get("url") or "")
+        with self._lock:
+            doc_id, doc = self._new_doc(os.path.basename(urlsplit(url).path) or "remote.pdf", str(payload.get("data_id") or ""))
+            self._enqueue(doc, doc_id)
+        return {"task_id": doc_id}
+
+    def task_result(self, task_id: str) -> Optional[Dict[str, Any]]:
+        now = time.monotonic()
+        with self._lock:
+            doc = self._docs.get(task_id)
+            if doc is None:
+                return None
+            res = self._doc_result(doc, now)
+        res["task_id"] = task_id
+        return res
+
+    def count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self._counters[name] += n
+
+    def stats(self) -> Dict[str, Any]:
+        """计数 + 当前各状态文档数 + 排队等待时间（上传完成 -> 开始解析）"""
+        with self._lock:
+            states = Counter(d.state for d in self._docs.values())
+            waits = sorted(self._queue_waits)
+            out: Dict[str, Any] = dict(self._counters)
+        out["states"] = dict(states)
+        if waits:
+            out["queue_wait_sec"] = {
+                "p50": round(waits[len(waits) // 2], 3),
+                "p95": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 3),
+                "max": round(waits[-1], 3),
+            }
+        out["config"] = asdict(self.cfg)
+        return out
+
+
+_RE_BATCH_RESULT = re.compile(rf"^{API_PREFIX}/extract-results/batch/([^/]+)$")
+_RE_TASK_RESULT = re.compile(rf"^{API_PREFIX}/extract/task/([^/]+)$")
+_RE_UPLOAD = re.compile(r"^/upload/([^/]+)/(\d+)$")
+_RE_ZIP = re.compile(r"^/zips/([^/]+)$")
+_RE_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+_CHUNK = 256 * 1024
+
+
+def _make_handler(stub: MinerUStub):
+    class Handler(BaseHTTPRequestHandler):
+        # keep-alive：与 http_pool 的连接复用行为一致
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):  # noqa: A002 - 与基类签名一致
+            pass
+
+        # ---- 响应 ----
+
+        def _send_json(self, status: int, obj: Dict[str, Any]) -> None:
+            body = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _ok(self, data: Any) -> None:
+            self._send_json(200, {"code": 0, "msg": "ok", "trace_id": uuid.uuid4().hex, "data": data})
+
+        def _api_error(self, code: int, msg: str, status: int = 200) -> None:
+            self._send_json(status, {"code": code, "msg": msg, "trace_id": uuid.uuid4().hex, "data": None})
+
+        def _read_body(self) -> bytes:
+            if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+                parts = []
+                while True:
+                    size = int(self.rfile.readline().split(b";")[0].strip() or b"0", 16)
+                    if size == 0:
+                        self.rfile.readline()
+                        return b"".join(parts)
+                    parts.append(self.rfile.read(size))
+                    self.rfile.readline()
+            return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+        def _drain_upload(self, limiter: BandwidthLimiter) -> int:
+            """边读边按服务端上传带宽限速，不保留内容，返回字节数"""
+            if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+                n = len(self._read_body())
+                limiter.consume(n)
+                return n
+            remaining = int(self.headers.get("Content-Length") or 0)
+            n = 0
+            while remaining > 0:
+                chunk = self.rfile.read(min(_CHUNK, remaining))
+                if not chunk:
+                    break
+                limiter.consume(len(chunk))
+                n += len(chunk)
+                remaining -= len(chunk)
+            return n
+
+        # ---- API 公共前置：延迟、限流、错误注入、鉴权 ----
+
+        def _api_gate(self) -> bool:
+            cfg = stub.cfg
+            stub.count("api_requests")
+            delay = cfg.latency_ms + random.uniform(0, cfg.latency_jitter_ms)
+            if delay > 0:
+                time.sleep(delay / 1000.0)
+            if not stub._api_limit.try_acquire():
+                stub.count("throttled")
+                self._api_error(-429, "stub: too many requests", status=429)
+                return False
+            if cfg.error_rate > 0 and random.random() < cfg.error_rate:
+                stub.count("injected_errors")
+                self._api_error(-500, "stub: injected server error", status=500)
+                return False
+            if cfg.token and self.headers.get("Authorization", "") != f"Bearer {cfg.token}":
+                stub.count("unauthorized")
+                self._api_error(-401, "stub: invalid token", status=401)
+                return False
+            return True
+
+        # ---- 路由 ----
+
+        def do_POST(self):
+            path = urlsplit(self.path).path
+            body = self._read_body()
+            if path not in (f"{API_PREFIX}/file-urls/batch", f"{API_PREFIX}/extract/task"):
+                self._api_error(-404, f"stub: unknown path {path}", status=404)
+                return
+            if not self._api_gate():
+                return
+            try:
+                payload = json.loads(body or b"{}")
+            except ValueError:
+                self._api_error(-400, "stub: invalid json", status=400)
+                return
+            if path.endswith("/file-urls/batch"):
+                stub.count("batches")
+                self._ok(stub.create_batch(payload))
+            else:
+                stub.count("url_tasks")
+                self._ok(stub.create_task(payload))
+
+        def do_PUT(self):
+            m = _RE_UPLOAD.match(urlsplit(self.path).path)
+            if not m:
+                self._read_body()
+                self._api_error(-404, "stub: unknown upload url", status=404)
+                return
+            n = self._drain_upload(stub._upload_bw)
+            ok = stub.receive_upload(m.group(1), int(m.group(2)), n)
+            self.send_response(200 if ok else 403)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def do_GET(self):
+            path = urlsplit(self.path).path
+            if path == "/_stats":
+                self._send_json(200, stub.stats())
+                return
+            m = _RE_ZIP.match(path)
+            if m:
+                self._send_zip(m.group(1))
+                return
+            m_batch = _RE_BATCH_RESULT.match(path)
+            m_task = _RE_TASK_RESULT.match(path)
+            if not (m_batch or m_task):
+                self._api_error(-404, f"stub: unknown path {path}", status=404)
+                return
+            if not self._api_gate():
+                return
+            stub.count("polls")
+            data = stub.batch_results(m_batch.group(1)) if m_batch else stub.task_result(m_task.group(1))
+            if data is None:
+                self._api_error(-60012, "stub: task not found")
+            else:
+                self._ok(data)
+
+        def _send_zip(self, name: str) -> None:
+            path = stub._zips.get(name)
+            if path is None:
+                self._send_json(404, {"error": "not found"})
+                return
+            size = os.path.getsize(path)
+            start, end = 0, size - 1
+            status = 200
+            rng = _RE_RANGE.match(self.headers.get("Range", "").strip())
+            if rng and (rng.group(1) or rng.group(2)):
+                if rng.group(1):
+                    start = int(rng.group(1))
+                    end = min(size - 1, int(rng.group(2))) if rng.group(2) else size - 1
+                else:
+                    start = max(0, size - int(rng.group(2)))
+                if start >= size or start > end:
+                    self.send_response(416)
+                    self.send_header("Content-Range", f"bytes */{size}")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                status = 206
+
+            stub.count("zip_downloads" if status == 200 else "zip_range_requests")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/zip")
+            self.send_header("Accept-Ranges", "bytes")
+            self.send_header("Content-Length", str(end - start + 1))
+            if status == 206:
+                self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+            self.end_headers()
+            sent = 0
+            with open(path, "rb") as f:
+                f.seek(start)
+                remaining = end - start + 1
+                while remaining > 0:
+                    chunk = f.read(min(_CHUNK, remaining))
+                    if not chunk:
+                        break
+                    stub._download_bw.consume(len(chunk))
+                    try:
+                        self.wfile.write(chunk)
+                    except (BrokenPipeError, ConnectionResetError):
+                        break
+                    sent += len(chunk)
+                    remaining -= len(chunk)
+            stub.count("bytes_downloaded", sent)
+
+    return Handler
+
+
+def add_stub_arguments(ap: argparse.ArgumentParser) -> None:
+    """把 StubConfig 的可调项加到命令行（供本模块与压测脚本共用）"""
+    d = StubConfig()
+    ap.add_argument("--latency-ms", type=float, default=d.latency_ms)
+    ap.add_argument("--latency-jitter-ms", type=float, default=d.latency_jitter_ms)
+    ap.add_argument("--error-rate", type=float, default=d.error_rate, help="API 请求返回 500 的比例")
+    ap.add_argument("--rate-limit-rps", type=float, default=d.rate_limit_rps, help="API 限流（每秒请求数，0 不限）")
+    ap.add_argument("--rate-limit-burst", type=int, default=d.rate_limit_burst)
+    ap.add_argument("--queue-delay", type=float, default=d.queue_delay_sec, help="上传完成到可被调度的延迟（秒）")
+    ap.add_argument("--max-running", type=int, default=d.max_running, help="同时解析的文档数")
+    ap.add_argument("--pages", type=int, default=d.pages, help="每个文档的页数（决定解析耗时与进度）")
+    ap.add_argument("--sec-per-page", type=float, default=d.sec_per_page)
+    ap.add_argument("--failure-rate", type=float, default=d.failure_rate, help="解析以 failed 结束的比例")
+    ap.add_argument("--upload-bw", type=int, default=d.upload_bytes_per_sec, help="上传总带宽（字节/秒）")
+    ap.add_argument("--download-bw", type=int, default=d.download_bytes_per_sec, help="下载总带宽（字节/秒）")
+    ap.add_argument("--zip-dir", default=d.zip_dir, help="已有 result zip 目录（为空时合成）")
+    ap.add_argument("--synthetic-zips", type=int, default=d.synthetic_zips)
+    ap.add_argument("--synthetic-pages", type=int, default=d.synthetic_pages)
+    ap.add_argument("--seed", type=int, default=d.seed)
+
+
+def stub_config_from_args(args: argparse.Namespace, **overrides: Any) -> StubConfig:
+    cfg = StubConfig(
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.latency_jitter_ms,
+        error_rate=args.error_rate,
+        rate_limit_rps=args.rate_limit_rps,
+        rate_limit_burst=args.rate_limit_burst,
+        queue_delay_sec=args.queue_delay,
+        max_running=args.max_running,
+        pages=args.pages,
+        sec_per_page=args.sec_per_page,
+        failure_rate=args.failure_rate,
+        upload_bytes_per_sec=args.upload_bw,
+        download_bytes_per_sec=args.download_bw,
+        zip_dir=args.zip_dir,
+        synthetic_zips=args.synthetic_zips,
+        synthetic_pages=args.synthetic_pages,
+        seed=args.seed,
+    )
+    for k, v in overrides.items():
+        setattr(cfg, k, v)
+    return cfg
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="本地 MinerU API 替身")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--token", default="", help="非空时校验 Bearer token")
+    add_stub_arguments(ap)
+    args = ap.parse_args(argv)
+
+    stub = MinerUStub(stub_config_from_args(args, host=args.host, port=args.port, token=args.token))
+    base_url = stub.start()
+    print(f"MinerU 替身已启动：{base_url}（结果 zip {len(stub._zips)} 个；统计 {stub.root_url}/_stats）")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stub.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,324 @@
+"""
+合成 MinerU 解析结果，供基准测试使用（结构与线上 zip 解压后的文件一致，内容按 seed 确定）：
+
+  - make_content_list : content_list.json（顶层 list[block]，首页含标准号/标题，正文含 text/image/table/equation 块）
+  - make_model_json   : model.json（顶层 list[page]，page 为 list[block]，block["content"] 为文本；含目次页与多级标题）
+  - make_image_bytes  : 一张 JPEG/PNG 图片（渐变 + 噪声，压缩率接近扫描插图）
+  - write_mineru_output: 把上面三者写成一个“解压目录”：<stem>_content_list.json / <stem>_model.json / images/*.jpg
+  - make_image_rows   : 与 main.build_image_rows 相同结构的 image.xlsx 行
+
+用法（在仓库根目录）：
+  python -m benchmarks.synthetic --pages 200 --out /tmp/mineru_200p
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import random
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+WORDS = [
+    "范围", "规范性引用文件", "术语和定义", "一般要求", "施工准备", "质量检验", "安全", "附录",
+    "材料", "试验方法", "检验规则", "标志", "包装", "运输", "贮存", "路基", "路面", "桥梁",
+    "隧道", "排水", "压实度", "弯沉", "平整度", "混凝土", "沥青", "钢筋", "养护", "验收",
+]
+SENTENCE_TAIL = ["应符合下列规定。", "宜采用机械施工。", "不应小于设计值。", "应按附录A执行。", "见表1。"]
+ENGLISH_CAPTIONS = ["Figure 1 Construction process flowchart", "Table 2 Compaction requirements"]
+
+PAGE_W, PAGE_H = 1190, 1684
+
+
+def _words(rnd: random.Random, lo: int, hi: int) -> str:
+    return "".join(rnd.choice(WORDS) for _ in range(rnd.randint(lo, hi)))
+
+
+def _sentence(rnd: random.Random) -> str:
+    return _words(rnd, 4, 20) + rnd.choice(SENTENCE_TAIL)
+
+
+def _bbox(rnd: random.Random, y: int, h: int) -> List[int]:
+    x0 = rnd.randint(80, 160)
+    return [x0, y, rnd.randint(x0 + 200, PAGE_W - 80), y + h]
+
+
+def _caption(rnd: random.Random, kind: str, n: int) -> str:
+    """图/表标题：'图3 xxx' / '图 2-1 xxx' / '表4.1 xxx'，少量英文（会被 image.xlsx 过滤）和空标题"""
+    r = rnd.random()
+    if r < 0.05:
+        return ""
+    if r < 0.08:
+        return rnd.choice(ENGLISH_CAPTIONS)
+    prefix = "图" if kind == "image" else "表"
+    sep = rnd.choice(["", " "])
+    num = rnd.choice([str(n), f"{rnd.randint(1, 9)}-{n}", f"{rnd.randint(1, 9)}.{n}"])
+    return f"{prefix}{sep}{num} {_words(rnd, 1, 4)}"
+
+
+def _img_name(seed: int, i: int) -> str:
+    return hashlib.sha256(f"{seed}:{i}".encode()).hexdigest() + ".jpg"
+
+
+def make_content_list(
+    pages: int,
+    blocks_per_page: int = 25,
+    image_ratio: float = 0.06,
+    table_ratio: float = 0.03,
+    dup_ratio: float = 0.05,
+    std_no: str = "DB37/T 4866—2025",
+    title: str = "道路工程施工技术规范",
+    seed: int = 0,
+) -> List[Dict[str, Any]]:
+    """
+    【输入】
+      - pages (int): 页数；每页约 blocks_per_page 个块
+      - image_ratio / table_ratio (float): 正文块中图片块 / 表格块的比例
+      - dup_ratio (float): 图片块复用前面某个 img_path 的比例（MinerU 对同一图片会给同一个文件）
+      - std_no / title: 首页的标准号与标题（extract_title_and_stdno_from_content_list 应能识别出来）
+
+    【输出】
+      - List[dict]: content_list.json 的内容
+    """
+    rnd = random.Random(seed)
+    blocks: List[Dict[str, Any]] = [
+        {"type": "text", "text": "ICS 93.080", "bbox": [90, 90, 260, 115], "page_idx": 0},
+        {"type": "header", "text": std_no, "bbox": [820, 170, 1100, 205], "page_idx": 0},
+        {"type": "text", "text": title, "text_level": 1, "bbox": [260, 430, 930, 490], "page_idx": 0},
+        {"type": "text", "text": "Technical specification for road construction", "bbox": [240, 510, 950, 540], "page_idx": 0},
+        {"type": "text", "text": "2025-01-01 发布", "bbox": [90, 1450, 400, 1480], "page_idx": 0},
+    ]
+    img_paths: List[str] = []
+    n_fig = n_tab = 0
+    for page in range(1, pages):
+        y = 120
+        for _ in range(rnd.randint(blocks_per_page // 2, blocks_per_page * 3 // 2)):
+            r = rnd.random()
+            if r < image_ratio + table_ratio:
+                kind = "image" if r < image_ratio else "table"
+                if img_paths and rnd.random() < dup_ratio:
+                    img_path = rnd.choice(img_paths)
+                else:
+                    img_path = "images/" + _img_name(seed, len(img_paths))
+                    img_paths.append(img_path)
+                if kind == "image":
+                    n_fig += 1
+                    blk = {
+                        "type": "image",
+                        "img_path": img_path,
+                        "image_caption": [_caption(rnd, kind, n_fig)],
+                        "image_footnote": [],
+                    }
+                else:
+                    n_tab += 1
+                    blk = {
+                        "type": "table",
+                        "img_path": img_path,
+                        "table_caption": [_caption(rnd, kind, n_tab)],
+                        "table_footnote": [],
+                        "table_body": "<table><tr><td>" + "</td><td>".join(rnd.choice(WORDS) for _ in range(6)) + "</td></tr></table>",
+                    }
+                h = rnd.randint(200, 500)
+            elif r < image_ratio + table_ratio + 0.02:
+                blk = {"type": "equation", "text": "$$E = \\frac{F}{A}$$", "text_format": "latex"}
+                h = 60
+            else:
+                blk = {"type": "text", "text": _sentence(rnd)}
+                if rnd.random() < 0.08:
+                    blk["text_level"] = 1
+                h = rnd.randint(25, 90)
+            blk["bbox"] = _bbox(rnd, y, h)
+            blk["page_idx"] = page
+            blocks.append(blk)
+            y = (y + h + 10) % (PAGE_H - 200)
+    return blocks
+
+
+def _next_label(rnd: random.Random, counters: List[int]) -> str:
+    """按文档顺序生成下一个标题编号（1 / 1.1 / 1.1.1 ...，深度最多 4）"""
+    depth = len(counters)
+    r = rnd.random()
+    if depth < 4 and r < 0.35:
+        counters.append(1)
+    elif depth > 1 and r < 0.6:
+        counters.pop()
+        counters[-1] += 1
+    else:
+        counters[-1] += 1
+    return ".".join(map(str, counters))
+
+
+def make_model_json(
+    pages: int,
+    blocks_per_page: int = 35,
+    heading_ratio: float = 0.08,
+    toc_pages: int = 2,
+    seed: int = 0,
+) -> List[List[Dict[str, Any]]]:
+    """
+    【输入】
+      - pages (int): 总页数（含 toc_pages 页目次）
+      - heading_ratio (float): 正文块中章节标题（'6.3.1 一般要求'）的比例
+      - toc_pages (int): 目次页数；目次行带页码（'1 范围 1'），clean_toc_list 应从正文的 '1' 开始
+
+    【输出】
+      - List[List[dict]]: model.json 的内容（每页一个 block 列表）
+    """
+    rnd = random.Random(seed)
+
+    def block(content: str, typ: str = "text") -> Dict[str, Any]:
+        return {
+            "type": typ,
+            "bbox": [rnd.randint(0, 600) for _ in range(4)],
+            "angle": 0,
+            "score": round(rnd.random(), 4),
+            "content": content,
+        }
+
+    # 先生成正文标题序列，目次页复用同一序列（带页码）
+    body_pages = max(1, pages - toc_pages - 1)
+    n_headings = max(1, int(body_pages * blocks_per_page * heading_ratio))
+    counters = [1]
+    labels = ["1"] + [_next_label(rnd, counters) for _ in range(n_headings - 1)]
+    headings = [(label, _words(rnd, 1, 3)) for label in labels]
+
+    doc: List[List[Dict[str, Any]]] = [
+        [block("ICS 93.080"), block("DB37/T 4866—2025", "header"), block("道路工程施工技术规范", "title"), block("前言")]
+    ]
+    per_toc_page = max(1, -(-len(headings) // max(1, toc_pages)))
+    for p in range(toc_pages):
+        page = [block("目次", "title")]
+        for label, text in headings[p * per_toc_page:(p + 1) * per_toc_page]:
+            page.append(block(f"{label} {text} {rnd.randint(1, body_pages)}"))
+        doc.append(page)
+
+    hi = 0
+    for p in range(body_pages):
+        page = []
+        for _ in range(rnd.randint(blocks_per_page // 2, blocks_per_page * 3 // 2)):
+            r = rnd.random()
+            if hi < len(headings) and (r < heading_ratio or p == body_pages - 1):
+                label, text = headings[hi]
+                hi += 1
+                page.append(block(f"{label} {text}", "title"))
+            elif r < heading_ratio + 0.02:
+                page.append(block(f"GB/T {rnd.randint(1000, 50000)}—{rnd.randint(2000, 2024)} {_words(rnd, 1, 3)}"))
+            elif r < heading_ratio + 0.04:
+                page.append(block(str(rnd.randint(1, 999))))  # 页码
+            else:
+                page.append(block(_sentence(rnd)))
+        doc.append(page)
+    return doc
+
+
+def make_image_bytes(size: Tuple[int, int] = (1200, 800), seed: int = 0, fmt: str = "JPEG", quality: int = 90) -> bytes:
+    """渐变底 + 高斯噪声的 RGB 图片，编码为 fmt（JPEG / PNG）"""
+    from PIL import Image, ImageDraw
+
+    w, h = size
+    rnd = random.Random(seed)
+    gx = Image.linear_gradient("L").resize((w, h))
+    noise = Image.effect_noise((w, h), 4 + seed % 8)
+    im = Image.merge("RGB", (gx, noise, gx.transpose(Image.Transpose.FLIP_LEFT_RIGHT)))
+    draw = ImageDraw.Draw(im)
+    for _ in range(6):
+        x0, y0 = rnd.randint(0, w - 1), rnd.randint(0, h - 1)
+        draw.rectangle(
+            [x0, y0, min(w - 1, x0 + rnd.randint(20, w // 3)), min(h - 1, y0 + rnd.randint(20, h // 3))],
+            outline=(0, 0, 0),
+            width=3,
+        )
+    buf = io.BytesIO()
+    if fmt.upper() == "JPEG":
+        im.save(buf, format=fmt, quality=quality)
+    else:
+        im.save(buf, format=fmt)
+    return buf.getvalue()
+
+
+def write_mineru_output(
+    out_dir: str,
+    pages: int,
+    stem: str = "doc",
+    image_px: Tuple[int, int] = (1200, 800),
+    seed: int = 0,
+    **content_list_kwargs: Any,
+) -> Dict[str, Any]:
+    """
+    写一个与 MinerU zip 解压后一致的目录：
+      out_dir/<stem>_content_list.json、out_dir/<stem>_model.json、out_dir/images/<sha256>.jpg
+
+    【输出】
+      - dict: content_list / model_json 路径，页数、块数、图片数、图片总字节数
+    """
+    os.makedirs(os.path.join(out_dir, "images"), exist_ok=True)
+    content_list = make_content_list(pages, seed=seed, **content_list_kwargs)
+    model = make_model_json(pages, seed=seed)
+
+    cl_path = os.path.join(out_dir, f"{stem}_content_list.json")
+    model_path = os.path.join(out_dir, f"{stem}_model.json")
+    with open(cl_path, "w", encoding="utf-8") as f:
+        json.dump(content_list, f, ensure_ascii=False)
+    with open(model_path, "w", encoding="utf-8") as f:
+        json.dump(model, f, ensure_ascii=False)
+
+    img_paths = list(dict.fromkeys(b["img_path"] for b in content_list if b.get("img_path")))
+    image_bytes = 0
+    for i, rel in enumerate(img_paths):
+        data = make_image_bytes(image_px, seed=seed * 100003 + i)
+        with open(os.path.join(out_dir, rel), "wb") as f:
+            f.write(data)
+        image_bytes += len(data)
+
+    return {
+        "content_list": cl_path,
+        "model_json": model_path,
+        "pages": pages,
+        "blocks": len(content_list),
+        "model_blocks": sum(len(p) for p in model),
+        "images": len(img_paths),
+        "image_mb": round(image_bytes / 1024 ** 2, 1),
+    }
+
+
+def make_image_rows(content_list: List[Dict[str, Any]], unzip_dir: str, std_no: str = "DB37_T_4866-2025") -> List[Dict[str, Any]]:
+    """content_list 中的图片/表格块 -> image.xlsx 行（与 main.build_image_rows 相同的列与标题兜底）"""
+    from toc_extract.content_list_images import collect_images_from_content_lists
+
+    rows = []
+    for i, it in enumerate(collect_images_from_content_lists([("content_list.json", content_list)]), 1):
+        caption = it["caption"] or f"{'图' if it['kind'] == 'image' else '表'}_{it['hash']}"
+        rows.append(
+            {
+                "order_index": i,
+                "std_no": std_no,
+                "image_title": caption,
+                "clause_id": "",
+                "clause_text": "",
+                "image": os.path.join(unzip_dir, it["img_path"]),
+            }
+        )
+    return rows
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="生成合成 MinerU 解析结果目录")
+    ap.add_argument("--pages", type=int, default=100)
+    ap.add_argument("--out", required=True, help="输出目录")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--image-px", nargs=2, type=int, default=[1200, 800], metavar=("W", "H"))
+    args = ap.parse_args(argv)
+
+    info = write_mineru_output(args.out, args.pages, image_px=tuple(args.image_px), seed=args.seed)
+    print(json.dumps(info, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,343 @@
+from __future__ import annotations
+
+import argparse
+import os
+import sqlite3
+import sys
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from toc_extract.export_excel import DEFAULT_COLUMNS, INT_COLUMNS
+from toc_extract.image_excel import COLUMNS as IMAGE_COLUMNS
+from toc_extract.image_excel import iter_image_output_rows
+
+# trigram 分词要求检索词至少 3 个字符；更短的词改用 LIKE 逐行匹配
+FTS_MIN_TERM_CHARS = 3
+
+# 命中超过该条数时不再按 bm25 排序（打分与命中数成正比），改按写入顺序返回
+RANK_MAX_HITS = 100_000
+
+_CLAUSE_COLUMNS = tuple(c for c in DEFAULT_COLUMNS if c != "image")
+_IMAGE_COLUMNS = tuple(IMAGE_COLUMNS)
+
+
+def _sql_type(col: str) -> str:
+    return "INTEGER" if col in INT_COLUMNS else "TEXT"
+
+
+def _fts_tokenizer(conn: sqlite3.Connection) -> str:
+    """中文没有空格分词：优先 trigram（SQLite >= 3.34，支持任意子串检索），否则退回 unicode61"""
+    try:
+        conn.execute("CREATE VIRTUAL TABLE temp._probe USING fts5(x, tokenize='trigram')")
+        conn.execute("DROP TABLE temp._probe")
+        return "trigram"
+    except sqlite3.OperationalError:
+        return "unicode61"
+
+
+class ClauseDB:
+    """
+    全库条款库（SQLite + FTS5），每个文档后处理完成后写入一次：
+    - clauses：toc_results 的行（std_no / clause_id / parent_id 建索引），clauses_fts 对 clause_text 全文检索
+    - images：image 表的行（过滤、衍生列与 image.xlsx 一致），images_fts 对 image_title 全文检索
+    - docs：每个文档一行（doc_key 为 PDF 内容 sha256；未启用 journal/缓存时为输出目录）
+    upsert_document 在一个事务里先删后插，同一文档重复处理不会留下旧行。
+    WAL + busy timeout：多个线程/进程同时写时排队，不会互相破坏。
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=60)
+        self._conn.row_factory = sqlite3.Row
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            tokenizer = _fts_tokenizer(self._conn)
+            clause_cols = ",\n".join(f"{c} {_sql_type(c)}" for c in _CLAUSE_COLUMNS)
+            image_cols = ",\n".join(f"{c} {_sql_type(c)}" for c in _IMAGE_COLUMNS)
+            self._conn.executescript(
+                f"""
+                CREATE TABLE IF NOT EXISTS docs (
+                    doc_key    TEXT PRIMARY KEY,
+                    std_no     TEXT NOT NULL DEFAULT '',
+                    std_title  TEXT NOT NULL DEFAULT '',
+                    pdf_path   TEXT NOT NULL DEFAULT '',
+                    out_dir    TEXT NOT NULL DEFAULT '',
+                    clauses    INTEGER NOT NULL DEFAULT 0,
+                    images     INTEGER NOT NULL DEFAULT 0,
+                    updated_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS clauses (
+                    id      INTEGER PRIMARY KEY,
+                    doc_key TEXT NOT NULL,
+                    {clause_cols}
+                );
+                CREATE INDEX IF NOT EXISTS ix_clauses_doc ON clauses (doc_key);
+                CREATE INDEX IF NOT EXISTS ix_clauses_std ON clauses (std_no, clause_id);
+                CREATE INDEX IF NOT EXISTS ix_clauses_clause ON clauses (clause_id);
+                CREATE INDEX IF NOT EXISTS ix_clauses_parent ON clauses (std_no, parent_id);
+                CREATE VIRTUAL TABLE IF NOT EXISTS clauses_fts USING fts5 (
+                    clause_text, content='clauses', content_rowid='id', tokenize='{tokenizer}'
+                );
+                CREATE TRIGGER IF NOT EXISTS clauses_ai AFTER INSERT ON clauses BEGIN
+                    INSERT INTO clauses_fts (rowid, clause_text) VALUES (new.id, new.clause_text);
+                END;
+                CREATE TRIGGER IF NOT EXISTS clauses_ad AFTER DELETE ON clauses BEGIN
+                    INSERT INTO clauses_fts (clauses_fts, rowid, clause_text) VALUES ('delete', old.id, old.clause_text);
+                END;
+                CREATE TABLE IF NOT EXISTS images (
+                    id      INTEGER PRIMARY KEY,
+                    doc_key TEXT NOT NULL,
+                    {image_cols}
+                );
+                CREATE INDEX IF NOT EXISTS ix_images_doc ON images (doc_key);
+                CREATE INDEX IF NOT EXISTS ix_images_std ON images (std_no, clause_id);
+                CREATE VIRTUAL TABLE IF NOT EXISTS images_fts USING fts5 (
+                    image_title, content='images', content_rowid='id', tokenize='{tokenizer}'
+                );
+                CREATE TRIGGER IF NOT EXISTS images_ai AFTER INSERT ON images BEGIN
+                    INSERT INTO images_fts (rowid, image_title) VALUES (new.id, new.image_title);
+                END;
+                CREATE TRIGGER IF NOT EXISTS images_ad AFTER DELETE ON images BEGIN
+                    INSERT INTO images_fts (images_fts, rowid, image_title) VALUES ('delete', old.id, old.image_title);
+                END;
+                """
+            )
+
+    def __enter__(self) -> "ClauseDB":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def upsert_document(
+        self,
+        doc_key: str,
+        toc_rows: Sequence[Dict[str, Any]],
+        image_rows: Iterable[Dict[str, Any]] = (),
+        pdf_path: str = "",
+        out_dir: str = "",
+    ) -> Tuple[int, int]:
+        """
+        【输入】
+          - doc_key (str): 文档主键（同一文档再次写入时替换旧行）
+          - toc_rows: toc_items_to_rows 的行（含 model_json_path 等 DEFAULT_COLUMNS 列）
+          - image_rows: main.build_image_rows 的行（按 image.xlsx 规则过滤、补 clause_sort 等列）
+
+        【输出】
+          - (写入的条款数, 写入的图片数)
+        """
+        clause_params = [(doc_key, *[r.get(c) for c in _CLAUSE_COLUMNS]) for r in toc_rows]
+        image_params = [(doc_key, *[r.get(c) for c in _IMAGE_COLUMNS]) for r in iter_image_output_rows(image_rows)]
+        head = toc_rows[0] if toc_rows else {}
+        std_no = head.get("std_no") or (image_params[0][1 + _IMAGE_COLUMNS.index("std_no")] if image_params else "")
+
+        clause_sql = (
+            f"INSERT INTO clauses (doc_key, {', '.join(_CLAUSE_COLUMNS)}) "
+            f"VALUES ({', '.join('?' * (len(_CLAUSE_COLUMNS) + 1))})"
+        )
+        image_sql = (
+            f"INSERT INTO images (doc_key, {', '.join(_IMAGE_COLUMNS)}) "
+            f"VALUES ({', '.join('?' * (len(_IMAGE_COLUMNS) + 1))})"
+        )
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM clauses WHERE doc_key = ?", (doc_key,))
+            self._conn.execute("DELETE FROM images WHERE doc_key = ?", (doc_key,))
+            self._conn.executemany(clause_sql, clause_params)
+            self._conn.executemany(image_sql, image_params)
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO docs (doc_key, std_no, std_title, pdf_path, out_dir, clauses, images, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    doc_key,
+                    std_no or "",
+                    head.get("std_title") or "",
+                    pdf_path,
+                    out_dir,
+                    len(clause_params),
+                    len(image_params),
+                    time.time(),
+                ),
+            )
+        return len(clause_params), len(image_params)
+
+    def delete_document(self, doc_key: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM clauses WHERE doc_key = ?", (doc_key,))
+            self._conn.execute("DELETE FROM images WHERE doc_key = ?", (doc_key,))
+            self._conn.execute("DELETE FROM docs WHERE doc_key = ?", (doc_key,))
+
+    def _search(
+        self,
+        table: str,
+        text_col: str,
+        query: str,
+        limit: int,
+        std_no: str,
+    ) -> List[Dict[str, Any]]:
+        """
+        空白分隔的多个词取交集：
+          - 指定 std_no：走 std_no 索引，各词用 LIKE 过滤（单个标准最多几千行），按写入顺序
+          - 否则 >= FTS_MIN_TERM_CHARS 个字符的词走 FTS5，更短的词用 LIKE 过滤；
+            命中不超过 RANK_MAX_HITS 条时按 bm25 排序，否则按写入顺序取前 limit 条（避免给几十万条打分）
+          - 全部是短词且未指定 std_no 时为全表扫描
+        """
+        terms = [t for t in query.split() if t]
+        if not terms:
+            return []
+        long_terms = [t for t in terms if len(t) >= FTS_MIN_TERM_CHARS] if not std_no else []
+        like_terms = [t for t in terms if t not in long_terms]
+
+        fts = f"{table}_fts"
+        where: List[str] = []
+        params: List[Any] = []
+        order = "t.id"
+        if long_terms:
+            # 每个词整体加引号：按子串匹配，不解析 FTS5 语法字符
+            match = " AND ".join('"' + t.replace('"', '""') + '"' for t in long_terms)
+            with self._lock:
+                hits = self._conn.execute(
+                    f"SELECT COUNT(*) FROM (SELECT rowid FROM {fts} WHERE {fts} MATCH ? LIMIT ?)",
+                    (match, RANK_MAX_HITS + 1),
+                ).fetchone()[0]
+            ranked = hits <= RANK_MAX_HITS
+            score = f"bm25({fts})" if ranked else "0.0"
+            sql = f"SELECT t.*, {score} AS score FROM {fts} JOIN {table} t ON t.id = {fts}.rowid"
+            where.append(f"{fts} MATCH ?")
+            params.append(match)
+            if ranked:
+                order = "score"
+        else:
+            sql = f"SELECT t.*, 0.0 AS score FROM {table} t"
+        for t in like_terms:
+            where.append(f"t.{text_col} LIKE ? ESCAPE '\\'")
+            params.append("%" + t.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%")
+        if std_no:
+            where.append("t.std_no = ?")
+            params.append(std_no)
+        sql += " WHERE " + " AND ".join(where) + f" ORDER BY {order} LIMIT ?"
+        params.append(int(limit))
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [dict(r) for r in rows]
+
+    def search_clauses(self, query: str, limit: int = 20, std_no: str = "") -> List[Dict[str, Any]]:
+        """
+        【输入】
+          - query (str): 检索词，空白分隔多个词取交集（如 "沥青 摊铺温度"）
+          - limit (int): 最多返回条数
+          - std_no (str): 非空时只查该 std_no
+
+        【输出】
+          - List[dict]: clauses 表的行 + score（bm25，越小越相关）
+        """
+        return self._search("clauses", "clause_text", query, limit, std_no)
+
+    def search_images(self, query: str, limit: int = 20, std_no: str = "") -> List[Dict[str, Any]]:
+        """同 search_clauses，检索图/表标题（image_title）"""
+        return self._search("images", "image_title", query, limit, std_no)
+
+    def get_clause(self, std_no: str, clause_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM clauses WHERE std_no = ? AND clause_id = ? ORDER BY id LIMIT 1", (std_no, clause_id)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def children(self, std_no: str, parent_id: str) -> List[Dict[str, Any]]:
+        """某条款的直接子条款（按 parent_id）"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM clauses WHERE std_no = ? AND parent_id = ? ORDER BY id", (std_no, parent_id)
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                t: self._conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t in ("docs", "clauses", "images")
+            }
+
+
+def clause_db_path(cfg) -> str:
+    return cfg.clause_db_path or os.path.join(cfg.output_root_dir, "_clauses.sqlite")
+
+
+def open_clause_db(cfg) -> Optional[ClauseDB]:
+    """按 Config 打开条款库；未启用时返回 None"""
+    if not cfg.clause_db_enabled:
+        return None
+    return ClauseDB(clause_db_path(cfg))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    用法：
+      python clause_db.py search 沥青 摊铺温度 [--std DB37/T xxx] [--limit 20]
+      python clause_db.py images 流程图
+      python clause_db.py clause <std_no> <clause_id>   条款及其直接子条款
+      python clause_db.py stats
+    --db 指定库文件，缺省为 Config 中的条款库路径。
+    """
+    ap = argparse.ArgumentParser(description="全库条款检索")
+    ap.add_argument("--db", default="", help="条款库路径（缺省按 Config）")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    for name in ("search", "images"):
+        p = sub.add_parser(name)
+        p.add_argument("terms", nargs="+")
+        p.add_argument("--std", default="", help="只查该 std_no")
+        p.add_argument("--limit", type=int, default=20)
+    p = sub.add_parser("clause")
+    p.add_argument("std_no")
+    p.add_argument("clause_id")
+    sub.add_parser("stats")
+    args = ap.parse_args(argv)
+
+    db_path = args.db
+    if not db_path:
+        from config import Config
+
+        db_path = clause_db_path(Config())
+    if not os.path.exists(db_path):
+        print(f"条款库不存在：{db_path}")
+        return 1
+
+    with ClauseDB(db_path) as db:
+        if args.cmd == "stats":
+            for k, v in db.stats().items():
+                print(f"{k:>8}: {v}")
+        elif args.cmd == "clause":
+            row = db.get_clause(args.std_no, args.clause_id)
+            if row is None:
+                print("未找到该条款")
+                return 1
+            print(f"{row['clause_id']} {row['clause_text']}")
+            for c in db.children(args.std_no, args.clause_id):
+                print(f"  {c['clause_id']} {c['clause_text']}")
+        else:
+            query = " ".join(args.terms)
+            t0 = time.perf_counter()
+            if args.cmd == "search":
+                rows = db.search_clauses(query, limit=args.limit, std_no=args.std)
+            else:
+                rows = db.search_images(query, limit=args.limit, std_no=args.std)
+            elapsed = time.perf_counter() - t0
+            for r in rows:
+                text = r["clause_text"] if args.cmd == "search" else r["image_title"]
+                print(f"[{r['std_no']}] {r['clause_id']} {text}")
+            print(f"共 {len(rows)} 条（{elapsed * 1000:.0f} ms）")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -21,18 +21,104 @@ class Config:
     output_root_dir: str = r"G:\temp\standard_zip"
 
     # ====== 轮询/超时 ======
+    # 自适应轮询：最短/最长间隔；按 extract_progress 估算 ETA，离完成越远查得越稀
     poll_interval_sec: int = 2
+    poll_max_interval_sec: int = 30
+    # 单任务截止时间（秒，0 表示不限）：超时后返回 state=timeout，跳过该文档
+    task_deadline_sec: int = 2 * 60 * 60
 
     # ====== 下载重试/超时 ======
     download_retries: int = 5
     # (connect_timeout, read_timeout)
     download_timeout: tuple = (10, 180)
     verify_ssl: bool = True
+    # 分段并行下载：服务器支持 Range 且每段不小于 download_min_segment_mb 时启用
+    download_segments: int = 4
+    download_min_segment_mb: int = 8
+    # 进程级下载上限：总带宽（字节/秒，0 不限）与同时打开的下载连接数
+    download_max_bytes_per_sec: int = 0
+    download_max_connections: int = 8
 
     # ====== 其它开关 ======
     recursive: bool = True
     keep_zip: bool = True
 
+    # ====== 解压 ======
+    # True：只解压后处理用到的成员（content_list / model.json / images/）
+    unzip_only_needed: bool = False
+    # 待解压总量较大时的并行解压线程数
+    unzip_workers: int = 4
+
+    # ====== 输出格式 ======
+    # toc_results / image 表的输出格式，可多选：xlsx / csv / jsonl / parquet（parquet 需要 pyarrow）
+    # 只有 xlsx 会嵌入图片；不含 xlsx 时不再生成 Excel
+    output_formats: tuple = ("xlsx",)
+
+    # ====== image.xlsx 嵌图 ======
+    # 嵌入前按显示尺寸 * dpi/96 重采样并重新压缩（JPEG 质量），相同图片只存一份
+    image_xlsx_optimize: bool = True
+    image_xlsx_dpi: int = 96
+    image_xlsx_quality: int = 85
+    image_xlsx_workers: int = 4
+
+    # ====== zip 直读后处理 ======
+    # True：不解压 result.zip，后处理直接按成员随机读取 content_list/model.json/图片
+    zip_native: bool = False
+    # zip 直读时是否把（改名后的）图片写到 out_dir/images/；False 则完全不落盘图片
+    zip_native_extract_images: bool = True
+
+    # ====== 结果缓存（按 PDF 内容哈希 + model_version 复用 result.zip） ======
+    result_cache_enabled: bool = True
+    # 为空时使用 output_root_dir/_result_cache
+    result_cache_dir: str = ""
+    # 淘汰策略：总大小上限（GB）/ 条目最长保留天数；0 表示不限
+    result_cache_max_gb: float = 50
+    result_cache_max_age_days: int = 90
+
+    # ====== 断点续跑：output_root_dir/_journal.sqlite 记录每个文档的处理阶段 ======
+    journal_enabled: bool = True
+    # 续跑时按 journal 里的 full_zip_url 下载：返回 403/404/410，或该文档累计失败达到此次数，
+    # 视为 URL 已失效，回到 new 阶段重新上传解析（0 表示只看状态码）
+    journal_max_download_attempts: int = 3
+
+    # ====== 全库条款库：每个文档完成后写入 SQLite（FTS5 全文检索；python clause_db.py search ...） ======
+    clause_db_enabled: bool = True
+    # 为空时使用 output_root_dir/_clauses.sqlite
+    clause_db_path: str = ""
+
+    # ====== 重新挂接：output_root_dir/_tasks.sqlite 登记已提交的 batch_id/task_id ======
+    # 启动时先查询上次未拿到结果的任务，已完成的直接下载，过期/失败的才重新提交
+    reattach_enabled: bool = True
+    # 提交超过该时长（小时）的任务视为结果已过期
+    task_expire_hours: int = 24
+
+    # ====== 多文件批量提交 ======
+    # >1 时串行模式改为每 submit_batch_size 个 PDF 走一次 /file-urls/batch（上限 200）
+    submit_batch_size: int = 1
+    upload_workers_per_batch: int = 4
+
+    # ====== 流水线并发（pipeline_enabled=True 时生效） ======
+    # 上传 / 等待解析 / 下载+解压 / 本地后处理 四个阶段各自的并发数与队列容量
+    pipeline_enabled: bool = False
+    # MinerU 端同时持有（已上传、未出结果）的文档上限
+    max_in_flight: int = 20
+    upload_workers: int = 4
+    download_workers: int = 4
+    post_workers: int = 2
+    stage_queue_size: int = 8
+
+    # ====== 运行指标：每个文档各阶段耗时/吞吐写 JSONL，并刷新 Prometheus textfile ======
+    # （python run_metrics.py <jsonl> 可重新汇总 p50/p95 与最慢文档）
+    metrics_enabled: bool = True
+    # 为空时使用 output_root_dir/_metrics（每次运行一个 run_<时间>.jsonl）
+    metrics_dir: str = ""
+    # 为空时使用 metrics_dir/standard_extract.prom；可指向 node_exporter 的 textfile 目录
+    metrics_textfile: str = ""
+    # textfile 最短刷新间隔（秒）；运行结束时总会再写一次最终汇总
+    metrics_textfile_interval_sec: float = 15
+    # 汇总中列出的最慢文档数
+    metrics_slowest: int = 10
+
 
 def get_token(cfg: Config) -> str:
     """
@@ -1,7 +1,292 @@
+import fnmatch
+import json
 import requests
+import threading
 import time
 import os
 import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from http_pool import get_session
+
+
+class BandwidthLimiter:
+    """
+    进程级令牌桶限速（线程安全）：所有下载流共享同一个速率上限。
+    max_bytes_per_sec<=0 表示不限速。
+    """
+
+    def __init__(self, max_bytes_per_sec: int = 0):
+        self._lock = threading.Lock()
+        self.set_rate(max_bytes_per_sec)
+
+    def set_rate(self, max_bytes_per_sec: int) -> None:
+        with self._lock:
+            self.rate = max(0, int(max_bytes_per_sec or 0))
+            # 桶容量 = 1 秒的流量，允许短暂突发
+            self._tokens = float(self.rate)
+            self._last = time.monotonic()
+
+    def consume(self, n: int) -> None:
+        """预占 n 字节额度；额度不足时睡眠到额度补足"""
+        with self._lock:
+            if self.rate <= 0:
+                return
+            now = time.monotonic()
+            self._tokens = min(float(self.rate), self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= n
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+
+
+# 进程级下载限制：带宽上限 + 同时打开的下载连接数上限（流水线并发下载时共用）
+_LIMITER = BandwidthLimiter(0)
+_CONN_SLOTS = threading.BoundedSemaphore(8)
+_LIMITS_LOCK = threading.Lock()
+
+
+def configure_download_limits(max_bytes_per_sec: int = 0, max_connections: int = 8) -> None:
+    """设置进程级下载带宽（字节/秒，0 不限）与连接数上限；应在开始下载前调用"""
+    global _CONN_SLOTS
+    with _LIMITS_LOCK:
+        _LIMITER.set_rate(max_bytes_per_sec)
+        _CONN_SLOTS = threading.BoundedSemaphore(max(1, int(max_connections)))
+
+
+@contextmanager
+def _connection_slot():
+    slots = _CONN_SLOTS
+    slots.acquire()
+    try:
+        yield
+    finally:
+        slots.release()
+
+
+class ZipIntegrityError(Exception):
+    """下载得到的 zip 不完整或校验失败"""
+
+
+class ZipUrlGoneError(Exception):
+    """full_zip_url 已失效（预签名 URL 过期 / 对象已删除），重试同一 URL 没有意义"""
+
+
+# 这些状态码表示 URL 本身失效，不重试，交给调用方重新提交解析
+URL_GONE_STATUS = (403, 404, 410)
+
+
+def check_zip_integrity(zip_path: str) -> None:
+    """
+    校验 zip 完整性：能打开中央目录，且所有成员 CRC 正确。
+    截断的 zip 会在这里立刻暴露，而不是等到 unzip 时才失败。
+    """
+    try:
+        with zipfile.ZipFile(zip_path, "r") as zf:
+            bad = zf.testzip()
+    except (zipfile.BadZipFile, OSError, EOFError) as e:
+        raise ZipIntegrityError(f"zip 无法打开（可能被截断）：{zip_path}, err={e}")
+    if bad is not None:
+        raise ZipIntegrityError(f"zip 成员 CRC 校验失败：{bad} in {zip_path}")
+
+
+def _total_size_from_response(r, offset: int):
+    """从 Content-Range / Content-Length 推出文件总大小，未知时返回 None"""
+    if r.headers.get("Content-Encoding", "identity") != "identity":
+        # 传输压缩时 Content-Length 是压缩后的长度，无法与落盘大小比较
+        return None
+    content_range = r.headers.get("Content-Range", "")
+    if "/" in content_range:
+        total = content_range.rsplit("/", 1)[1].strip()
+        if total.isdigit():
+            return int(total)
+    length = r.headers.get("Content-Length")
+    if length and length.isdigit():
+        return int(length) + (offset if r.status_code == 206 else 0)
+    return None
+
+
+def _segment_stat(idx: int, nbytes: int, seconds: float) -> Dict[str, float]:
+    return {
+        "segment": idx,
+        "bytes": nbytes,
+        "seconds": round(seconds, 3),
+        "mb_per_sec": round(nbytes / 1024 ** 2 / seconds, 3) if seconds > 0 else 0.0,
+    }
+
+
+def _print_segment_stats(stats: List[Dict[str, float]]) -> None:
+    for st in stats:
+        print(
+            f"[下载] 分段 {st['segment'] + 1}/{len(stats)}: {st['bytes'] / 1024 ** 2:.1f} MB, "
+            f"{st['seconds']:.1f} s, {st['mb_per_sec']:.2f} MB/s"
+        )
+
+
+def _probe_range_support(s, url: str, timeout, verify_ssl: bool) -> Optional[int]:
+    """用 Range: bytes=0-0 探测服务器是否支持分段，支持时返回文件总大小，否则 None"""
+    with _connection_slot():
+        with s.get(
+            url,
+            stream=True,
+            timeout=timeout,
+            verify=verify_ssl,
+            headers={"Range": "bytes=0-0"},
+            allow_redirects=True,
+        ) as r:
+            if r.status_code != 206:
+                return None
+            total = _total_size_from_response(r, 0)
+            return total if total and total > 1 else None
+
+
+def _merge_ranges(ranges: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """合并半开区间 [start, end)，返回有序、不重叠的列表"""
+    merged: List[Tuple[int, int]] = []
+    for a, b in sorted(r for r in ranges if r[1] > r[0]):
+        if merged and a <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], b))
+        else:
+            merged.append((a, b))
+    return merged
+
+
+def _missing_ranges(start: int, end: int, done: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """[start, end) 中尚未被 done（已合并）覆盖的部分"""
+    missing = []
+    pos = start
+    for a, b in done:
+        if b <= pos or a >= end:
+            continue
+        if a > pos:
+            missing.append((pos, a))
+        pos = max(pos, b)
+    if pos < end:
+        missing.append((pos, end))
+    return missing
+
+
+def _load_segment_state(state_path: str, part_path: str, total: int) -> List[Tuple[int, int]]:
+    """读取分段进度（已完成的字节区间）；文件缺失、损坏或总大小不符时返回 []"""
+    if not (os.path.exists(state_path) and os.path.exists(part_path)):
+        return []
+    try:
+        with open(state_path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get("total") != total or os.path.getsize(part_path) != total:
+            return []
+        return _merge_ranges([(int(a), int(b)) for a, b in state.get("done", [])])
+    except (OSError, ValueError, TypeError):
+        return []
+
+
+def _save_segment_state(state_path: str, total: int, done: List[Tuple[int, int]]) -> None:
+    tmp = state_path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"total": total, "done": done}, f)
+    os.replace(tmp, state_path)
+
+
+def _download_segmented(
+    s,
+    url: str,
+    part_path: str,
+    total: int,
+    segments: int,
+    retries: int,
+    timeout,
+    verify_ssl: bool,
+) -> List[Dict[str, float]]:
+    """
+    把 [0, total) 切成 segments 段并行下载到预分配的 part_path；
+    每段独立重试，并从本段已写入的位置续传。返回每段的吞吐统计。
+    已写完的字节区间记在 part_path + ".json"：进程中断后再次调用只下载缺失的区间；
+    分段失败时 download_zip 用 _segmented_prefix 把连续完成的前缀交给单流续传。
+    """
+    state_path = part_path + ".json"
+    done = _load_segment_state(state_path, part_path, total)
+    if done:
+        print(f"[下载] 分段续传：已完成 {sum(b - a for a, b in done)}/{total} 字节")
+    else:
+        with open(part_path, "wb") as f:
+            f.truncate(total)
+        _save_segment_state(state_path, total, [])
+    state_lock = threading.Lock()
+
+    def _mark_done(a: int, b: int) -> None:
+        nonlocal done
+        if b <= a:
+            return
+        with state_lock:
+            done = _merge_ranges(done + [(a, b)])
+            _save_segment_state(state_path, total, done)
+
+    step = -(-total // segments)
+    bounds = [(i, i * step, min(total, (i + 1) * step) - 1) for i in range(segments) if i * step < total]
+    # 每段只下载其中尚未完成的子区间
+    work = [(idx, a, b - 1) for idx, start, end in bounds for a, b in _missing_ranges(start, end + 1, done)]
+
+    def _fetch(idx: int, start: int, end: int) -> Dict[str, float]:
+        pos = start
+        t0 = time.monotonic()
+        last_err = None
+        try:
+            for attempt in range(1, retries + 1):
+                try:
+                    with _connection_slot():
+                        with s.get(
+                            url,
+                            stream=True,
+                            timeout=timeout,
+                            verify=verify_ssl,
+                            headers={"Range": f"bytes={pos}-{end}"},
+                            allow_redirects=True,
+                        ) as r:
+                            if r.status_code != 206:
+                                raise requests.exceptions.RequestException(f"分段请求未返回 206：{r.status_code}")
+                            with open(part_path, "r+b") as f:
+                                f.seek(pos)
+                                for chunk in r.iter_content(chunk_size=1024 * 256):
+                                    if chunk:
+                                        _LIMITER.consume(len(chunk))
+                                        f.write(chunk)
+                                        pos += len(chunk)
+                    if pos != end + 1:
+                        raise requests.exceptions.ChunkedEncodingError(f"分段不完整：{pos - start}/{end - start + 1} 字节")
+                    return _segment_stat(idx, end - start + 1, time.monotonic() - t0)
+                except requests.exceptions.RequestException as e:
+                    last_err = e
+                    print(f"[下载重试] 分段 {idx + 1}/{len(bounds)} 第 {attempt}/{retries} 次失败：{e}")
+                    time.sleep(2 * attempt)
+            raise Exception(f"分段 {idx + 1}/{len(bounds)} 下载失败：{last_err}")
+        finally:
+            # 成功或失败都登记已写入的部分
+            _mark_done(start, pos)
+
+    with ThreadPoolExecutor(max_workers=max(1, len(work))) as ex:
+        futures = [ex.submit(_fetch, *w) for w in work]
+        return [f.result() for f in futures]
+
+
+def _segmented_prefix(part_path: str) -> int:
+    """分段下载失败后：从 0 开始连续完成的字节数（无进度文件时为 0）"""
+    try:
+        with open(part_path + ".json", "r", encoding="utf-8") as f:
+            done = _merge_ranges([(int(a), int(b)) for a, b in json.load(f).get("done", [])])
+    except (OSError, ValueError, TypeError):
+        return 0
+    return done[0][1] if done and done[0][0] == 0 else 0
+
+
+def _remove_segment_files(seg_part: str) -> None:
+    for path in (seg_part, seg_part + ".json"):
+        if os.path.exists(path):
+            os.remove(path)
+
 
 def download_zip(
     full_zip_url: str,
@@ -10,22 +295,66 @@ def download_zip(
     timeout=(10, 120),
     verify_ssl: bool = True,
     bypass_proxy: bool = True,   # 新增：是否绕开系统代理（Clash）
-):
+    verify_zip: bool = True,
+    segments: int = 1,
+    min_segment_bytes: int = 8 * 1024 * 1024,
+) -> List[Dict[str, float]]:
+    """
+    下载 zip：
+    - 先写到 zip_path + ".part"；出错重试时用 Range 请求从已下载的字节处续传
+    - 服务器不支持 Range（返回 200）时自动从头下载
+    - 下载完成后做 zip 完整性校验（verify_zip），通过才原子地 os.replace 到 zip_path；
+      校验失败删除 .part 并重新下载
+    - segments>1 且服务器支持 Range、文件足够大（每段 >= min_segment_bytes）时，
+      并行下载 N 个字节区间到预分配文件（.segpart，已完成区间记在 .segpart.json，中断后只补缺失区间）；
+      不满足条件则单流下载；分段失败时把从 0 开始连续完成的前缀转成 .part，由单流从该处续传
+    - 所有下载流共享进程级带宽/连接数上限（configure_download_limits）
+    - 返回 403/404/410（URL 过期或对象已删除）时不重试，直接抛 ZipUrlGoneError
+    返回每个分段（单流时为 1 段）的吞吐统计：segment/bytes/seconds/mb_per_sec
+    """
     os.makedirs(os.path.dirname(zip_path), exist_ok=True)
+    part_path = zip_path + ".part"
 
     last_err = None
-    for attempt in range(1, retries + 1):
-        try:
-            with requests.Session() as s:
-                # 关键：绕开系统代理（HTTP(S)_PROXY / ALL_PROXY）
-                if bypass_proxy:
-                    s.trust_env = False
-                    s.proxies = {}  # 双保险
+    # 默认用共享连接池 session（已绕开系统代理，keep-alive 复用连接）；
+    # bypass_proxy=False 时才单独建一个信任环境变量代理的 session
+    with (nullcontext(get_session()) if bypass_proxy else requests.Session()) as s:
+        if segments > 1 and not os.path.exists(part_path):
+            seg_part = zip_path + ".segpart"
+            try:
+                total = _probe_range_support(s, full_zip_url, timeout, verify_ssl)
+                n = min(segments, total // max(1, min_segment_bytes)) if total else 0
+                if n >= 2:
+                    stats = _download_segmented(s, full_zip_url, seg_part, total, n, retries, timeout, verify_ssl)
+                    if verify_zip:
+                        check_zip_integrity(seg_part)
+                    os.replace(seg_part, zip_path)
+                    _remove_segment_files(seg_part)
+                    _print_segment_stats(stats)
+                    return stats
+            except ZipIntegrityError as e:
+                print(f"[下载] 分段下载的 zip 校验失败，回退单流重新下载：{e}")
+                _remove_segment_files(seg_part)
+            except Exception as e:
+                # 已连续完成的前缀交给单流续传，不从 0 开始
+                prefix = _segmented_prefix(seg_part)
+                if prefix > 0 and os.path.exists(seg_part):
+                    with open(seg_part, "r+b") as f:
+                        f.truncate(prefix)
+                    os.replace(seg_part, part_path)
+                _remove_segment_files(seg_part)
+                print(f"[下载] 分段下载失败，回退单流下载（从 {prefix} 字节处续传）：{e}")
+            # 进程被中断时 .segpart 与 .segpart.json 保留，下次只补缺失的区间
 
-                headers = {"Connection": "close"}
+        for attempt in range(1, retries + 1):
+            try:
+                offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+                headers = {}
+                if offset > 0:
+                    headers["Range"] = f"bytes={offset}-"
 
-                # 如果你想更明确，也可以每次 resolve 走直连 DNS（通常不需要）
-                with s.get(
+                t0 = time.monotonic()
+                with _connection_slot(), s.get(
                     full_zip_url,
                     stream=True,
                     timeout=timeout,
@@ -33,27 +362,174 @@ def download_zip(
                     headers=headers,
                     allow_redirects=True,
                 ) as r:
-                    r.raise_for_status()
-                    with open(zip_path, "wb") as f:
-                        for chunk in r.iter_content(chunk_size=1024 * 256):
-                            if chunk:
-                                f.write(chunk)
-            return
+                    if r.status_code in URL_GONE_STATUS:
+                        # 旧 URL 的 .part 不一定与重新解析得到的 zip 一致，一并删除
+                        if os.path.exists(part_path):
+                            os.remove(part_path)
+                        _remove_segment_files(zip_path + ".segpart")
+                        raise ZipUrlGoneError(f"zip 下载地址已失效 HTTP {r.status_code}：{full_zip_url}")
+                    if r.status_code == 416 and offset > 0:
+                        # 请求的起点已超出文件大小：.part 可能已完整，交给下面的校验判断
+                        total = offset
+                    else:
+                        r.raise_for_status()
+                        if offset > 0 and r.status_code != 206:
+                            print(f"[下载] 服务器不支持断点续传，从头下载：{full_zip_url}")
+                            offset = 0
+                        elif offset > 0:
+                            print(f"[下载] 从 {offset} 字节处续传")
+
+                        total = _total_size_from_response(r, offset)
+                        with open(part_path, "ab" if offset > 0 else "wb") as f:
+                            for chunk in r.iter_content(chunk_size=1024 * 256):
+                                if chunk:
+                                    _LIMITER.consume(len(chunk))
+                                    f.write(chunk)
+
+                size = os.path.getsize(part_path)
+                if total is not None and size != total:
+                    # 连接被提前断开：保留 .part，下次从断点续传
+                    raise requests.exceptions.ChunkedEncodingError(
+                        f"下载不完整：{size}/{total} 字节"
+                    )
+
+                if verify_zip:
+                    check_zip_integrity(part_path)
+                os.replace(part_path, zip_path)
+                stats = [_segment_stat(0, size - offset, time.monotonic() - t0)]
+                _print_segment_stats(stats)
+                return stats
 
-        except requests.exceptions.SSLError as e:
-            last_err = e
-            print(f"[下载重试] SSL错误，第 {attempt}/{retries} 次失败：{e}")
-            time.sleep(2 * attempt)
+            except ZipIntegrityError as e:
+                last_err = e
+                print(f"[下载重试] zip 校验失败，第 {attempt}/{retries} 次：{e}")
+                if os.path.exists(part_path):
+                    os.remove(part_path)
+                time.sleep(2 * attempt)
 
-        except requests.exceptions.RequestException as e:
-            last_err = e
-            print(f"[下载重试] 网络错误，第 {attempt}/{retries} 次失败：{e}")
-            time.sleep(2 * attempt)
+            except requests.exceptions.SSLError as e:
+                last_err = e
+                print(f"[下载重试] SSL错误，第 {attempt}/{retries} 次失败：{e}")
+                time.sleep(2 * attempt)
+
+            except requests.exceptions.RequestException as e:
+                last_err = e
+                print(f"[下载重试] 网络错误，第 {attempt}/{retries} 次失败：{e}")
+                time.sleep(2 * attempt)
 
     raise Exception(f"zip 下载失败，已重试 {retries} 次：{full_zip_url}\n最后错误：{last_err}")
 
 
-def unzip(zip_path: str, out_dir: str):
+# 后处理实际用到的成员：content_list / model.json / images 目录
+POSTPROCESS_MEMBERS = ("*content_list*.json", "*model*.json", "images/")
+
+
+def _member_included(name: str, include: Optional[Sequence[str]]) -> bool:
+    """include 为空表示全部；以 "/" 结尾的项按目录匹配（任意层级），其余按 fnmatch 匹配成员名"""
+    if not include:
+        return True
+    for pat in include:
+        if pat.endswith("/"):
+            if ("/" + name).find("/" + pat) >= 0:
+                return True
+        elif fnmatch.fnmatch(name.lower(), pat.lower()):
+            return True
+    return False
+
+
+def _file_crc32(path: str) -> int:
+    crc = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            crc = zlib.crc32(chunk, crc)
+    return crc & 0xFFFFFFFF
+
+
+_WINDOWS_ILLEGAL = str.maketrans(':<>|"?*', "_______")
+
+
+def _member_target_path(out_dir: str, name: str) -> str:
+    """
+    成员解压后的实际路径：与 ZipFile.extract 同样的清理规则
+    （去盘符 / 绝对路径前缀 / "." ".." 与空段，Windows 上替换非法字符并去掉段尾的 "."），
+    保证增量校验与清单指向的正是 extract 写出的文件，且不会越出 out_dir。
+    清理后为空（如 "../"）时返回 ""。
+    """
+    arcname = name.replace("/", os.path.sep)
+    if os.path.altsep:
+        arcname = arcname.replace(os.path.altsep, os.path.sep)
+    arcname = os.path.splitdrive(arcname)[1]
+    parts = [x for x in arcname.split(os.path.sep) if x not in ("", os.path.curdir, os.path.pardir)]
+    if os.path.sep == "\\":
+        parts = [x.translate(_WINDOWS_ILLEGAL).rstrip(".") for x in parts]
+        parts = [x for x in parts if x]
+    if not parts:
+        return ""
+    return os.path.normpath(os.path.join(out_dir, *parts))
+
+
+def _unchanged_on_disk(info: zipfile.ZipInfo, dst: str) -> bool:
+    """磁盘上已有同名文件，且大小、CRC 与 zip 成员一致"""
+    try:
+        if os.path.getsize(dst) != info.file_size:
+            return False
+    except OSError:
+        return False
+    return _file_crc32(dst) == info.CRC
+
+
+def unzip(
+    zip_path: str,
+    out_dir: str,
+    include: Optional[Sequence[str]] = None,
+    workers: int = 1,
+    parallel_min_bytes: int = 32 * 1024 * 1024,
+) -> List[Dict[str, Any]]:
+    """
+    解压 zip 到 out_dir：
+    - include：只解压匹配的成员（如 POSTPROCESS_MEMBERS）；为空则全部解压
+    - 增量：磁盘上已有且大小/CRC 一致的成员直接跳过
+    - workers>1 且待解压总量 >= parallel_min_bytes 时用线程池并行解压
+    返回清单（按 zip 内顺序）：每项含 name / path / size / crc / extracted（本次是否写盘），
+    后续阶段可直接据此定位文件，不必再遍历目录。
+    """
     os.makedirs(out_dir, exist_ok=True)
     with zipfile.ZipFile(zip_path, "r") as zf:
-        zf.extractall(out_dir)
\ No newline at end of file
+        manifest: List[Dict[str, Any]] = []
+        todo: List[Tuple[zipfile.ZipInfo, Dict[str, Any]]] = []
+        for info in zf.infolist():
+            if info.is_dir() or not _member_included(info.filename, include):
+                continue
+            path = _member_target_path(out_dir, info.filename)
+            if not path:
+                # 名字清理后为空，ZipFile.extract 也无法写出
+                continue
+            entry = {
+                "name": info.filename,
+                "path": path,
+                "size": info.file_size,
+                "crc": info.CRC,
+                "extracted": False,
+            }
+            manifest.append(entry)
+            if not _unchanged_on_disk(info, entry["path"]):
+                todo.append((info, entry))
+
+        def _extract(item: Tuple[zipfile.ZipInfo, Dict[str, Any]]) -> None:
+            info, entry = item
+            # ZipFile.extract 负责清理成员名（防 ../ 越界、Windows 非法字符）
+            entry["path"] = zf.extract(info, out_dir)
+            entry["extracted"] = True
+
+        todo_bytes = sum(info.file_size for info, _ in todo)
+        if workers > 1 and len(todo) > 1 and todo_bytes >= parallel_min_bytes:
+            # 先建好目录：ZipFile.extract 内部的“判断存在再 makedirs”并发时会冲突
+            for parent in {os.path.dirname(entry["path"]) for _, entry in todo}:
+                os.makedirs(parent, exist_ok=True)
+            with ThreadPoolExecutor(max_workers=min(workers, len(todo))) as ex:
+                list(ex.map(_extract, todo))
+        else:
+            for item in todo:
+                _extract(item)
+
+    return manifest
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import threading
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# 默认每个 host 的连接池大小（main 会按并发配置重新设置）
+DEFAULT_POOL_SIZE = 16
+
+_counter_lock = threading.Lock()
+_counters: Dict[str, int] = {"requests": 0, "new_connections": 0}
+
+
+def _incr(name: str) -> None:
+    with _counter_lock:
+        _counters[name] += 1
+
+
+class _CountingHTTPConnectionPool(HTTPConnectionPool):
+    def _new_conn(self):
+        _incr("new_connections")
+        return super()._new_conn()
+
+    def _make_request(self, *args, **kwargs):
+        _incr("requests")
+        return super()._make_request(*args, **kwargs)
+
+
+class _CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    def _new_conn(self):
+        _incr("new_connections")
+        return super()._new_conn()
+
+    def _make_request(self, *args, **kwargs):
+        _incr("requests")
+        return super()._make_request(*args, **kwargs)
+
+
+class _CountingAdapter(HTTPAdapter):
+    """HTTPAdapter + 连接复用计数（新建连接数 / 请求数）"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _CountingHTTPConnectionPool,
+            "https": _CountingHTTPSConnectionPool,
+        }
+
+
+_session_lock = threading.Lock()
+_session: Optional[requests.Session] = None
+_pool_size = DEFAULT_POOL_SIZE
+
+
+def _build_session(pool_size: int) -> requests.Session:
+    s = requests.Session()
+    # 关键：不要信任环境变量代理（HTTP_PROXY/HTTPS_PROXY/ALL_PROXY）
+    s.trust_env = False
+    s.proxies = {}  # 双保险
+
+    adapter = _CountingAdapter(pool_connections=16, pool_maxsize=pool_size)
+    s.mount("http://", adapter)
+    s.mount("https://", adapter)
+    return s
+
+
+def configure_http_pool(pool_size: int) -> None:
+    """
+    设置共享连接池中每个 host 的最大 keep-alive 连接数（应不小于该 host 上的并发请求数）。
+    已创建的共享 session 会被替换（旧 session 上的连接随之关闭）。
+    """
+    global _session, _pool_size
+    with _session_lock:
+        _pool_size = max(1, int(pool_size))
+        old, _session = _session, None
+    if old is not None:
+        old.close()
+
+
+def get_session() -> requests.Session:
+    """
+    进程级共享的 requests.Session：API 客户端、预签名上传、zip 下载共用，
+    连接 keep-alive 复用，避免每个请求都重新 TCP+TLS 握手。
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = _build_session(_pool_size)
+        return _session
+
+
+def connection_stats() -> Dict[str, int]:
+    """连接复用计数：requests 为发出的请求数，new_connections 为新建连接数，reused 为复用次数"""
+    with _counter_lock:
+        stats = dict(_counters)
+    stats["reused"] = max(0, stats["requests"] - stats["new_connections"])
+    return stats
@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+# 单个文档的处理阶段（按先后顺序）
+STAGE_NEW = "new"                        # 尚未拿到解析结果
+STAGE_PARSED = "parsed"                  # MinerU 已解析完成，拿到 full_zip_url
+STAGE_DOWNLOADED = "downloaded"          # result.zip 已落盘
+STAGE_UNZIPPED = "unzipped"              # 已解压，后处理尚未开始
+STAGE_POSTPROCESSING = "postprocessing"  # 后处理进行中（中断后需重新解压再做）
+STAGE_DONE = "done"                      # 全部完成
+
+STAGES = (
+    STAGE_NEW,
+    STAGE_PARSED,
+    STAGE_DOWNLOADED,
+    STAGE_UNZIPPED,
+    STAGE_POSTPROCESSING,
+    STAGE_DONE,
+)
+
+
+class StageJournal:
+    """
+    持久化的文档处理日志（SQLite），用于批处理中断后续跑：
+    - 以 doc_key（PDF 内容 sha256）为主键：PDF 在后处理中会被改名，路径不可靠
+    - 记录每个文档的阶段、输出目录（含 OUT_DIR 改名后的目录）、full_zip_url、最近一次错误
+    - 线程安全（流水线模式下多个 worker 共用）
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS docs (
+                    doc_key      TEXT PRIMARY KEY,
+                    pdf_path     TEXT NOT NULL,
+                    stage        TEXT NOT NULL,
+                    out_dir      TEXT NOT NULL DEFAULT '',
+                    full_zip_url TEXT NOT NULL DEFAULT '',
+                    last_error   TEXT NOT NULL DEFAULT '',
+                    attempts     INTEGER NOT NULL DEFAULT 0,
+                    updated_at   REAL NOT NULL
+                )
+                """
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def get(self, doc_key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM docs WHERE doc_key = ?", (doc_key,)).fetchone()
+        return dict(row) if row else None
+
+    def update(self, doc_key: str, pdf_path: str, **fields: Any) -> None:
+        """
+        新建或更新一条记录。fields 可含：stage / out_dir / full_zip_url / last_error。
+        切换到新阶段时会清空 last_error（除非同时传入 last_error）；阶段变化时 attempts 归零
+        （attempts 只统计当前阶段的失败次数）。
+        """
+        allowed = {"stage", "out_dir", "full_zip_url", "last_error"}
+        unknown = set(fields) - allowed
+        if unknown:
+            raise ValueError(f"未知字段: {sorted(unknown)}")
+        if "stage" in fields and fields["stage"] not in STAGES:
+            raise ValueError(f"未知阶段: {fields['stage']}")
+        if "stage" in fields and "last_error" not in fields:
+            fields["last_error"] = ""
+
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO docs (doc_key, pdf_path, stage, updated_at) VALUES (?, ?, ?, ?)",
+                (doc_key, pdf_path, STAGE_NEW, now),
+            )
+            cols = ["pdf_path = ?", "updated_at = ?"]
+            params: List[Any] = [pdf_path, now]
+            if "stage" in fields:
+                # SET 中的 stage 取的是更新前的值
+                cols.append("attempts = CASE WHEN stage = ? THEN attempts ELSE 0 END")
+                params.append(fields["stage"])
+            cols += [f"{k} = ?" for k in fields]
+            params += list(fields.values()) + [doc_key]
+            self._conn.execute(f"UPDATE docs SET {', '.join(cols)} WHERE doc_key = ?", params)
+
+    def record_error(self, doc_key: str, pdf_path: str, error: str) -> None:
+        """记录失败（阶段不变，attempts+1），下次运行从该阶段重试"""
+        self.update(doc_key, pdf_path, last_error=str(error))
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE docs SET attempts = attempts + 1 WHERE doc_key = ?", (doc_key,))
+
+    def reset(self, doc_key: str, pdf_path: str, error: str) -> None:
+        """
+        回到 new 阶段（清空 full_zip_url，attempts 随阶段变化归零），下次运行重新上传解析；
+        用于 full_zip_url 已失效、按原阶段重试永远不会成功的情况
+        """
+        self.update(doc_key, pdf_path, stage=STAGE_NEW, full_zip_url="", last_error=str(error))
+
+    def summary(self) -> Dict[str, int]:
+        """各阶段文档数"""
+        with self._lock:
+            rows = self._conn.execute("SELECT stage, COUNT(*) AS n FROM docs GROUP BY stage").fetchall()
+        return {r["stage"]: r["n"] for r in rows}
+
+    def failed(self) -> List[Dict[str, Any]]:
+        """最近一次有错误的文档"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM docs WHERE last_error != '' ORDER BY updated_at DESC"
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+
+def open_journal(cfg) -> Optional[StageJournal]:
+    """按 Config 打开 output_root_dir 下的 journal；未启用时返回 None"""
+    if not cfg.journal_enabled:
+        return None
+    return StageJournal(os.path.join(cfg.output_root_dir, "_journal.sqlite"))
+
+
+def main(argv: List[str]) -> int:
+    """
+    用法：
+      python journal.py          各阶段文档数
+      python journal.py failed   列出最近失败的文档
+    """
+    from config import Config
+
+    journal = open_journal(Config())
+    if journal is None:
+        print("journal 未启用（Config.journal_enabled=False）")
+        return 1
+
+    if len(argv) > 1 and argv[1] == "failed":
+        for r in journal.failed():
+            print(f"[{r['stage']}] attempts={r['attempts']} {r['pdf_path']}\n    {r['last_error']}")
+    else:
+        summary = journal.summary()
+        for stage in STAGES:
+            print(f"{stage:>15}: {summary.get(stage, 0)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -1,30 +1,56 @@
 import os
+import posixpath
+import re
+import shutil
+import threading
+import time
 from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from config import Config, get_token
 from mineru_client import MinerUClient
 
-from utils.io import iter_files, ensure_dir, find_jsons_in_dir, load_json
+from utils.io import iter_files, ensure_dir
 from utils.files import copy_file_to_dir
+from utils.artifact_index import ArtifactIndex
+from utils.zip_source import ZipSource
+from utils.row_writers import normalize_formats
 
-from pdf_rename.content_list_parser import extract_title_and_stdno_from_content_list
 from pdf_rename.renamer import rename_pdf_in_dir, sanitize_filename
 
-from downloader import download_zip, unzip
+from downloader import POSTPROCESS_MEMBERS, ZipUrlGoneError, configure_download_limits, download_zip, unzip
+from http_pool import configure_http_pool, connection_stats
+from journal import STAGE_DONE, STAGE_NEW, STAGE_PARSED, STAGE_DOWNLOADED, STAGE_UNZIPPED, STAGE_POSTPROCESSING
+from journal import StageJournal, open_journal
+from pipeline import Stage, run_stages
+from result_cache import ResultCache, file_sha256, link_or_copy, open_result_cache
+from task_registry import TASK_EXPIRED, open_task_registry
+from clause_db import ClauseDB, open_clause_db
+from run_metrics import STATUS_DONE, STATUS_FAILED, STATUS_SKIPPED, DocMetrics, RunMetrics, format_summary
+from run_metrics import open_run_metrics, timed
 
-from toc_extract.model_parser import extract_titles_by_pattern, clean_toc_list, toc_items_to_rows
-from toc_extract.export_excel import export_rows_to_excel, DEFAULT_COLUMNS
+from toc_extract.model_parser import clean_toc_list, toc_items_to_rows
+from toc_extract.export_excel import export_rows, DEFAULT_COLUMNS
 from toc_extract.content_list_images import (
     rename_images_by_caption_from_content_list,
+    rename_images_by_caption_from_zip,
     collect_images_from_content_list,
+    collect_images_from_media,
 )
+from toc_extract.parsed_document import ParsedDocument
 
 
 def log(step: str, msg: str):
     print(f"[{step}] {msg}")
 
 
-def find_any_model_json(unzip_dir: str) -> str:
+# 后处理导出完成后的回调：(最终 out_dir, toc 行, image 行)
+TablesCallback = Callable[[str, List[Dict[str, Any]], List[Dict[str, Any]]], None]
+
+
+def find_any_model_json(unzip_dir: str, index: Optional[ArtifactIndex] = None) -> str:
+    if index is not None:
+        return index.model_json_path()
     for dirpath, _, _ in os.walk(unzip_dir):
         for fn in os.listdir(dirpath):
             low = fn.lower()
@@ -33,113 +59,407 @@ def find_any_model_json(unzip_dir: str) -> str:
     return ""
 
 
-def process_one_pdf(client: MinerUClient, cfg: Config, pdf_path: str):
-    pdf_path = str(pdf_path)
-    stem = Path(pdf_path).stem
-
-    log("FILE", pdf_path)
-    log("STEP", "1/4 上传并解析（MinerU）")
-    result = client.submit_local_file(pdf_path, model_version=cfg.model_version)
-
+def check_parse_result(result: dict) -> str:
+    """
+    校验 MinerU 返回的 file_result，成功返回 full_zip_url，失败返回 ""（已打日志）。
+    """
     if result.get("state") != "done":
         log("FAIL", f"解析失败/未完成: state={result.get('state')} err={result.get('err_msg')}")
-        return
+        return ""
 
     full_zip_url = result.get("full_zip_url")
     if not full_zip_url:
         log("FAIL", "返回结果缺少 full_zip_url，无法下载")
-        return
+        return ""
+    return full_zip_url
+
+
+def open_doc(
+    cfg: Config,
+    pdf_path: str,
+    cache: Optional[ResultCache] = None,
+    journal: Optional[StageJournal] = None,
+    metrics: Optional[RunMetrics] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    为一个 PDF 建立处理上下文（job dict），结合 journal 与结果缓存决定从哪一步开始：
+    - journal 记录已完成：返回 None（跳过）
+    - journal 有未完成阶段：从该阶段续跑（stage/out_dir/full_zip_url 取自 journal）
+    - 结果缓存命中：cached_zip 非空，跳过上传/解析/下载
+    metrics 非空时 job["metrics"] 为本文档的 DocMetrics，各阶段据此计时，结束时写入运行指标。
+    读 PDF / journal / 缓存出错时先把该文档（按 pdf_path 记）计为失败再抛出：调用方拿不到 job，
+    不在这里结束的话它不会出现在运行汇总里。
+    """
+    pdf_path = str(pdf_path)
+    job: Dict[str, Any] = {
+        "pdf_path": pdf_path,
+        "doc_key": "",
+        "cache_key": "",
+        "cached_zip": "",
+        "stage": STAGE_NEW,
+        "full_zip_url": "",
+        "out_dir": "",
+        "attempts": 0,
+        "metrics": metrics.new_doc(pdf_path) if metrics is not None else None,
+    }
+    if cache is None and journal is None:
+        return job
+    try:
+        return _resume_or_lookup(cfg, job, cache, journal)
+    except Exception as e:
+        finish_doc(job, STATUS_FAILED, e)
+        raise
+
 
-    out_dir = os.path.join(cfg.output_root_dir, stem)
-    ensure_dir(out_dir)
+def _resume_or_lookup(
+    cfg: Config,
+    job: Dict[str, Any],
+    cache: Optional[ResultCache],
+    journal: Optional[StageJournal],
+) -> Optional[Dict[str, Any]]:
+    """open_doc 的 journal / 结果缓存部分"""
+    pdf_path = job["pdf_path"]
+    doc_hash = file_sha256(pdf_path)
+    job["doc_key"] = doc_hash
+    if job["metrics"] is not None:
+        job["metrics"].doc_key = doc_hash
 
+    if journal is not None:
+        rec = journal.get(doc_hash)
+        if rec:
+            if rec["stage"] == STAGE_DONE:
+                log("SKIP", f"journal 记录已完成，跳过：{pdf_path} -> {rec['out_dir']}")
+                finish_doc(job, STATUS_SKIPPED)
+                return None
+            job["stage"] = rec["stage"]
+            job["full_zip_url"] = rec["full_zip_url"]
+            job["out_dir"] = rec["out_dir"]
+            job["attempts"] = rec["attempts"]
+            if job["stage"] != STAGE_NEW:
+                log("RESUME", f"从阶段 {job['stage']} 续跑：{pdf_path}")
+        else:
+            journal.update(doc_hash, pdf_path, stage=STAGE_NEW)
+
+    if cache is not None:
+        job["cache_key"] = cache.key_for(pdf_path, cfg.model_version, sha256=doc_hash)
+        if job["stage"] in (STAGE_NEW, STAGE_PARSED):
+            job["cached_zip"] = cache.lookup(job["cache_key"]) or ""
+            if job["cached_zip"]:
+                log("CACHE", f"命中结果缓存，跳过上传/解析/下载：{job['cached_zip']}")
+    return job
+
+
+def needs_remote_parse(job: Dict[str, Any]) -> bool:
+    """是否还需要走 MinerU 上传+解析"""
+    return job["stage"] == STAGE_NEW and not job["cached_zip"]
+
+
+def mark_stage(journal: Optional[StageJournal], job: Dict[str, Any], stage: str, **fields: Any) -> None:
+    job["stage"] = stage
+    job.update(fields)
+    if journal is not None and job["doc_key"]:
+        journal.update(job["doc_key"], job["pdf_path"], stage=stage, **fields)
+
+
+def finish_doc(job: Dict[str, Any], status: str, error: Any = "") -> None:
+    """文档结束（完成/失败/跳过）：写入本次运行的指标（未启用指标时无操作）"""
+    doc_metrics: Optional[DocMetrics] = job.get("metrics")
+    if doc_metrics is not None:
+        doc_metrics.finish(status, error=str(error))
+
+
+def record_failure(journal: Optional[StageJournal], job: Dict[str, Any], error: Any) -> None:
+    if journal is not None and job["doc_key"]:
+        journal.record_error(job["doc_key"], job["pdf_path"], str(error))
+    finish_doc(job, STATUS_FAILED, error)
+
+
+def accept_parse_result(journal: Optional[StageJournal], job: Dict[str, Any], result: dict) -> bool:
+    """校验解析结果；成功则记录 parsed 阶段与 full_zip_url（结果带 poll_timing 时计入排队/解析耗时）"""
+    if job.get("metrics") is not None:
+        job["metrics"].add_poll_timing(result)
+    full_zip_url = check_parse_result(result)
+    if not full_zip_url:
+        record_failure(journal, job, f"state={result.get('state')} err={result.get('err_msg')}")
+        return False
+    mark_stage(journal, job, STAGE_PARSED, full_zip_url=full_zip_url)
+    return True
+
+
+def download_and_unzip(
+    cfg: Config,
+    job: Dict[str, Any],
+    cache: Optional[ResultCache] = None,
+    journal: Optional[StageJournal] = None,
+) -> str:
+    """
+    步骤 2/4 + 3/4：下载 result.zip 到 output_root_dir/<stem>/ 并解压，返回 out_dir。
+    - job["cached_zip"] 非空：直接用缓存 zip（硬链接/复制过来），不下载
+    - 否则下载 job["full_zip_url"]，并在 cache 启用时写入缓存
+    - journal 续跑：已下载的不再下载；已解压的只补写缺失/不一致的成员；后处理中断过的重新解压一份干净的 unzipped
+    - cfg.zip_native=True 时不解压，后处理直接读 zip
+    """
+    pdf_path = job["pdf_path"]
+    out_dir = job["out_dir"] or os.path.join(cfg.output_root_dir, Path(pdf_path).stem)
     zip_path = os.path.join(out_dir, "result.zip")
     unzip_dir = os.path.join(out_dir, "unzipped")
 
-    log("STEP", "2/4 下载 zip")
-    log("URL", full_zip_url)
-    download_zip(
-        full_zip_url,
-        zip_path,
-        retries=cfg.download_retries,
-        timeout=cfg.download_timeout,
-        verify_ssl=cfg.verify_ssl,
-    )
+    metrics: Optional[DocMetrics] = job.get("metrics")
+    stage = job["stage"]
+    have_zip = stage in (STAGE_DOWNLOADED, STAGE_UNZIPPED, STAGE_POSTPROCESSING) and os.path.isfile(zip_path)
+    if not have_zip:
+        if not job["cached_zip"] and not job["full_zip_url"]:
+            raise Exception(f"缺少 full_zip_url 且输出目录无 result.zip：{out_dir}")
+        ensure_dir(out_dir)
 
-    log("STEP", "3/4 解压 zip")
-    unzip(zip_path, unzip_dir)
+        if job["cached_zip"]:
+            log("STEP", "2/4 使用缓存 zip")
+            with timed(metrics, "download", cached=True):
+                link_or_copy(job["cached_zip"], zip_path)
+        else:
+            log("STEP", "2/4 下载 zip")
+            log("URL", job["full_zip_url"])
+            try:
+                with timed(metrics, "download") as info:
+                    segments = download_zip(
+                        job["full_zip_url"],
+                        zip_path,
+                        retries=cfg.download_retries,
+                        timeout=cfg.download_timeout,
+                        verify_ssl=cfg.verify_ssl,
+                        segments=cfg.download_segments,
+                        min_segment_bytes=cfg.download_min_segment_mb * 1024 * 1024,
+                    )
+                    info["bytes"] = sum(seg["bytes"] for seg in segments)
+                    info["segments"] = len(segments)
+            except Exception as e:
+                reset_if_zip_url_gone(cfg, journal, job, e)
+                raise
+            if cache is not None and job["cache_key"]:
+                cache.store(job["cache_key"], zip_path, pdf_path=pdf_path)
+        mark_stage(journal, job, STAGE_DOWNLOADED, out_dir=out_dir)
+        stage = STAGE_DOWNLOADED
+
+    if cfg.zip_native:
+        log("STEP", "3/4 zip 直读模式，跳过解压")
+    else:
+        if stage == STAGE_POSTPROCESSING and os.path.isdir(unzip_dir):
+            # 上次后处理中断：图片可能已被部分改名，重新解压得到干净的原始结构
+            shutil.rmtree(unzip_dir, ignore_errors=True)
+        if stage == STAGE_UNZIPPED and os.path.isdir(unzip_dir):
+            log("STEP", f"3/4 已解压（journal），增量校验：{unzip_dir}")
+        else:
+            log("STEP", "3/4 解压 zip")
+        with timed(metrics, "unzip") as info:
+            manifest = unzip(
+                zip_path,
+                unzip_dir,
+                include=POSTPROCESS_MEMBERS if cfg.unzip_only_needed else None,
+                workers=cfg.unzip_workers,
+            )
+            info["members"] = len(manifest)
+            info["bytes"] = sum(m["size"] for m in manifest if m["extracted"])
+        extracted = sum(1 for m in manifest if m["extracted"])
+        log("UNZIP", f"成员 {len(manifest)} 个，本次写出 {extracted} 个，已存在且一致跳过 {len(manifest) - extracted} 个")
+        job["unzip_manifest"] = manifest
+        mark_stage(journal, job, STAGE_UNZIPPED, out_dir=out_dir)
+
+    job["out_dir"] = out_dir
+    return out_dir
+
+
+def reset_if_zip_url_gone(cfg: Config, journal: Optional[StageJournal], job: Dict[str, Any], error: Exception) -> None:
+    """
+    下载 full_zip_url 失败时判断 URL 是否已失效（403/404/410，或累计失败达到 journal_max_download_attempts）：
+    是则把 journal 退回 new 阶段，下次运行重新上传解析，而不是每次都重试同一个过期 URL
+    """
+    max_attempts = cfg.journal_max_download_attempts
+    gone = isinstance(error, ZipUrlGoneError)
+    if not gone and not (max_attempts > 0 and job["attempts"] + 1 >= max_attempts):
+        return
+    reason = "zip 下载地址已失效" if gone else f"zip 下载已失败 {job['attempts'] + 1} 次"
+    log("RESET", f"{reason}，下次运行重新上传解析：{job['pdf_path']}")
+    job["stage"] = STAGE_NEW
+    job["full_zip_url"] = ""
+    job["attempts"] = 0
+    if journal is not None and job["doc_key"]:
+        journal.reset(job["doc_key"], job["pdf_path"], str(error))
 
-    log("STEP", "4/4 解析 content_list 并重命名 pdf（标准号_标题），并复制到输出目录")
 
+def postprocess_job(
+    cfg: Config,
+    job: Dict[str, Any],
+    journal: Optional[StageJournal] = None,
+    clause_db: Optional[ClauseDB] = None,
+) -> str:
+    """步骤 4/4 + journal 记录 + 写入条款库（clause_db，整个运行共用一个连接）；返回最终输出目录（可能已被 OUT_DIR 改名）"""
+    mark_stage(journal, job, STAGE_POSTPROCESSING, out_dir=job["out_dir"])
+
+    def _on_out_dir(new_out_dir: str):
+        # OUT_DIR 改名后立即落 journal，中断后续跑能找到新目录
+        mark_stage(journal, job, STAGE_POSTPROCESSING, out_dir=new_out_dir)
+
+    metrics: Optional[DocMetrics] = job.get("metrics")
+
+    def _on_tables(out_dir: str, toc_rows: List[Dict[str, Any]], image_rows: List[Dict[str, Any]]):
+        with timed(metrics, "clause_db"):
+            index_clauses(clause_db, job["doc_key"], job["pdf_path"], out_dir, toc_rows, image_rows)
+
+    if cfg.zip_native:
+        out_dir = postprocess_zip(
+            cfg, job["pdf_path"], job["out_dir"], on_out_dir=_on_out_dir, on_tables=_on_tables, metrics=metrics
+        )
+    else:
+        manifest = job.get("unzip_manifest")
+        index = None
+        if manifest is not None:
+            index = ArtifactIndex.from_manifest(os.path.join(job["out_dir"], "unzipped"), manifest)
+        out_dir = postprocess_result(
+            cfg,
+            job["pdf_path"],
+            job["out_dir"],
+            on_out_dir=_on_out_dir,
+            index=index,
+            on_tables=_on_tables,
+            metrics=metrics,
+        )
+    mark_stage(journal, job, STAGE_DONE, out_dir=out_dir)
+    finish_doc(job, STATUS_DONE)
+    return out_dir
+
+
+def process_one_pdf(
+    client: MinerUClient,
+    cfg: Config,
+    pdf_path: str,
+    cache: Optional[ResultCache] = None,
+    journal: Optional[StageJournal] = None,
+    metrics: Optional[RunMetrics] = None,
+    clause_db: Optional[ClauseDB] = None,
+    remote: Optional[Dict[str, Any]] = None,
+):
+    """remote：重新挂接时仍在解析的 registry 条目（见 reattach_in_flight），有则直接等待结果、不重新上传"""
+    pdf_path = str(pdf_path)
+
+    log("FILE", pdf_path)
+    job = open_doc(cfg, pdf_path, cache=cache, journal=journal, metrics=metrics)
+    if job is None:
+        return
+
+    try:
+        if needs_remote_parse(job) and remote is not None:
+            result = wait_resumed(client, remote)
+            if not accept_parse_result(journal, job, result):
+                return
+        elif needs_remote_parse(job):
+            log("STEP", "1/4 上传并解析（MinerU）")
+            batch_id = upload_timed(client, cfg, job)
+            result = client.wait_for_batch_result(batch_id)
+            if not accept_parse_result(journal, job, result):
+                return
+
+        download_and_unzip(cfg, job, cache=cache, journal=journal)
+        postprocess_job(cfg, job, journal=journal, clause_db=clause_db)
+    except Exception as e:
+        record_failure(journal, job, e)
+        raise
+
+
+def upload_timed(client: MinerUClient, cfg: Config, job: Dict[str, Any]) -> str:
+    """上传单个 PDF（计入 upload 阶段耗时与字节数），返回 batch_id"""
+    pdf_path = job["pdf_path"]
+    with timed(job.get("metrics"), "upload", bytes=os.path.getsize(pdf_path)):
+        return client.upload_local_file(pdf_path, model_version=cfg.model_version)
+
+
+def wait_resumed(client: MinerUClient, entry: Dict[str, Any]) -> dict:
+    """等待重新挂接时仍在解析的任务（截止时间从当初提交时算起），返回 file_result"""
+    log("REATTACH", f"等待上次提交的任务：{entry['remote_id']} ({entry['source']})")
+    return client.wait_for_batch_file(entry["remote_id"], entry["result_key"], submitted_at=entry["submitted_at"])
+
+
+# 输出目录改名（找可用名 + rename）的进程内互斥
+_OUT_DIR_LOCK = threading.Lock()
+
+
+def apply_detected_names(
+    cfg: Config,
+    pdf_path: str,
+    out_dir: str,
+    doc: ParsedDocument,
+    on_out_dir: Optional[Callable[[str], None]] = None,
+) -> Tuple[str, Optional[str], Optional[str]]:
+    """
+    按 content_list 识别标准号/标题：重命名源 pdf 并复制到 out_dir，再把 out_dir 改名为 标准号_标题。
+    返回 (最终 out_dir, detected_std_no, detected_title)；输出目录被改名时会先回调 on_out_dir(new_out_dir)。
+    """
     detected_title = None
     detected_std_no = None
     found_any = False
 
-    for dirpath, _, _ in os.walk(unzip_dir):
-        content_list_jsons = find_jsons_in_dir(dirpath, name_contains="content_list", endswith=".json")
-        for p in content_list_jsons:
-            found_any = True
-            log("JSON", p)
-
-            data = load_json(p, default=None)
-            if not data:
-                log("SKIP", "content_list json 读取失败或为空")
-                continue
+    for cl in doc.content_lists:
+        found_any = True
+        log("JSON", cl.source)
+
+        if not cl.data:
+            log("SKIP", "content_list json 读取失败或为空")
+            continue
+
+        title, std_no = cl.title_and_std_no
+        log("INFO", f"title={title}")
+        log("INFO", f"std_no={std_no}")
 
-            title, std_no = extract_title_and_stdno_from_content_list(data)
-            log("INFO", f"title={title}")
-            log("INFO", f"std_no={std_no}")
-
-            if detected_title is None and detected_std_no is None and title and std_no:
-                detected_title = title
-                detected_std_no = std_no
-
-            if title and std_no:
-                ok, msg = rename_pdf_in_dir(os.path.dirname(pdf_path), std_no, title)
-                log("RENAME", msg)
-
-                new_name = sanitize_filename(f"{std_no}_{title}") + ".pdf"
-                candidate = os.path.join(os.path.dirname(pdf_path), new_name)
-                if os.path.isfile(candidate):
-                    ok2, msg2, dst_pdf = copy_file_to_dir(candidate, out_dir, overwrite=True)
-                    log("COPY_PDF", msg2)
-                else:
-                    log("COPY_PDF", f"未找到改名后的 PDF：{candidate}")
+        if detected_title is None and detected_std_no is None and title and std_no:
+            detected_title = title
+            detected_std_no = std_no
+
+        if title and std_no:
+            ok, msg = rename_pdf_in_dir(os.path.dirname(pdf_path), std_no, title)
+            log("RENAME", msg)
+
+            new_name = sanitize_filename(f"{std_no}_{title}") + ".pdf"
+            candidate = os.path.join(os.path.dirname(pdf_path), new_name)
+            if os.path.isfile(candidate):
+                ok2, msg2, dst_pdf = copy_file_to_dir(candidate, out_dir, overwrite=True)
+                log("COPY_PDF", msg2)
             else:
-                log("SKIP", "未识别到 title/std_no，跳过重命名")
+                log("COPY_PDF", f"未找到改名后的 PDF：{candidate}")
+        else:
+            log("SKIP", "未识别到 title/std_no，跳过重命名")
 
     if not found_any:
-        log("WARN", f"解压目录未找到 content_list json：{unzip_dir}")
+        log("WARN", f"未找到 content_list json：{out_dir}")
 
     # 输出文件夹重命名（同 pdf 规则）
     if detected_std_no and detected_title:
         new_folder_name = sanitize_filename(f"{detected_std_no}_{detected_title}")
         new_out_dir = os.path.join(cfg.output_root_dir, new_folder_name)
-        if os.path.abspath(new_out_dir) != os.path.abspath(out_dir):
-            base = new_out_dir
-            k = 1
-            while os.path.exists(new_out_dir):
-                k += 1
-                new_out_dir = f"{base}_{k}"
-            try:
-                os.rename(out_dir, new_out_dir)
+        # 续跑时 out_dir 可能已是改名后的目录（含 _k 后缀），不要再改一次
+        already_renamed = re.fullmatch(re.escape(new_folder_name) + r"(_\d+)?", os.path.basename(out_dir))
+        if not already_renamed and os.path.abspath(new_out_dir) != os.path.abspath(out_dir):
+            # 并发后处理时“找空名 + 改名”须原子，否则两个文档会抢同一个目录名
+            with _OUT_DIR_LOCK:
+                base = new_out_dir
+                k = 1
+                while os.path.exists(new_out_dir):
+                    k += 1
+                    new_out_dir = f"{base}_{k}"
+                try:
+                    os.rename(out_dir, new_out_dir)
+                    renamed = True
+                except Exception as e:
+                    renamed = False
+                    log("OUT_DIR_WARN", f"输出文件夹重命名失败：{out_dir} -> {new_out_dir}, err={e}")
+            if renamed:
                 log("OUT_DIR", f"输出文件夹已重命名：{out_dir} -> {new_out_dir}")
                 out_dir = new_out_dir
-                unzip_dir = os.path.join(out_dir, "unzipped")
-            except Exception as e:
-                log("OUT_DIR_WARN", f"输出文件夹重命名失败：{out_dir} -> {new_out_dir}, err={e}")
+                if on_out_dir is not None:
+                    on_out_dir(out_dir)
 
-    # std_no（同 toc 表）= 标准号_标题（不清洗更可读；若要与文件夹一致可改成 sanitize_filename）
-    if detected_std_no and detected_title:
-        std_no_out = f"{detected_std_no}_{detected_title}"
-        std_title_out = detected_title
-    else:
-        std_no_out = stem
-        std_title_out = ""
+    return out_dir, detected_std_no, detected_title
 
-    # 1) 图片/表格图片重命名
-    log("IMG", "开始按 caption 重命名 images 下图片（支持 image/table）")
-    img_mapping, img_errors = rename_images_by_caption_from_content_list(unzip_dir)
+
+def log_image_errors(img_mapping: Dict[str, str], img_errors: List[str]) -> None:
     log("IMG", f"图片重命名完成，mapping={len(img_mapping)}")
     if img_errors:
         for e in img_errors[:30]:
@@ -147,17 +467,20 @@ def process_one_pdf(client: MinerUClient, cfg: Config, pdf_path: str):
         if len(img_errors) > 30:
             log("IMG_WARN", f"图片重命名错误较多，仅展示前30条，共 {len(img_errors)} 条")
 
-    # 2) 输出 image.xlsx
-    img_items = collect_images_from_content_list(unzip_dir)
+
+def build_image_rows(
+    img_items: List[Dict[str, Any]],
+    img_mapping: Dict[str, str],
+    std_no_out: str,
+    image_location: Callable[[str], str],
+) -> List[Dict[str, Any]]:
+    """image.xlsx 的行；image_location 把（改名后的）相对路径转成 image 列的值"""
     image_rows = []
     for i, it in enumerate(img_items, 1):
         old_rel = it["img_path"]
         # 若已改名，用改名后的相对路径
         new_rel = img_mapping.get(old_rel, old_rel)
 
-        # image 列：写绝对路径（Excel 里可点击打开）
-        image_abs = os.path.join(unzip_dir, new_rel)
-
         caption = (it.get("caption") or "").strip()
         if not caption:
             # 与重命名函数的兜底保持一致
@@ -171,64 +494,540 @@ def process_one_pdf(client: MinerUClient, cfg: Config, pdf_path: str):
                 "image_title": caption,
                 "clause_id": "",     # 暂不自动挂靠条款
                 "clause_text": "",   # 暂不自动挂靠条款
-                "image": image_abs,  # “图片附件”用路径表示
+                "image": image_location(new_rel),  # “图片附件”用路径表示
             }
         )
+    return image_rows
 
-    from toc_extract.image_excel import export_image_rows_with_embedded_images
 
+def export_image_results(
+    cfg: Config,
+    image_rows: List[Dict[str, Any]],
+    out_dir: str,
+    image_reader: Optional[Callable[[str], Optional[bytes]]] = None,
+) -> None:
+    """按 cfg.output_formats 导出图片表：xlsx 嵌图，csv/jsonl/parquet 的 image 列为路径"""
+    from toc_extract.image_excel import export_image_rows, export_image_rows_with_embedded_images
+
+    formats = normalize_formats(cfg.output_formats)
     image_excel_path = os.path.join(out_dir, "image.xlsx")
-    if image_rows:
+    if not image_rows:
+        log("IMG_XLSX", f"未发现图片/表格图片，跳过导出: {image_excel_path}")
+        return
+
+    if "xlsx" in formats:
         export_image_rows_with_embedded_images(
             image_rows,
             image_excel_path,
             sheet_name="images",
             image_display_px=(320, 200),
+            image_reader=image_reader,
+            image_dpi=cfg.image_xlsx_dpi,
+            image_quality=cfg.image_xlsx_quality,
+            image_workers=cfg.image_xlsx_workers,
+            optimize_images=cfg.image_xlsx_optimize,
         )
         log("IMG_XLSX", f"已导出(含图片嵌入): {image_excel_path} (rows={len(image_rows)})")
-    else:
-        log("IMG_XLSX", f"未发现图片/表格图片，跳过导出: {image_excel_path}")
+
+    others = [f for f in formats if f != "xlsx"]
+    if others:
+        paths = export_image_rows(image_rows, image_excel_path, others)
+        log("IMG_XLSX", f"已导出: {', '.join(paths.values())} (rows={len(image_rows)})")
+
+
+def build_toc_rows(
+    raw_items: List[Dict[str, str]],
+    model_json_path: str,
+    std_no_out: str,
+    std_title_out: str,
+    image_files: List[str],
+) -> List[Dict[str, Any]]:
+    """toc_results 的行（clean_toc_list -> toc_items_to_rows，补 model_json_path / image 列）"""
+    rows = toc_items_to_rows(clean_toc_list(raw_items), std_no_out, std_title_out)
+    image_cell = ";".join(sorted(image_files))
+    for r in rows:
+        r["model_json_path"] = model_json_path
+        r["image"] = image_cell
+    return rows
+
+
+def export_toc_results(cfg: Config, toc_rows: List[Dict[str, Any]], out_dir: str) -> None:
+    excel_path = os.path.join(out_dir, "toc_results.xlsx")
+    paths = export_rows(toc_rows, excel_path, columns_order=DEFAULT_COLUMNS, formats=cfg.output_formats)
+    log("TOC", f"已导出: {', '.join(paths.values())}")
+
+
+def index_clauses(
+    db: Optional[ClauseDB],
+    doc_key: str,
+    pdf_path: str,
+    out_dir: str,
+    toc_rows: List[Dict[str, Any]],
+    image_rows: List[Dict[str, Any]],
+) -> None:
+    """把本文档的条款 / 图表行写入全库条款库（db 为 None 表示未启用）；同一文档再次处理时整体替换"""
+    if db is None:
+        return
+    n_clauses, n_images = db.upsert_document(
+        doc_key or os.path.abspath(out_dir), toc_rows, image_rows, pdf_path=pdf_path, out_dir=out_dir
+    )
+    log("DB", f"条款库已更新: clauses={n_clauses} images={n_images} ({db.db_path})")
+
+
+def std_fields(stem: str, detected_std_no: Optional[str], detected_title: Optional[str]) -> Tuple[str, str]:
+    # std_no（同 toc 表）= 标准号_标题（不清洗更可读；若要与文件夹一致可改成 sanitize_filename）
+    if detected_std_no and detected_title:
+        return f"{detected_std_no}_{detected_title}", detected_title
+    return stem, ""
 
 
+def postprocess_result(
+    cfg: Config,
+    pdf_path: str,
+    out_dir: str,
+    on_out_dir: Optional[Callable[[str], None]] = None,
+    index: Optional[ArtifactIndex] = None,
+    on_tables: Optional[TablesCallback] = None,
+    metrics: Optional[DocMetrics] = None,
+) -> str:
+    """
+    步骤 4/4：基于已解压的 out_dir/unzipped 做本地后处理
+    （pdf 重命名、输出目录重命名、图片重命名、image.xlsx、toc_results.xlsx）。
+    index：解压目录的文件索引（如由 unzip 清单构建）；为空时扫描一次目录。
+    返回最终输出目录；输出目录被改名时会先回调 on_out_dir(new_out_dir)。
+    导出完成后回调 on_tables(out_dir, toc_rows, image_rows)（没有 model.json 时 toc_rows 为空）。
+    metrics 非空时各子步骤计时（content_list / image_rename / image_export / toc_parse / toc_export）。
+    """
+    pdf_path = str(pdf_path)
+    stem = Path(pdf_path).stem
+    unzip_dir = os.path.join(out_dir, "unzipped")
+    if index is None:
+        index = ArtifactIndex.scan(unzip_dir)
+
+    log("STEP", "4/4 解析 content_list 并重命名 pdf（标准号_标题），并复制到输出目录")
+
+    # content_list / model.json 各只读一次，后续各步骤共用
+    doc = ParsedDocument.from_index(index)
+    with timed(metrics, "content_list"):
+        load_content_lists(doc)
+    with timed(metrics, "rename_outputs"):
+        out_dir, detected_std_no, detected_title = apply_detected_names(
+            cfg, pdf_path, out_dir, doc, on_out_dir=on_out_dir
+        )
+    unzip_dir = os.path.join(out_dir, "unzipped")
+    index.root = unzip_dir
+    std_no_out, std_title_out = std_fields(stem, detected_std_no, detected_title)
+
+    # 1) 图片/表格图片重命名
+    log("IMG", "开始按 caption 重命名 images 下图片（支持 image/table）")
+    with timed(metrics, "image_rename") as info:
+        img_mapping, img_errors = rename_images_by_caption_from_content_list(unzip_dir, media=doc.iter_media())
+        info["images"] = len(img_mapping)
+    log_image_errors(img_mapping, img_errors)
+
+    # 2) 输出 image.xlsx（image 列：写绝对路径，Excel 里可点击打开）
+    with timed(metrics, "image_export") as info:
+        img_items = collect_images_from_content_list(unzip_dir, media=doc.iter_media())
+        image_rows = build_image_rows(
+            img_items, img_mapping, std_no_out, lambda rel: os.path.join(unzip_dir, rel)
+        )
+        export_image_results(cfg, image_rows, out_dir)
+        info["rows"] = len(image_rows)
+
     # 3) 导出 toc_results.xlsx（保持你原逻辑）
-    model_json_path = find_any_model_json(unzip_dir)
+    toc_rows: List[Dict[str, Any]] = []
+    model_json_path = doc.model_path
+    with timed(metrics, "toc_parse"):
+        toc_candidates = doc.toc_candidates if model_json_path else None
     if not model_json_path:
         log("TOC", f"未找到 model*.json（排除 model_list）：{unzip_dir}")
-        return
-
-    model_data = load_json(model_json_path, default=None)
-    if not model_data:
+    elif toc_candidates is None:
         log("TOC", f"model.json 读取失败或为空：{model_json_path}")
-        return
+    else:
+        # images/ 下的图片名：索引是改名前的快照，套上 mapping 即为当前文件名
+        image_files = [renamed_image_name(fn, img_mapping) for fn in index.image_names()]
+        with timed(metrics, "toc_export") as info:
+            toc_rows = build_toc_rows(toc_candidates, model_json_path, std_no_out, std_title_out, image_files)
+            export_toc_results(cfg, toc_rows, out_dir)
+            info["rows"] = len(toc_rows)
 
-    raw_items = extract_titles_by_pattern(model_data)
-    clean_items = clean_toc_list(raw_items)
-    rows = toc_items_to_rows(clean_items, std_no_out, std_title_out)
+    if on_tables is not None:
+        on_tables(out_dir, toc_rows, image_rows)
+    return out_dir
 
-    images_dir = os.path.join(unzip_dir, "images")
-    image_files = []
-    if os.path.isdir(images_dir):
-        for fn in os.listdir(images_dir):
-            if fn.lower().endswith((".jpg", ".jpeg", ".png", ".bmp", ".gif", ".webp")):
-                image_files.append(fn)
-    image_files.sort()
-    image_cell = ";".join(image_files)
 
-    for r in rows:
-        r["model_json_path"] = model_json_path
-        r["image"] = image_cell
+def load_content_lists(doc: ParsedDocument) -> None:
+    """提前读取 content_list 并解析标题/标准号与图表块（均有缓存，后续步骤直接复用），使其耗时单独计入 content_list 阶段"""
+    for cl in doc.content_lists:
+        if cl.data:
+            cl.title_and_std_no
+            cl.media_blocks
 
-    excel_path = os.path.join(out_dir, "toc_results.xlsx")
-    export_rows_to_excel(rows, excel_path, columns_order=DEFAULT_COLUMNS)
-    log("TOC", f"已导出: {excel_path}")
+
+def renamed_image_name(fn: str, img_mapping: Dict[str, str]) -> str:
+    """images/ 下的文件名经过按 caption 改名后的新文件名（未改名则原样返回）"""
+    return posixpath.basename(img_mapping.get(f"images/{fn}", f"images/{fn}"))
 
 
-def main():
-    cfg = Config()
+def postprocess_zip(
+    cfg: Config,
+    pdf_path: str,
+    out_dir: str,
+    on_out_dir: Optional[Callable[[str], None]] = None,
+    on_tables: Optional[TablesCallback] = None,
+    metrics: Optional[DocMetrics] = None,
+) -> str:
+    """
+    步骤 4/4 的 zip 直读版（cfg.zip_native=True）：不解压，直接从 out_dir/result.zip 随机读取
+    content_list / model.json / 图片，输出与 postprocess_result 相同的 image.xlsx、toc_results.xlsx。
+    - cfg.zip_native_extract_images=True：只把改名后的图片写到 out_dir/images/，image 列为其绝对路径
+    - 否则不落盘任何图片，image 列为 "<result.zip>!/images/xxx" 引用，嵌图直接读 zip
+    """
+    pdf_path = str(pdf_path)
+    stem = Path(pdf_path).stem
+
+    log("STEP", "4/4 直接读取 result.zip 中的 content_list，重命名 pdf（标准号_标题）")
+
+    with ZipSource(os.path.join(out_dir, "result.zip")) as src:
+        index = ArtifactIndex.from_names(src.zip_path, src.names())
+        doc = ParsedDocument.from_zip(src, index)
+        with timed(metrics, "content_list"):
+            load_content_lists(doc)
+
+    # Windows 上不能改名含有打开文件的目录：先关闭 zip 再改 OUT_DIR，之后按新路径重新打开
+    with timed(metrics, "rename_outputs"):
+        out_dir, detected_std_no, detected_title = apply_detected_names(
+            cfg, pdf_path, out_dir, doc, on_out_dir=on_out_dir
+        )
+    std_no_out, std_title_out = std_fields(stem, detected_std_no, detected_title)
+
+    with ZipSource(os.path.join(out_dir, "result.zip")) as src:
+        doc.attach_zip(src)
+
+        # 1) 图片/表格图片重命名：只规划 mapping，需要时按新名字单独写出
+        log("IMG", "开始按 caption 重命名 zip 内图片（支持 image/table）")
+        extract_to = out_dir if cfg.zip_native_extract_images else None
+        if extract_to:
+            # 续跑时清掉上次可能只写了一半的图片
+            shutil.rmtree(os.path.join(out_dir, "images"), ignore_errors=True)
+        with timed(metrics, "image_rename") as info:
+            img_mapping, img_errors = rename_images_by_caption_from_zip(src, extract_to, media=doc.iter_media())
+            info["images"] = len(img_mapping)
+        log_image_errors(img_mapping, img_errors)
+
+        # 2) 输出 image.xlsx
+        with timed(metrics, "image_export") as info:
+            img_items = collect_images_from_media(doc.iter_media())
+            if extract_to:
+                image_rows = build_image_rows(
+                    img_items, img_mapping, std_no_out, lambda rel: os.path.join(out_dir, rel)
+                )
+            else:
+                # 图片未落盘：引用 zip 内的原始成员名（改名只体现在 toc 的 image 列）
+                image_rows = build_image_rows(img_items, {}, std_no_out, src.ref)
+            export_image_results(cfg, image_rows, out_dir, image_reader=src.read_ref)
+            info["rows"] = len(image_rows)
+
+        # 3) 导出 toc_results.xlsx
+        toc_rows: List[Dict[str, Any]] = []
+        with timed(metrics, "toc_parse"):
+            toc_candidates = doc.toc_candidates if doc.model_source else None
+        if not doc.model_source:
+            log("TOC", f"未找到 model*.json（排除 model_list）：{src.zip_path}")
+        elif toc_candidates is None:
+            log("TOC", f"model.json 读取失败或为空：{src.ref(doc.model_source)}")
+        else:
+            image_files = [renamed_image_name(fn, img_mapping) for fn in index.image_names()]
+            with timed(metrics, "toc_export") as info:
+                toc_rows = build_toc_rows(
+                    toc_candidates, src.ref(doc.model_source), std_no_out, std_title_out, image_files
+                )
+                export_toc_results(cfg, toc_rows, out_dir)
+                info["rows"] = len(toc_rows)
+
+    if on_tables is not None:
+        on_tables(out_dir, toc_rows, image_rows)
+    return out_dir
+
+
+def reattach_in_flight(
+    client: MinerUClient,
+    cfg: Config,
+    cache: Optional[ResultCache] = None,
+    journal: Optional[StageJournal] = None,
+    metrics: Optional[RunMetrics] = None,
+    clause_db: Optional[ClauseDB] = None,
+) -> Tuple[List[str], Dict[str, Dict[str, Any]]]:
+    """
+    重新挂接上次运行中已提交、但未拿到结果的任务（每个 batch 只查一次状态，不在这里等待）：
+    - 远端已完成：直接下载 + 后处理，不再重新上传
+    - 仍在排队/解析：放进 resumed，交给正常流程等待结果（同样不重新上传）
+    - 已过期/失败/超时：跳过，交给后续正常流程重新提交
+    返回 (已在此处理完的 PDF 路径, {pdf_path: registry 条目})。
+    """
+    handled: List[str] = []
+    resumed: Dict[str, Dict[str, Any]] = {}
+    for entry, file_result in client.reattach(max_age_sec=cfg.task_expire_hours * 3600):
+        pdf_path = entry["source"]
+        state = file_result.get("state")
+        if entry["kind"] != "batch" or not os.path.isfile(pdf_path):
+            log("REATTACH", f"非本地 PDF 任务或源文件已不存在，跳过：{pdf_path}")
+            continue
+        if state in ("failed", TASK_EXPIRED):
+            log("REATTACH", f"state={state}，稍后重新提交：{pdf_path}")
+            continue
+        if state != "done":
+            log("REATTACH", f"state={state}，仍在解析，稍后继续等待：{pdf_path}")
+            resumed[pdf_path] = entry
+            continue
+
+        log("REATTACH", f"远端已完成，直接下载：{pdf_path}")
+        job = None
+        try:
+            job = open_doc(cfg, pdf_path, cache=cache, journal=journal, metrics=metrics)
+            if job is None:
+                handled.append(pdf_path)
+                continue
+            if needs_remote_parse(job) and not accept_parse_result(journal, job, file_result):
+                continue
+            download_and_unzip(cfg, job, cache=cache, journal=journal)
+            postprocess_job(cfg, job, journal=journal, clause_db=clause_db)
+            handled.append(pdf_path)
+        except Exception as e:
+            log("ERROR", f"{pdf_path} 重新挂接后处理异常: {e}")
+            if job is not None:
+                finish_doc(job, STATUS_FAILED, e)
+    return handled, resumed
+
+
+def run_batched(
+    client: MinerUClient,
+    cfg: Config,
+    pdfs: List[str],
+    cache: Optional[ResultCache] = None,
+    journal: Optional[StageJournal] = None,
+    metrics: Optional[RunMetrics] = None,
+    clause_db: Optional[ClauseDB] = None,
+    resumed: Optional[Dict[str, Dict[str, Any]]] = None,
+):
+    """
+    批量模式：每 submit_batch_size 个 PDF 只申请一次上传链接、并行上传，
+    之后每个轮询周期只查一次 batch 状态；哪个文件先出结果就先下载并后处理哪个。
+    命中结果缓存 / journal 已有解析结果的 PDF 不参与上传；
+    resumed 中（重新挂接时仍在解析）的 PDF 按原 batch_id 继续等待，也不重新上传。
+    """
+    batch_size = min(cfg.submit_batch_size, MinerUClient.MAX_BATCH_FILES)
+    total = len(pdfs)
+    resumed = resumed or {}
+    done = 0
+
+    def _handle(job: Dict[str, Any]):
+        try:
+            download_and_unzip(cfg, job, cache=cache, journal=journal)
+            postprocess_job(cfg, job, journal=journal, clause_db=clause_db)
+        except Exception as e:
+            record_failure(journal, job, e)
+            log("ERROR", f"{job['pdf_path']} 处理异常: {e}")
+
+    def _collect(batch_id: str, by_key: Dict[str, str], jobs: Dict[str, Dict[str, Any]], submitted_at: float):
+        nonlocal done
+        for file_result in client.iter_batch_results(batch_id, data_ids=by_key.keys(), submitted_at=submitted_at):
+            pdf_path = by_key.get(MinerUClient.result_key(file_result), "")
+            done += 1
+            log("PROGRESS", f"{done}/{total}")
+            log("FILE", pdf_path or str(file_result.get("file_name")))
+            if not pdf_path:
+                log("FAIL", f"无法对应到源文件: {file_result.get('file_name')}")
+                continue
+            job = jobs[pdf_path]
+            if accept_parse_result(journal, job, file_result):
+                _handle(job)
+
+    for start in range(0, total, batch_size):
+        chunk: Dict[str, Dict[str, Any]] = {}
+        # 重新挂接的文档：{batch_id: {result_key: pdf_path}}
+        waiting: Dict[str, Dict[str, str]] = {}
+        waiting_jobs: Dict[str, Dict[str, Any]] = {}
+        for p in pdfs[start:start + batch_size]:
+            pdf_path = str(p)
+            try:
+                job = open_doc(cfg, pdf_path, cache=cache, journal=journal, metrics=metrics)
+            except Exception as e:
+                log("ERROR", f"{pdf_path} 读取 journal/缓存异常: {e}")
+                done += 1
+                continue
+            if job is None or not needs_remote_parse(job):
+                done += 1
+                log("PROGRESS", f"{done}/{total}")
+                if job is not None:
+                    log("FILE", pdf_path)
+                    _handle(job)
+                continue
+            entry = resumed.get(pdf_path)
+            if entry is not None:
+                waiting.setdefault(entry["remote_id"], {})[entry["result_key"]] = pdf_path
+                waiting_jobs[pdf_path] = job
+                continue
+            chunk[pdf_path] = job
+
+        for batch_id, by_key in waiting.items():
+            log("REATTACH", f"等待上次提交的 batch：{batch_id}（{len(by_key)} 个文件）")
+            submitted_at = min(resumed[p]["submitted_at"] for p in by_key.values())
+            _collect(batch_id, by_key, waiting_jobs, submitted_at)
+        if not chunk:
+            continue
+
+        log("BATCH", f"{start + 1}-{start + len(chunk)}/{total}")
+        t0 = time.monotonic()
+        submitted_at = time.time()
+        try:
+            batch_id, uploaded = client.upload_local_files(
+                list(chunk.keys()),
+                model_version=cfg.model_version,
+                max_workers=cfg.upload_workers_per_batch,
+            )
+        except Exception as e:
+            log("ERROR", f"批量上传异常: {e}")
+            for job in chunk.values():
+                record_failure(journal, job, e)
+            done += len(chunk)
+            continue
+        # 整批并行上传：每个文档记整批耗时（bytes_per_sec 因此是下限）
+        upload_sec = time.monotonic() - t0
+        uploaded_paths = set(uploaded.values())
+        for pdf_path, job in chunk.items():
+            if job["metrics"] is not None:
+                job["metrics"].add("upload", upload_sec, bytes=os.path.getsize(pdf_path), batch_files=len(chunk))
+            if pdf_path not in uploaded_paths:
+                finish_doc(job, STATUS_FAILED, "上传失败")
+
+        done += len(chunk) - len(uploaded)
+        _collect(batch_id, uploaded, chunk, submitted_at)
+
+
+def run_pipeline(
+    client: MinerUClient,
+    cfg: Config,
+    pdfs: List[str],
+    cache: Optional[ResultCache] = None,
+    journal: Optional[StageJournal] = None,
+    metrics: Optional[RunMetrics] = None,
+    clause_db: Optional[ClauseDB] = None,
+    resumed: Optional[Dict[str, Dict[str, Any]]] = None,
+):
+    """
+    流水线模式：上传 -> 等待解析 -> 下载+解压 -> 本地后处理 四个阶段并发执行，
+    阶段之间用有界队列连接；max_in_flight 限制 MinerU 端同时持有的文档数。
+    命中结果缓存 / journal 已有解析结果的文档跳过上传与等待；
+    resumed 中（重新挂接时仍在解析）的文档跳过上传，直接在等待阶段按原 batch_id 等结果。
+    """
+    resumed = resumed or {}
+    in_flight = threading.BoundedSemaphore(max(1, cfg.max_in_flight))
+    done_count = [0]
+    done_lock = threading.Lock()
+
+    def _finish(pdf_path: str):
+        with done_lock:
+            done_count[0] += 1
+            log("PROGRESS", f"{done_count[0]}/{len(pdfs)} {pdf_path}")
+
+    def _upload(pdf_path: str):
+        pdf_path = str(pdf_path)
+        log("FILE", pdf_path)
+        job = open_doc(cfg, pdf_path, cache=cache, journal=journal, metrics=metrics)
+        if job is None:
+            _finish(pdf_path)
+            return None
+        if not needs_remote_parse(job):
+            return job
+
+        in_flight.acquire()
+        entry = resumed.get(pdf_path)
+        if entry is not None:
+            job["remote"] = entry
+            job["batch_id"] = entry["remote_id"]
+            return job
+        try:
+            log("STEP", "1/4 上传（MinerU）")
+            job["batch_id"] = upload_timed(client, cfg, job)
+        except Exception as e:
+            in_flight.release()
+            # _on_error 拿到的是 pdf_path 而不是 job，指标在这里结束
+            finish_doc(job, STATUS_FAILED, e)
+            raise
+        return job
+
+    def _wait(job):
+        if "batch_id" not in job:
+            return job
+        try:
+            if job.get("remote") is not None:
+                result = wait_resumed(client, job["remote"])
+            else:
+                result = client.wait_for_batch_result(job["batch_id"])
+        finally:
+            in_flight.release()
+        if not accept_parse_result(journal, job, result):
+            _finish(job["pdf_path"])
+            return None
+        return job
+
+    def _download(job):
+        download_and_unzip(cfg, job, cache=cache, journal=journal)
+        return job
+
+    def _post(job):
+        try:
+            postprocess_job(cfg, job, journal=journal, clause_db=clause_db)
+        finally:
+            _finish(job["pdf_path"])
+
+    def _on_error(stage_name: str, job, e: Exception):
+        pdf_path = job["pdf_path"] if isinstance(job, dict) else job
+        log("ERROR", f"{pdf_path} [{stage_name}] 处理异常: {e}")
+        if isinstance(job, dict):
+            record_failure(journal, job, e)
+        if stage_name != "post":
+            _finish(pdf_path)
+
+    stages = [
+        Stage("upload", _upload, workers=cfg.upload_workers, queue_size=cfg.stage_queue_size),
+        # 等待阶段每个文档占一个线程，worker 数与 max_in_flight 对齐
+        Stage("wait", _wait, workers=cfg.max_in_flight, queue_size=cfg.stage_queue_size),
+        Stage("download", _download, workers=cfg.download_workers, queue_size=cfg.stage_queue_size),
+        Stage("post", _post, workers=cfg.post_workers, queue_size=cfg.stage_queue_size),
+    ]
+    run_stages(pdfs, stages, on_error=_on_error)
+
+
+def http_pool_size(cfg: Config) -> int:
+    """
+    共享连接池每个 host 的连接数：取该 host 上可能同时发出的请求数上限
+    （API 轮询/上传按流水线并发算，zip 下载按下载连接数上限算）。
+    """
+    api = cfg.max_in_flight + cfg.upload_workers if cfg.pipeline_enabled else 1
+    upload = max(cfg.upload_workers, cfg.upload_workers_per_batch)
+    return max(api, upload, cfg.download_max_connections)
+
+
+def main(cfg: Optional[Config] = None):
+    cfg = cfg or Config()
     ensure_dir(cfg.output_root_dir)
+    # 输出格式在开始前校验（未知格式 / 缺 pyarrow 时直接报错，而不是处理完第一个文档才失败）
+    log("START", f"输出格式: {', '.join(normalize_formats(cfg.output_formats))}")
+
+    configure_download_limits(cfg.download_max_bytes_per_sec, cfg.download_max_connections)
+    configure_http_pool(http_pool_size(cfg))
 
     token = get_token(cfg)
-    client = MinerUClient(token)
+    client = MinerUClient(
+        token,
+        base_url=cfg.mineru_base_url,
+        poll_interval_sec=cfg.poll_interval_sec,
+        poll_max_interval_sec=cfg.poll_max_interval_sec,
+        task_deadline_sec=cfg.task_deadline_sec,
+        registry=open_task_registry(cfg),
+    )
 
     log("START", f"输入PDF目录: {cfg.input_pdf_dir}")
     log("START", f"输出目录: {cfg.output_root_dir}")
@@ -236,12 +1035,62 @@ def main():
     pdfs = list(iter_files(cfg.input_pdf_dir, suffixes=[".pdf"], recursive=cfg.recursive))
     log("START", f"发现PDF数量: {len(pdfs)}")
 
-    for i, pdf_path in enumerate(pdfs, 1):
-        log("PROGRESS", f"{i}/{len(pdfs)}")
-        try:
-            process_one_pdf(client, cfg, pdf_path)
-        except Exception as e:
-            log("ERROR", f"{pdf_path} 处理异常: {e}")
+    cache = open_result_cache(cfg)
+    if cache is not None:
+        log("START", f"结果缓存: {cache.cache_dir}（{len(cache.entries())} 条）")
+
+    journal = open_journal(cfg)
+    if journal is not None:
+        log("START", f"journal: {journal.db_path} {journal.summary()}")
+
+    metrics = open_run_metrics(cfg)
+    if metrics is not None:
+        log("START", f"运行指标: {metrics.jsonl_path}，textfile: {metrics.textfile}")
+
+    # 条款库整个运行只开一个连接（写入经 ClauseDB 内部的锁串行），结束时关闭
+    clause_db = open_clause_db(cfg)
+    if clause_db is not None:
+        log("START", f"条款库: {clause_db.db_path}")
+
+    resumed: Dict[str, Dict[str, Any]] = {}
+    if client.registry is not None:
+        done_paths, resumed = reattach_in_flight(
+            client, cfg, cache=cache, journal=journal, metrics=metrics, clause_db=clause_db
+        )
+        handled = set(done_paths)
+        if handled:
+            log("START", f"重新挂接已完成 {len(handled)} 个文档")
+            pdfs = [p for p in pdfs if p not in handled]
+        if resumed:
+            log("START", f"重新挂接仍在解析 {len(resumed)} 个文档，将继续等待而不重新上传")
+
+    if cfg.pipeline_enabled:
+        log("START", f"流水线模式: max_in_flight={cfg.max_in_flight}")
+        run_pipeline(
+            client, cfg, pdfs, cache=cache, journal=journal, metrics=metrics, clause_db=clause_db, resumed=resumed
+        )
+    elif cfg.submit_batch_size > 1:
+        log("START", f"批量提交模式: submit_batch_size={cfg.submit_batch_size}")
+        run_batched(
+            client, cfg, pdfs, cache=cache, journal=journal, metrics=metrics, clause_db=clause_db, resumed=resumed
+        )
+    else:
+        for i, pdf_path in enumerate(pdfs, 1):
+            log("PROGRESS", f"{i}/{len(pdfs)}")
+            try:
+                process_one_pdf(
+                    client, cfg, pdf_path, cache=cache, journal=journal, metrics=metrics,
+                    clause_db=clause_db, remote=resumed.get(str(pdf_path)),
+                )
+            except Exception as e:
+                log("ERROR", f"{pdf_path} 处理异常: {e}")
+
+    log("HTTP", f"连接复用统计: {connection_stats()}")
+    if clause_db is not None:
+        clause_db.close()
+    if metrics is not None:
+        for line in format_summary(metrics.close()):
+            log("METRICS", line)
 
 
 if __name__ == "__main__":
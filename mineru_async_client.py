@@ -0,0 +1,249 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import time
+from typing import Dict, Optional, Tuple
+
+import aiohttp
+
+from mineru_client import check_api_payload
+from poll_scheduler import AdaptivePoller, timeout_result, with_poll_timing
+
+
+class AsyncMinerUClient:
+    """
+    MinerUClient 的 asyncio 版本：
+    - submit_url_task / submit_local_file / upload_local_file / 各 wait 方法与同步版同名同义，
+      返回的 file_result dict 与同步版完全一致（共用 check_api_payload）
+    - 所有未完成的 task_id / batch_id 由一个调度协程统一轮询，
+      单进程可同时挂起数百个任务，而不是每个任务占一个线程 sleep
+
+    用法：
+        async with AsyncMinerUClient(token) as client:
+            results = await asyncio.gather(*(client.submit_local_file(p) for p in pdfs))
+    """
+
+    def __init__(
+        self,
+        token,
+        base_url: str = "https://mineru.net/api/v4",
+        poll_interval_sec: float = 2,
+        poll_max_interval_sec: float = 30,
+        task_deadline_sec: float = 0,
+        max_concurrent_requests: int = 16,
+        registry=None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {token}"
+        }
+        self.poll_interval_sec = poll_interval_sec
+        self.poll_max_interval_sec = poll_max_interval_sec
+        self.task_deadline_sec = task_deadline_sec
+        # 可选：task_registry.TaskRegistry，与同步版一样登记提交的任务以便重启后 reattach
+        self.registry = registry
+
+        # 单轮轮询内并发的状态请求上限，避免瞬间打出几百个请求
+        # （Semaphore 延迟到事件循环内创建，兼容 Python 3.9 的 loop 绑定）
+        self.max_concurrent_requests = max(1, max_concurrent_requests)
+        self._request_limit: Optional[asyncio.Semaphore] = None
+
+        # (kind, id) -> 等待该任务结果的 Future；kind in ("task", "batch")
+        self._waiters: Dict[Tuple[str, str], asyncio.Future] = {}
+        # 每个任务自己的轮询节奏与下一次应查询的时刻（time.monotonic）
+        self._pollers: Dict[Tuple[str, str], AdaptivePoller] = {}
+        self._due: Dict[Tuple[str, str], float] = {}
+        self._scheduler: Optional[asyncio.Task] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            # 关键：与同步版一致，不信任环境变量代理（HTTP_PROXY/HTTPS_PROXY/ALL_PROXY）
+            self._session = aiohttp.ClientSession(trust_env=False)
+        return self._session
+
+    async def close(self):
+        if self._scheduler is not None and not self._scheduler.done():
+            self._scheduler.cancel()
+            try:
+                await self._scheduler
+            except asyncio.CancelledError:
+                pass
+        self._scheduler = None
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def _check_response(self, response: aiohttp.ClientResponse, action_name):
+        text = await response.text()
+        return check_api_payload(response.status, text, lambda: json.loads(text), action_name)
+
+    async def _get_data(self, url, action_name):
+        if self._request_limit is None:
+            self._request_limit = asyncio.Semaphore(self.max_concurrent_requests)
+        async with self._request_limit:
+            async with self.session.get(url, headers=self.headers) as res:
+                return await self._check_response(res, action_name)
+
+    # ====== 提交 ======
+
+    async def submit_url_task(self, file_url, model_version="vlm"):
+        url = f"{self.base_url}/extract/task"
+        data = {
+            "url": file_url,
+            "model_version": model_version,
+            "is_ocr": True,
+            "enable_formula": True
+        }
+
+        print(f"1. 正在提交 URL 解析任务: {file_url} ...")
+        async with self.session.post(url, headers=self.headers, json=data) as res:
+            data = await self._check_response(res, "提交URL任务")
+
+        task_id = data["task_id"]
+        print(f"   -> 任务提交成功，Task ID: {task_id}")
+        if self.registry is not None:
+            self.registry.record("task", task_id, "", file_url, model_version)
+        return await self.wait_for_task_result(task_id)
+
+    async def submit_local_file(self, file_path, model_version="vlm"):
+        batch_id = await self.upload_local_file(file_path, model_version=model_version)
+        return await self.wait_for_batch_result(batch_id)
+
+    async def upload_local_file(self, file_path, model_version="vlm"):
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"文件不存在: {file_path}")
+
+        file_name = os.path.basename(file_path)
+
+        print(f"1. 正在申请上传链接: {file_name} ...")
+        url_batch = f"{self.base_url}/file-urls/batch"
+        data = {"files": [{"name": file_name}], "model_version": model_version}
+
+        async with self.session.post(url_batch, headers=self.headers, json=data) as res:
+            res_data = await self._check_response(res, "获取上传链接")
+
+        batch_id = res_data["batch_id"]
+        upload_urls = res_data["file_urls"]
+        if not upload_urls:
+            raise Exception("未获取到有效的上传 URL")
+
+        print(f"2. 正在上传文件 (Batch ID: {batch_id}) ...")
+        await self.upload_file(upload_urls[0], file_path)
+        print("   -> 上传成功，系统将自动开始解析。")
+        if self.registry is not None:
+            self.registry.record("batch", batch_id, file_name, file_path, model_version)
+        return batch_id
+
+    async def upload_file(self, upload_url, file_path):
+        """
+        PUT 上传到预签名 URL：
+        - 不带 Authorization header
+        - 不自动补 Content-Type（预签名校验不含该头，带上反而可能签名失败）
+        - 请求体直接传打开的文件：aiohttp 在线程池里分块读、边读边发，不把整个 PDF 读进内存；
+          文件大小作为 Content-Length（预签名 PUT 不接受 chunked）
+        """
+        with open(file_path, "rb") as f:
+            async with self.session.put(upload_url, data=f, skip_auto_headers=("Content-Type",)) as upload_res:
+                if upload_res.status != 200:
+                    raise Exception(f"文件上传失败 HTTP: {upload_res.status}")
+
+    # ====== 等待（统一调度） ======
+
+    async def wait_for_task_result(self, task_id):
+        return await self._register("task", str(task_id))
+
+    async def wait_for_batch_result(self, batch_id):
+        return await self._register("batch", str(batch_id))
+
+    async def _register(self, kind, obj_id):
+        key = (kind, obj_id)
+        fut = self._waiters.get(key)
+        if fut is None:
+            fut = asyncio.get_running_loop().create_future()
+            self._waiters[key] = fut
+            self._pollers[key] = AdaptivePoller(
+                min_interval=self.poll_interval_sec,
+                max_interval=self.poll_max_interval_sec,
+                deadline_sec=self.task_deadline_sec,
+            )
+            self._due[key] = time.monotonic()
+        if self._scheduler is None or self._scheduler.done():
+            self._scheduler = asyncio.ensure_future(self._poll_loop())
+        return await asyncio.shield(fut)
+
+    async def _poll_loop(self):
+        """
+        唯一的轮询协程：每轮只查询“到点”的任务（各任务间隔由 AdaptivePoller 决定），
+        完成/失败/超时的任务立即 set_result，没有待等待任务时退出。
+        """
+        while self._waiters:
+            now = time.monotonic()
+            keys = [k for k in self._waiters if self._due.get(k, now) <= now]
+            if keys:
+                await asyncio.gather(*(self._poll_one(k) for k in keys))
+                if self._waiters:
+                    print(f"   -> [调度] 处理中任务数: {len(self._waiters)}", flush=True)
+
+            if self._waiters:
+                next_due = min(self._due.get(k, now) for k in self._waiters)
+                await asyncio.sleep(max(0.0, next_due - time.monotonic()))
+
+    def _finish(self, key, result=None, exc=None):
+        fut = self._waiters.pop(key, None)
+        self._pollers.pop(key, None)
+        self._due.pop(key, None)
+        if fut is None or fut.done():
+            return
+        if exc is not None:
+            fut.set_exception(exc)
+        else:
+            if self.registry is not None:
+                kind, obj_id = key
+                self.registry.mark(kind, obj_id, None, result.get("state"))
+            fut.set_result(result)
+
+    async def _poll_one(self, key):
+        kind, obj_id = key
+        fut = self._waiters.get(key)
+        if fut is None:
+            return
+        try:
+            if kind == "task":
+                data = await self._get_data(f"{self.base_url}/extract/task/{obj_id}", "查询任务状态")
+                file_result = data
+                name = obj_id
+            else:
+                data = await self._get_data(f"{self.base_url}/extract-results/batch/{obj_id}", "查询批量状态")
+                file_result = data["extract_result"][0]
+                name = file_result.get("file_name", obj_id)
+        except Exception as e:
+            # 与同步版一致：查询出错即向调用方抛出
+            self._finish(key, exc=e)
+            return
+
+        poller = self._pollers[key]
+        poller.observe(file_result)
+        state = file_result["state"]
+        if state == "done":
+            print(f"[完成] {name} 解析成功!")
+        elif state == "failed":
+            print(f"[失败] {name} 解析失败: {file_result.get('err_msg')}")
+        elif poller.expired():
+            print(f"[超时] {name} 超过截止时间仍未完成: {state}")
+            file_result = timeout_result(file_result, poller.deadline_sec)
+        else:
+            self._due[key] = time.monotonic() + poller.next_delay(file_result)
+            return
+
+        self._finish(key, result=with_poll_timing(file_result, poller))
@@ -1,30 +1,73 @@
-import requests
 import time
 import os
+from concurrent.futures import ThreadPoolExecutor
+
+from http_pool import get_session
+from poll_scheduler import AdaptivePoller, timeout_result, with_poll_timing
+from task_registry import TASK_EXPIRED
+
+
+def check_api_payload(status_code, text, res_json, action_name):
+    """
+    MinerU API 响应的统一校验（同步/异步客户端共用，保证报错与返回值一致）：
+    - HTTP 非 200 -> 抛异常
+    - code != 0   -> 抛异常
+    - 否则返回 data
+    res_json 可以是已解析的 dict，也可以是无参可调用对象（仅在 HTTP 200 时才解析）。
+    """
+    if status_code != 200:
+        raise Exception(f"[{action_name}] HTTP请求失败: {status_code} - {text}")
+    if callable(res_json):
+        res_json = res_json()
+    if res_json.get("code") != 0:
+        raise Exception(f"[{action_name}] API返回错误: {res_json.get('msg')} (Code: {res_json.get('code')})")
+    return res_json["data"]
 
 
 class MinerUClient:
-    def __init__(self, token):
-        self.base_url = "https://mineru.net/api/v4"
+    def __init__(
+        self,
+        token,
+        poll_interval_sec=2,
+        poll_max_interval_sec=30,
+        task_deadline_sec=0,
+        registry=None,
+        base_url="https://mineru.net/api/v4",
+    ):
+        # API 根地址（Config.mineru_base_url）；可指向本地替身 benchmarks.mineru_stub 做离线压测
+        self.base_url = base_url.rstrip("/")
+        # 可选：task_registry.TaskRegistry，登记每个提交的 batch_id/task_id，进程重启后可 reattach
+        self.registry = registry
+        # 轮询节奏：最短/最长间隔与单任务截止时间（0 表示不限），见 poll_scheduler.AdaptivePoller
+        self.poll_interval_sec = poll_interval_sec
+        self.poll_max_interval_sec = poll_max_interval_sec
+        self.task_deadline_sec = task_deadline_sec
         self.headers = {
             "Content-Type": "application/json",
             "Authorization": f"Bearer {token}"
         }
 
-        # 关键：不要信任环境变量代理（HTTP_PROXY/HTTPS_PROXY/ALL_PROXY）
-        self.session = requests.Session()
-        self.session.trust_env = False
-
-        # （可选）你也可以显式清空代理，双保险
-        self.session.proxies = {}
+        # 共享连接池 session（http_pool.get_session）：与上传、zip 下载复用 keep-alive 连接，
+        # 且同样不信任环境变量代理（HTTP_PROXY/HTTPS_PROXY/ALL_PROXY）
+        self.session = get_session()
 
     def _check_response(self, response, action_name):
-        if response.status_code != 200:
-            raise Exception(f"[{action_name}] HTTP请求失败: {response.status_code} - {response.text}")
-        res_json = response.json()
-        if res_json.get("code") != 0:
-            raise Exception(f"[{action_name}] API返回错误: {res_json.get('msg')} (Code: {res_json.get('code')})")
-        return res_json["data"]
+        return check_api_payload(response.status_code, response.text, response.json, action_name)
+
+    def _record_task(self, kind, remote_id, result_key, source, model_version):
+        if self.registry is not None:
+            self.registry.record(kind, remote_id, result_key, source, model_version)
+
+    def _mark_task(self, kind, remote_id, result_key, file_result):
+        if self.registry is not None:
+            self.registry.mark(kind, remote_id, result_key, file_result.get("state"))
+
+    def new_poller(self):
+        return AdaptivePoller(
+            min_interval=self.poll_interval_sec,
+            max_interval=self.poll_max_interval_sec,
+            deadline_sec=self.task_deadline_sec,
+        )
 
     def submit_url_task(self, file_url, model_version="vlm"):
         url = f"{self.base_url}/extract/task"
@@ -41,22 +84,29 @@ class MinerUClient:
 
         task_id = data["task_id"]
         print(f"   -> 任务提交成功，Task ID: {task_id}")
+        self._record_task("task", task_id, "", file_url, model_version)
         return self.wait_for_task_result(task_id)
 
     def wait_for_task_result(self, task_id):
         url = f"{self.base_url}/extract/task/{task_id}"
 
         print(f"2. 开始轮询任务状态 (Task ID: {task_id})...")
+        poller = self.new_poller()
         while True:
             res = self.session.get(url, headers=self.headers)
             data = self._check_response(res, "查询任务状态")
+            poller.observe(data)
 
             state = data["state"]
             if state == "done":
                 print(f"\n[完成] 解析成功!")
+                data = with_poll_timing(data, poller)
+                self._mark_task("task", task_id, "", data)
                 return data
             elif state == "failed":
                 print(f"\n[失败] 解析失败: {data.get('err_msg')}")
+                data = with_poll_timing(data, poller)
+                self._mark_task("task", task_id, "", data)
                 return data
             elif state == "running":
                 progress = data.get("extract_progress", {})
@@ -66,9 +116,22 @@ class MinerUClient:
             else:
                 print(f"\r   -> 当前状态: {state} ...", end="", flush=True)
 
-            time.sleep(2)
+            if poller.expired():
+                print(f"\n[超时] 任务超过截止时间仍未完成: {state}")
+                data = with_poll_timing(timeout_result(data, poller.deadline_sec), poller)
+                self._mark_task("task", task_id, "", data)
+                return data
+            time.sleep(poller.next_delay(data))
 
     def submit_local_file(self, file_path, model_version="vlm"):
+        batch_id = self.upload_local_file(file_path, model_version=model_version)
+        return self.wait_for_batch_result(batch_id)
+
+    def upload_local_file(self, file_path, model_version="vlm"):
+        """
+        只申请上传链接并上传文件，不等待解析结果，返回 batch_id。
+        供流水线模式把“上传”和“等待解析”拆成两个阶段使用。
+        """
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"文件不存在: {file_path}")
 
@@ -94,24 +157,31 @@ class MinerUClient:
                 raise Exception(f"文件上传失败 HTTP: {upload_res.status_code}")
 
         print("   -> 上传成功，系统将自动开始解析。")
-        return self.wait_for_batch_result(batch_id)
+        self._record_task("batch", batch_id, file_name, file_path, model_version)
+        return batch_id
 
     def wait_for_batch_result(self, batch_id):
         url = f"{self.base_url}/extract-results/batch/{batch_id}"
 
         print(f"3. 开始轮询批量任务状态...")
+        poller = self.new_poller()
         while True:
             res = self.session.get(url, headers=self.headers)
             data = self._check_response(res, "查询批量状态")
 
             file_result = data["extract_result"][0]
+            poller.observe(file_result)
             state = file_result["state"]
 
             if state == "done":
                 print(f"\n[完成] {file_result['file_name']} 解析成功!")
+                file_result = with_poll_timing(file_result, poller)
+                self._mark_task("batch", batch_id, None, file_result)
                 return file_result
             elif state == "failed":
                 print(f"\n[失败] {file_result['file_name']} 解析失败: {file_result.get('err_msg')}")
+                file_result = with_poll_timing(file_result, poller)
+                self._mark_task("batch", batch_id, None, file_result)
                 return file_result
             elif state == "running":
                 progress = file_result.get("extract_progress", {})
@@ -121,4 +191,210 @@ class MinerUClient:
             else:
                 print(f"\r   -> 当前状态: {state} ...", end="", flush=True)
 
-            time.sleep(2)
\ No newline at end of file
+            if poller.expired():
+                print(f"\n[超时] {file_result['file_name']} 超过截止时间仍未完成: {state}")
+                file_result = with_poll_timing(timeout_result(file_result, poller.deadline_sec), poller)
+                self._mark_task("batch", batch_id, None, file_result)
+                return file_result
+            time.sleep(poller.next_delay(file_result))
+
+    # ====== 多文件批量提交（/file-urls/batch 一次申请 N 个上传链接） ======
+
+    # MinerU 单个 batch 的文件数上限
+    MAX_BATCH_FILES = 200
+
+    def upload_local_files(self, file_paths, model_version="vlm", max_workers=4):
+        """
+        一次请求申请 N 个上传链接，并行上传，返回 (batch_id, {data_id: file_path})。
+        - data_id 用序号字符串，用于把 extract_result 对回源文件（避免同名文件冲突）
+        - 只返回上传成功的文件；上传失败的会打印并跳过（它们不会出现在后续轮询里）
+        """
+        file_paths = [str(p) for p in file_paths]
+        if not file_paths:
+            raise ValueError("file_paths 为空")
+        if len(file_paths) > self.MAX_BATCH_FILES:
+            raise ValueError(f"单个 batch 最多 {self.MAX_BATCH_FILES} 个文件，当前 {len(file_paths)}")
+        for p in file_paths:
+            if not os.path.exists(p):
+                raise FileNotFoundError(f"文件不存在: {p}")
+
+        files = [
+            {"name": os.path.basename(p), "data_id": str(i)}
+            for i, p in enumerate(file_paths)
+        ]
+
+        print(f"1. 正在批量申请上传链接: {len(files)} 个文件 ...")
+        url_batch = f"{self.base_url}/file-urls/batch"
+        data = {"files": files, "model_version": model_version}
+
+        res = self.session.post(url_batch, headers=self.headers, json=data)
+        res_data = self._check_response(res, "获取上传链接")
+
+        batch_id = res_data["batch_id"]
+        upload_urls = res_data["file_urls"]
+        if len(upload_urls) != len(file_paths):
+            raise Exception(f"上传 URL 数量不匹配: 期望 {len(file_paths)}，实际 {len(upload_urls)}")
+
+        def _put(i):
+            with open(file_paths[i], 'rb') as f:
+                upload_res = self.session.put(upload_urls[i], data=f)
+            if upload_res.status_code != 200:
+                raise Exception(f"文件上传失败 HTTP: {upload_res.status_code}")
+
+        print(f"2. 正在并行上传 {len(file_paths)} 个文件 (Batch ID: {batch_id}) ...")
+        uploaded = {}
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as ex:
+            futures = {i: ex.submit(_put, i) for i in range(len(file_paths))}
+            for i, fut in futures.items():
+                try:
+                    fut.result()
+                    uploaded[str(i)] = file_paths[i]
+                    self._record_task("batch", batch_id, str(i), file_paths[i], model_version)
+                except Exception as e:
+                    print(f"   -> [上传失败] {file_paths[i]}: {e}")
+
+        print(f"   -> 上传完成 {len(uploaded)}/{len(file_paths)}，系统将自动开始解析。")
+        return batch_id, uploaded
+
+    def iter_batch_results(self, batch_id, data_ids=None, submitted_at=None):
+        """
+        轮询整个 batch：每个轮询周期只发一次状态请求，
+        某个文件一旦进入 done/failed 就立即 yield 它的 file_result（每个文件只 yield 一次）。
+        - data_ids: 需要等待的 data_id 集合；None 表示等待 extract_result 里的全部文件
+        - submitted_at: 提交时刻（time.time()）；截止时间从此算起，默认从调用时算起
+        截止时间（task_deadline_sec）对每个 data_id 生效，即使它一直没有出现在 extract_result 里，
+        届时 yield 一个 state=timeout 的 file_result；data_ids=None 且整个 batch 到期仍没有任何结果时直接结束。
+        """
+        url = f"{self.base_url}/extract-results/batch/{batch_id}"
+        pending = set(data_ids) if data_ids is not None else None
+        finished = set()
+        # 每个文件一个轮询节奏（提交即开始计时）；整个 batch 仍然每周期只查一次，间隔取各文件建议的最小值
+        pollers = {}
+        # 最近一次查询到的 file_result（超时时保留其字段）
+        last_results = {}
+        batch_poller = self._poller_since(submitted_at)
+        for key in pending or ():
+            pollers[key] = self._poller_since(submitted_at)
+
+        print(f"3. 开始轮询批量任务状态 (Batch ID: {batch_id}) ...")
+        while pending is None or pending:
+            res = self.session.get(url, headers=self.headers)
+            data = self._check_response(res, "查询批量状态")
+
+            results = data.get("extract_result") or []
+            if pending is None and results:
+                pending = {self.result_key(r) for r in results}
+            if pending is None and batch_poller.expired():
+                print(f"\n[超时] Batch {batch_id} 超过截止时间仍没有任何文件结果")
+                return
+
+            running = 0
+            delays = []
+            current = {self.result_key(r): r for r in results}
+            for key in list(pending or ()):
+                if key in finished:
+                    continue
+                poller = pollers.get(key)
+                if poller is None:
+                    poller = pollers[key] = self._poller_since(submitted_at)
+
+                file_result = current.get(key)
+                if file_result is not None:
+                    last_results[key] = file_result
+                    poller.observe(file_result)
+                    state = file_result.get("state")
+                else:
+                    # 还没出现在 extract_result 里：照样受截止时间约束
+                    state = None
+                    file_result = last_results.get(key) or {"data_id": key}
+
+                name = file_result.get("file_name", key)
+                if state == "done":
+                    print(f"\n[完成] {name} 解析成功!")
+                elif state == "failed":
+                    print(f"\n[失败] {name} 解析失败: {file_result.get('err_msg')}")
+                elif poller.expired():
+                    print(f"\n[超时] {name} 超过截止时间仍未完成: {state or '未出现在结果中'}")
+                    file_result = timeout_result(file_result, poller.deadline_sec)
+                else:
+                    running += 1
+                    delays.append(poller.next_delay(file_result) if state is not None else poller.min_interval)
+                    continue
+
+                file_result = with_poll_timing(file_result, poller)
+                finished.add(key)
+                pending.discard(key)
+                self._mark_task("batch", batch_id, key, file_result)
+                yield file_result
+
+            if pending is None or pending:
+                print(f"\r   -> 批量进度: 已完成 {len(finished)}，处理中 {running} ...", end="", flush=True)
+                time.sleep(min(delays) if delays else self.poll_interval_sec)
+
+    def _poller_since(self, submitted_at=None):
+        """新建轮询节奏；给出提交时刻（time.time()）时，截止时间从提交时算起"""
+        poller = self.new_poller()
+        if submitted_at is not None:
+            poller.started_at -= max(0.0, time.time() - submitted_at)
+        return poller
+
+    @staticmethod
+    def result_key(file_result):
+        data_id = file_result.get("data_id")
+        return str(data_id) if data_id not in (None, "") else file_result.get("file_name")
+
+    # ====== 重新挂接（进程重启后继续等待之前提交的任务） ======
+
+    def reattach(self, max_age_sec=0):
+        """
+        遍历 registry 中尚未拿到终态的任务，每个 batch_id / task_id 只查询一次当前状态（不等待），
+        yield (entry, file_result)：
+        - 提交时间超过 max_age_sec（>0 时）的任务视为结果已过期：标记 expired，
+          yield 一个 state=expired 的 file_result，由调用方决定重新提交
+        - 已 done/failed 的登记终态后 yield；仍在排队/解析（或尚未出现在 extract_result 里）的
+          原样 yield 当前状态，由调用方交给正常流程继续等待（wait_for_batch_file），不重新提交
+        - 查询出错的 batch/task 打印后跳过（仍留在 registry 中，下次启动再查）
+        """
+        if self.registry is None:
+            return
+
+        now = time.time()
+        batches = {}
+        for entry in self.registry.pending():
+            if max_age_sec > 0 and now - entry["submitted_at"] > max_age_sec:
+                self.registry.mark(entry["kind"], entry["remote_id"], entry["result_key"], TASK_EXPIRED)
+                yield entry, {"state": TASK_EXPIRED, "err_msg": "任务提交过久，结果视为过期"}
+                continue
+            if entry["kind"] == "task":
+                print(f"[重新挂接] Task ID: {entry['remote_id']} ({entry['source']})")
+                try:
+                    res = self.session.get(f"{self.base_url}/extract/task/{entry['remote_id']}", headers=self.headers)
+                    data = self._check_response(res, "查询任务状态")
+                except Exception as e:
+                    print(f"[重新挂接] 查询失败，跳过: {e}")
+                    continue
+                if data.get("state") in ("done", "failed"):
+                    self._mark_task("task", entry["remote_id"], "", data)
+                yield entry, data
+                continue
+            batches.setdefault(entry["remote_id"], {})[entry["result_key"]] = entry
+
+        for batch_id, entries in batches.items():
+            print(f"[重新挂接] Batch ID: {batch_id}（{len(entries)} 个文件）")
+            try:
+                res = self.session.get(f"{self.base_url}/extract-results/batch/{batch_id}", headers=self.headers)
+                data = self._check_response(res, "查询批量状态")
+            except Exception as e:
+                print(f"[重新挂接] 查询失败，跳过: {e}")
+                continue
+            current = {self.result_key(r): r for r in data.get("extract_result") or []}
+            for key, entry in entries.items():
+                file_result = current.get(key) or {"data_id": key, "state": "waiting-file"}
+                if file_result.get("state") in ("done", "failed"):
+                    self._mark_task("batch", batch_id, key, file_result)
+                yield entry, file_result
+
+    def wait_for_batch_file(self, batch_id, result_key, submitted_at=None):
+        """等待 batch 中的单个文件（reattach 时仍在解析的任务），返回其终态 file_result（含 timeout）"""
+        for file_result in self.iter_batch_results(batch_id, data_ids=[result_key], submitted_at=submitted_at):
+            return file_result
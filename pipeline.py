@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import queue
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, List, Optional, Sequence
+
+
+# 队列结束标记（每个下游 worker 收到一个后退出）
+_STOP = object()
+
+
+@dataclass
+class Stage:
+    """
+    流水线中的一个阶段：
+    - name: 阶段名（用于日志）
+    - func: 阶段处理函数，输入上一阶段的产出，返回交给下一阶段的对象；
+            返回 None 表示该条目到此结束（失败/跳过），不再往下游传
+    - workers: 该阶段的并发线程数
+    - queue_size: 该阶段输入队列的容量（有界，满了会阻塞上游，形成背压）
+    """
+
+    name: str
+    func: Callable[[Any], Any]
+    workers: int = 1
+    queue_size: int = 8
+
+
+def run_stages(
+    items: Iterable[Any],
+    stages: Sequence[Stage],
+    on_error: Optional[Callable[[str, Any, Exception], None]] = None,
+) -> None:
+    """
+    按阶段并发执行：items -> stages[0] -> stages[1] -> ... -> stages[-1]
+
+    - 每个阶段有自己的 worker 线程数，阶段之间用有界 queue.Queue 连接
+    - 整体吞吐取决于最慢的阶段，而不是所有阶段耗时之和
+    - 单个条目在某阶段抛异常时调用 on_error(stage_name, item, exc) 并丢弃该条目，
+      不影响其它条目
+    - 所有条目流经全部阶段后返回
+    """
+    if not stages:
+        return
+
+    queues: List[queue.Queue] = [queue.Queue(maxsize=max(1, st.queue_size)) for st in stages]
+    threads: List[threading.Thread] = []
+
+    # 每个阶段剩余的存活 worker 数；最后一个退出的 worker 负责给下游发结束标记
+    alive = [max(1, st.workers) for st in stages]
+    alive_lock = threading.Lock()
+
+    def _worker(idx: int) -> None:
+        st = stages[idx]
+        in_q = queues[idx]
+        out_q = queues[idx + 1] if idx + 1 < len(stages) else None
+
+        while True:
+            item = in_q.get()
+            if item is _STOP:
+                break
+            try:
+                out = st.func(item)
+            except Exception as e:  # 单条失败不能拖垮整个阶段
+                if on_error is not None:
+                    on_error(st.name, item, e)
+                continue
+            if out is not None and out_q is not None:
+                out_q.put(out)
+
+        with alive_lock:
+            alive[idx] -= 1
+            last = alive[idx] == 0
+        if last and out_q is not None:
+            for _ in range(max(1, stages[idx + 1].workers)):
+                out_q.put(_STOP)
+
+    for idx, st in enumerate(stages):
+        for k in range(max(1, st.workers)):
+            t = threading.Thread(target=_worker, args=(idx,), name=f"{st.name}-{k + 1}", daemon=True)
+            t.start()
+            threads.append(t)
+
+    first_q = queues[0]
+    for it in items:
+        first_q.put(it)
+    for _ in range(max(1, stages[0].workers)):
+        first_q.put(_STOP)
+
+    for t in threads:
+        t.join()
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import time
+from typing import Any, Dict, Optional
+
+# 超过截止时间仍未出结果的任务，wait 方法返回的 state
+STATE_TIMEOUT = "timeout"
+
+
+class AdaptivePoller:
+    """
+    单个任务的自适应轮询节奏：
+    - pending/排队等无进度状态：从 min_interval 开始按 backoff 倍数逐步拉长间隔
+    - running 且有 extract_progress：按 extracted_pages/total_pages 的推进速度估算剩余时间（ETA），
+      离完成越远轮询越稀疏，接近完成时回落到 min_interval
+    - deadline_sec：从 start() 起超过该时长视为超时（<=0 表示不限）
+    """
+
+    def __init__(
+        self,
+        min_interval: float = 2,
+        max_interval: float = 30,
+        deadline_sec: float = 0,
+        backoff: float = 1.5,
+        eta_fraction: float = 0.5,
+    ):
+        self.min_interval = max(0.0, float(min_interval))
+        self.max_interval = max(self.min_interval, float(max_interval))
+        self.deadline_sec = float(deadline_sec or 0)
+        self.backoff = backoff
+        # 每次等待 ETA 的多少比例后再查（<1 才能在完成前后及时拿到结果）
+        self.eta_fraction = eta_fraction
+
+        self.started_at = time.monotonic()
+        self._delay = self.min_interval
+        # 第一次观察到进度时的 (时间, 已处理页数)，用于估算速度
+        self._first_progress: Optional[tuple] = None
+        # 每种状态第一次 / 最后一次被查询到的时刻，以及最近一次看到的总页数（见 observe / timing）
+        self._first_seen: Dict[str, float] = {}
+        self._last_seen: Dict[str, float] = {}
+        self._total_pages: Optional[int] = None
+
+    def start(self) -> "AdaptivePoller":
+        self.started_at = time.monotonic()
+        self._delay = self.min_interval
+        self._first_progress = None
+        self._first_seen = {}
+        self._last_seen = {}
+        self._total_pages = None
+        return self
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    def expired(self) -> bool:
+        return self.deadline_sec > 0 and self.elapsed() >= self.deadline_sec
+
+    def eta_sec(self, file_result: Dict[str, Any]) -> Optional[float]:
+        """根据 extract_progress 估算剩余秒数；信息不足时返回 None。"""
+        progress = file_result.get("extract_progress") or {}
+        try:
+            current = int(progress.get("extracted_pages") or 0)
+            total = int(progress.get("total_pages") or 0)
+        except (TypeError, ValueError):
+            return None
+        if total <= 0:
+            return None
+
+        now = time.monotonic()
+        if self._first_progress is None:
+            self._first_progress = (now, current)
+            return None
+
+        t0, p0 = self._first_progress
+        done_pages = current - p0
+        if done_pages <= 0 or now <= t0:
+            return None
+        rate = done_pages / (now - t0)
+        return max(0.0, (total - current) / rate)
+
+    def observe(self, file_result: Dict[str, Any]) -> None:
+        """每次查询到 file_result（含终态）都调用：记录状态出现的时刻与总页数"""
+        now = time.monotonic()
+        state = str(file_result.get("state"))
+        self._first_seen.setdefault(state, now)
+        self._last_seen[state] = now
+        try:
+            total = int((file_result.get("extract_progress") or {}).get("total_pages") or 0)
+        except (TypeError, ValueError):
+            total = 0
+        if total > 0:
+            self._total_pages = total
+
+    def timing(self) -> Dict[str, Any]:
+        """
+        客户端观测到的等待拆分（秒，精度受轮询间隔限制）：
+          - wait_sec : 从开始等待到现在
+          - queue_sec: 开始等待 -> 第一次看到 running（没看到 running 时取最后一次看到排队状态的时刻）
+          - parse_sec: 上述时刻 -> 现在
+          - total_pages: 最近一次 extract_progress 的总页数（未知为 None）
+        """
+        now = time.monotonic()
+        running_from = self._first_seen.get("running")
+        if running_from is None:
+            queued = [t for s, t in self._last_seen.items() if s not in ("done", "failed")]
+            running_from = max(queued) if queued else self.started_at
+        return {
+            "wait_sec": round(now - self.started_at, 3),
+            "queue_sec": round(running_from - self.started_at, 3),
+            "parse_sec": round(now - running_from, 3),
+            "total_pages": self._total_pages,
+        }
+
+    def next_delay(self, file_result: Dict[str, Any]) -> float:
+        """根据本次查询到的 file_result 决定下一次轮询前的等待秒数。"""
+        if file_result.get("state") == "running":
+            eta = self.eta_sec(file_result)
+            if eta is not None:
+                self._delay = eta * self.eta_fraction
+            else:
+                self._delay = self._delay * self.backoff
+        else:
+            self._delay = self._delay * self.backoff
+
+        delay = min(self.max_interval, max(self.min_interval, self._delay))
+        self._delay = delay
+
+        # 不要睡过截止时间
+        if self.deadline_sec > 0:
+            delay = min(delay, max(0.0, self.deadline_sec - self.elapsed()))
+        return delay
+
+
+def timeout_result(file_result: Optional[Dict[str, Any]], deadline_sec: float) -> Dict[str, Any]:
+    """
+    构造超时的 file_result：保留最后一次查询到的字段，state 改为 timeout，便于上层重试或跳过。
+    """
+    res = dict(file_result or {})
+    res["last_state"] = res.get("state")
+    res["state"] = STATE_TIMEOUT
+    res["err_msg"] = f"超过截止时间 {deadline_sec:.0f}s 仍未完成"
+    return res
+
+
+def with_poll_timing(file_result: Dict[str, Any], poller: AdaptivePoller) -> Dict[str, Any]:
+    """终态 file_result 附加 poll_timing（见 AdaptivePoller.timing），供运行指标拆分排队 / 解析耗时"""
+    res = dict(file_result)
+    res["poll_timing"] = poller.timing()
+    return res
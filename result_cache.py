@@ -0,0 +1,264 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import threading
+import time
+import zipfile
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.files import file_sha256
+
+
+def link_or_copy(src: str, dst: str) -> None:
+    """优先硬链接（同盘不占额外空间），失败则复制"""
+    if os.path.exists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+class ResultCache:
+    """
+    按 PDF 内容哈希 + model_version 缓存 MinerU 的 result.zip：
+    - 命中时直接复用缓存 zip，跳过上传/等待/下载
+    - 缓存目录下：
+        zips/<key>.zip   缓存的结果 zip
+        index.sqlite     key -> pdf_path, zip_path, size, created_at, last_access
+      （旧版的 index.json 在首次打开时导入，随后改名为 index.json.migrated）
+    - 淘汰策略：超过 max_age_days 的条目删除；总大小超过 max_bytes 时按最久未使用（LRU）删除
+    - 线程安全（流水线模式下多个 worker 共用同一个实例）；index 为 SQLite（WAL），
+      多个进程共用同一缓存目录时各自的写入互不覆盖，命中时只更新一行 last_access
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = 0, max_age_days: float = 0):
+        self.cache_dir = cache_dir
+        self.zip_dir = os.path.join(cache_dir, "zips")
+        self.db_path = os.path.join(cache_dir, "index.sqlite")
+        self.max_bytes = int(max_bytes or 0)
+        self.max_age_days = float(max_age_days or 0)
+
+        self._lock = threading.Lock()
+        os.makedirs(self.zip_dir, exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS entries (
+                    key         TEXT PRIMARY KEY,
+                    pdf_path    TEXT NOT NULL DEFAULT '',
+                    zip_path    TEXT NOT NULL,
+                    size        INTEGER NOT NULL DEFAULT 0,
+                    created_at  REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+        self._migrate_json_index()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _migrate_json_index(self) -> None:
+        """导入旧版 index.json（已存在的 key 不覆盖），导入后改名，避免重复导入"""
+        json_path = os.path.join(self.cache_dir, "index.json")
+        if not os.path.isfile(json_path):
+            return
+        try:
+            with open(json_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception:
+            data = {}
+        rows = [
+            (
+                key,
+                e.get("pdf_path", ""),
+                e.get("zip_path", ""),
+                int(e.get("size", 0)),
+                float(e.get("created_at", 0)),
+                float(e.get("last_access", 0)),
+            )
+            for key, e in (data.items() if isinstance(data, dict) else [])
+            if isinstance(e, dict) and e.get("zip_path")
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO entries (key, pdf_path, zip_path, size, created_at, last_access)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+        os.replace(json_path, json_path + ".migrated")
+
+    # ====== 查询/写入 ======
+
+    @staticmethod
+    def key_for(pdf_path: str, model_version: str, sha256: str = "") -> str:
+        """sha256 可传入已算好的 PDF 哈希，避免重复读文件"""
+        return f"{sha256 or file_sha256(pdf_path)}_{model_version}"
+
+    def lookup(self, key: str) -> Optional[str]:
+        """命中返回缓存 zip 路径，否则 None（缓存文件丢失的条目会被顺手删除）"""
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT zip_path FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            zip_path = row["zip_path"]
+            if not os.path.isfile(zip_path):
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+            return zip_path
+
+    def store(self, key: str, zip_path: str, pdf_path: str = "") -> str:
+        """把下载好的 zip 放进缓存（硬链接/复制），返回缓存内路径，并按策略淘汰"""
+        dst = os.path.join(self.zip_dir, f"{key}.zip")
+        with self._lock:
+            if os.path.abspath(zip_path) != os.path.abspath(dst):
+                link_or_copy(zip_path, dst)
+            now = time.time()
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, pdf_path, zip_path, size, created_at, last_access)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, pdf_path, dst, os.path.getsize(dst), now, now),
+                )
+                self._evict_locked()
+        return dst
+
+    # ====== 淘汰/巡检 ======
+
+    def _remove_locked(self, key: str) -> None:
+        row = self._conn.execute("SELECT zip_path FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return
+        self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+        try:
+            os.remove(row["zip_path"])
+        except OSError:
+            pass
+
+    def _evict_locked(self) -> List[str]:
+        removed: List[str] = []
+        now = time.time()
+
+        if self.max_age_days > 0:
+            cutoff = now - self.max_age_days * 86400
+            for row in self._conn.execute("SELECT key FROM entries WHERE created_at < ?", (cutoff,)).fetchall():
+                self._remove_locked(row["key"])
+                removed.append(row["key"])
+
+        if self.max_bytes > 0:
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total > self.max_bytes:
+                lru = self._conn.execute("SELECT key, size FROM entries ORDER BY last_access").fetchall()
+                for row in lru:
+                    if total <= self.max_bytes:
+                        break
+                    total -= int(row["size"])
+                    self._remove_locked(row["key"])
+                    removed.append(row["key"])
+
+        return removed
+
+    def evict(self) -> List[str]:
+        """按 max_age_days / max_bytes 执行一次淘汰，返回被删除的 key"""
+        with self._lock, self._conn:
+            return self._evict_locked()
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """列出所有缓存条目（按最近使用倒序）"""
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM entries ORDER BY last_access DESC").fetchall()
+        return [dict(r) for r in rows]
+
+    def check(self, remove_broken: bool = False) -> List[Tuple[str, str]]:
+        """
+        巡检缓存：zip 缺失 / 大小不一致 / zip 损坏（testzip）。
+        返回 [(key, 问题描述)]；remove_broken=True 时同时删除问题条目。
+        """
+        problems: List[Tuple[str, str]] = []
+        for entry in self.entries():
+            key = entry["key"]
+            zip_path = entry.get("zip_path", "")
+            if not os.path.isfile(zip_path):
+                problems.append((key, f"缓存文件不存在: {zip_path}"))
+                continue
+            size = os.path.getsize(zip_path)
+            if size != int(entry.get("size", -1)):
+                problems.append((key, f"大小不一致: index={entry.get('size')} actual={size}"))
+                continue
+            try:
+                with zipfile.ZipFile(zip_path, "r") as zf:
+                    bad = zf.testzip()
+                if bad:
+                    problems.append((key, f"zip 成员损坏: {bad}"))
+            except zipfile.BadZipFile as e:
+                problems.append((key, f"zip 损坏: {e}"))
+
+        if remove_broken and problems:
+            with self._lock, self._conn:
+                for key, _ in problems:
+                    self._remove_locked(key)
+        return problems
+
+
+def open_result_cache(cfg) -> Optional[ResultCache]:
+    """按 Config 创建缓存实例；未启用时返回 None"""
+    if not cfg.result_cache_enabled:
+        return None
+    cache_dir = cfg.result_cache_dir or os.path.join(cfg.output_root_dir, "_result_cache")
+    return ResultCache(
+        cache_dir,
+        max_bytes=int(cfg.result_cache_max_gb * 1024 ** 3),
+        max_age_days=cfg.result_cache_max_age_days,
+    )
+
+
+def main(argv: List[str]) -> int:
+    """
+    用法：
+      python result_cache.py list           列出缓存条目
+      python result_cache.py check [--fix]  巡检缓存（--fix 删除损坏条目）
+      python result_cache.py evict          按配置执行一次淘汰
+    """
+    from config import Config
+
+    cmd = argv[1] if len(argv) > 1 else "list"
+    cfg = Config()
+    cache = open_result_cache(cfg)
+    if cache is None:
+        print("结果缓存未启用（Config.result_cache_enabled=False）")
+        return 1
+
+    if cmd == "list":
+        entries = cache.entries()
+        total = 0
+        for e in entries:
+            total += int(e.get("size", 0))
+            last = time.strftime("%Y-%m-%d %H:%M", time.localtime(float(e.get("last_access", 0))))
+            print(f"{e['key'][:16]}…  {int(e.get('size', 0)) / 1024 ** 2:8.1f} MB  {last}  {e.get('pdf_path', '')}")
+        print(f"共 {len(entries)} 条，{total / 1024 ** 3:.2f} GB")
+    elif cmd == "check":
+        problems = cache.check(remove_broken="--fix" in argv)
+        for key, msg in problems:
+            print(f"{key}: {msg}")
+        print(f"问题条目: {len(problems)}")
+    elif cmd == "evict":
+        removed = cache.evict()
+        print(f"已淘汰 {len(removed)} 条")
+    else:
+        print(main.__doc__)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,403 @@
+from __future__ import annotations
+
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+# 文档结束状态
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+STATUS_SKIPPED = "skipped"
+
+# 汇总 / textfile 中按此顺序列出阶段（未列出的阶段排在后面）
+STAGE_ORDER = (
+    "upload",
+    "queue",
+    "parse",
+    "download",
+    "unzip",
+    "content_list",
+    "rename_outputs",
+    "image_rename",
+    "image_export",
+    "toc_parse",
+    "toc_export",
+    "clause_db",
+)
+
+# 吞吐类字段：汇总时与耗时一样给出分位数
+RATE_FIELDS = ("bytes_per_sec", "sec_per_page")
+
+PROM_PREFIX = "standard_extract"
+
+
+class DocMetrics:
+    """
+    单个文档的各阶段耗时（秒）与吞吐：
+      - stage(name, **fields)：计时上下文，yield 一个 dict，可在块内补充 bytes / pages / members 等字段
+      - add(name, seconds, **fields)：直接记一段耗时（同名阶段累加秒数）
+      - finish(status, error)：文档结束时写入所属 RunMetrics（只生效一次）
+    字段里有 bytes 时自动算 bytes_per_sec，有 pages 时算 sec_per_page。
+    """
+
+    def __init__(self, pdf_path: str, doc_key: str = "", run: Optional["RunMetrics"] = None):
+        self.pdf_path = pdf_path
+        self.doc_key = doc_key
+        self.run = run
+        self.finished = False
+        self.started_at = time.time()
+        self._t0 = time.monotonic()
+        self.stages: Dict[str, Dict[str, Any]] = {}
+
+    def add(self, stage: str, seconds: float, **fields: Any) -> None:
+        rec = self.stages.setdefault(stage, {"sec": 0.0})
+        rec["sec"] = round(rec["sec"] + max(0.0, seconds), 4)
+        rec.update({k: v for k, v in fields.items() if v is not None})
+        if rec.get("bytes") and rec["sec"] > 0:
+            rec["bytes_per_sec"] = round(rec["bytes"] / rec["sec"])
+        if rec.get("pages") and rec["sec"] > 0:
+            rec["sec_per_page"] = round(rec["sec"] / rec["pages"], 4)
+
+    @contextmanager
+    def stage(self, name: str, **fields: Any) -> Iterator[Dict[str, Any]]:
+        info = dict(fields)
+        t0 = time.monotonic()
+        try:
+            yield info
+        finally:
+            self.add(name, time.monotonic() - t0, **info)
+
+    def add_poll_timing(self, file_result: Dict[str, Any]) -> None:
+        """客户端附在终态 file_result 上的 poll_timing -> queue / parse 两个阶段"""
+        timing = file_result.get("poll_timing")
+        if not timing:
+            return
+        self.add("queue", timing.get("queue_sec") or 0.0)
+        self.add("parse", timing.get("parse_sec") or 0.0, pages=timing.get("total_pages"))
+
+    def finish(self, status: str, error: str = "") -> None:
+        if self.finished:
+            return
+        self.finished = True
+        if self.run is not None:
+            self.run.record(self, status, error=error)
+
+    def to_record(self, status: str, error: str = "", run_id: str = "") -> Dict[str, Any]:
+        return {
+            "type": "doc",
+            "run_id": run_id,
+            "pdf_path": self.pdf_path,
+            "doc_key": self.doc_key,
+            "status": status,
+            "error": error,
+            "started_at": round(self.started_at, 3),
+            "total_sec": round(time.monotonic() - self._t0, 3),
+            "stages": self.stages,
+        }
+
+
+def timed(metrics: Optional[DocMetrics], stage: str, **fields: Any):
+    """metrics 为 None 时不计时（yield 的 dict 可照常写入，直接丢弃）"""
+    if metrics is None:
+        return nullcontext(dict(fields))
+    return metrics.stage(stage, **fields)
+
+
+def _percentile(sorted_vals: List[float], q: float) -> float:
+    """最近秩分位数（sorted_vals 非空且已排序）"""
+    idx = min(len(sorted_vals) - 1, max(0, int(round(q * len(sorted_vals) + 0.5)) - 1))
+    return sorted_vals[idx]
+
+
+def _dist(values: Iterable[float]) -> Optional[Dict[str, float]]:
+    vals = sorted(v for v in values if v is not None)
+    if not vals:
+        return None
+    return {
+        "count": len(vals),
+        "sum": round(sum(vals), 3),
+        "p50": round(_percentile(vals, 0.5), 4),
+        "p95": round(_percentile(vals, 0.95), 4),
+        "max": round(vals[-1], 4),
+    }
+
+
+def _stage_sort_key(name: str):
+    return (STAGE_ORDER.index(name) if name in STAGE_ORDER else len(STAGE_ORDER), name)
+
+
+def summarize(records: List[Dict[str, Any]], slowest: int = 10) -> Dict[str, Any]:
+    """
+    【输入】
+      - records: 文档记录（DocMetrics.to_record 的结果，或从 JSONL 读回的 type=doc 行）
+      - slowest: 列出总耗时最长的前 N 个文档
+
+    【输出】
+      - dict: 各状态文档数、运行墙钟时间与 docs_per_min、文档总耗时分布、
+              每个阶段的耗时分布（及 bytes_per_sec / sec_per_page 分布）、最慢文档及其耗时最多的阶段
+    """
+    timed_recs = [r for r in records if r.get("status") != STATUS_SKIPPED]
+    status: Dict[str, int] = {}
+    for r in records:
+        status[r.get("status", "")] = status.get(r.get("status", ""), 0) + 1
+
+    wall = 0.0
+    if records:
+        start = min(r["started_at"] for r in records)
+        end = max(r["started_at"] + r["total_sec"] for r in records)
+        wall = max(0.0, end - start)
+
+    stage_names = sorted({s for r in timed_recs for s in r.get("stages", {})}, key=_stage_sort_key)
+    stages: Dict[str, Any] = {}
+    for name in stage_names:
+        recs = [r["stages"][name] for r in timed_recs if name in r.get("stages", {})]
+        entry: Dict[str, Any] = {"sec": _dist(x.get("sec") for x in recs)}
+        for field in RATE_FIELDS:
+            d = _dist(x.get(field) for x in recs)
+            if d is not None:
+                entry[field] = d
+        stages[name] = entry
+
+    slow = sorted(timed_recs, key=lambda r: r.get("total_sec", 0), reverse=True)[: max(0, slowest)]
+    done = status.get(STATUS_DONE, 0)
+    return {
+        "docs": status,
+        "wall_sec": round(wall, 3),
+        "docs_per_min": round(done / wall * 60, 2) if wall > 0 else None,
+        "total_sec": _dist(r.get("total_sec") for r in timed_recs),
+        "stages": stages,
+        "slowest": [
+            {
+                "pdf_path": r.get("pdf_path"),
+                "status": r.get("status"),
+                "total_sec": r.get("total_sec"),
+                "top_stages": [
+                    (name, st.get("sec"))
+                    for name, st in sorted(r.get("stages", {}).items(), key=lambda kv: kv[1].get("sec", 0), reverse=True)[:3]
+                ],
+            }
+            for r in slow
+        ],
+    }
+
+
+def format_summary(summary: Dict[str, Any]) -> List[str]:
+    """汇总 -> 可读的多行文本（日志用）"""
+    lines = [
+        f"文档 {summary['docs']}，墙钟 {summary['wall_sec']:.1f}s，{summary['docs_per_min']} docs/min",
+    ]
+    total = summary.get("total_sec")
+    if total:
+        lines.append(f"单文档总耗时 p50={total['p50']:.2f}s p95={total['p95']:.2f}s max={total['max']:.2f}s")
+    for name, st in summary["stages"].items():
+        sec = st["sec"]
+        extra = ""
+        if "bytes_per_sec" in st:
+            extra += f"  吞吐 p50={st['bytes_per_sec']['p50'] / 1024 ** 2:.2f}MB/s p95={st['bytes_per_sec']['p95'] / 1024 ** 2:.2f}MB/s"
+        if "sec_per_page" in st:
+            extra += f"  每页 p50={st['sec_per_page']['p50']:.3f}s p95={st['sec_per_page']['p95']:.3f}s"
+        lines.append(
+            f"{name:<15} n={sec['count']:<5} sum={sec['sum']:>10.1f}s p50={sec['p50']:>8.3f}s p95={sec['p95']:>8.3f}s{extra}"
+        )
+    for i, r in enumerate(summary.get("slowest", []), 1):
+        tops = ", ".join(f"{n}={s:.1f}s" for n, s in r["top_stages"])
+        lines.append(f"最慢 #{i}: {r['total_sec']:.1f}s [{r['status']}] {r['pdf_path']} ({tops})")
+    return lines
+
+
+def _prom_escape(v: str) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def render_prometheus(summary: Dict[str, Any], run_id: str = "") -> str:
+    """汇总 -> Prometheus 文本格式（node_exporter textfile collector 可直接采集）"""
+    p = PROM_PREFIX
+    out: List[str] = []
+
+    def summary_metric(name: str, help_text: str, items: List[tuple]) -> None:
+        if not items:
+            return
+        out.append(f"# HELP {p}_{name} {help_text}")
+        out.append(f"# TYPE {p}_{name} summary")
+        for stage, d in items:
+            lbl = f'stage="{_prom_escape(stage)}",' if stage else ""
+            out.append(f'{p}_{name}{{{lbl}quantile="0.5"}} {d["p50"]}')
+            out.append(f'{p}_{name}{{{lbl}quantile="0.95"}} {d["p95"]}')
+            sel = f"{{{lbl.rstrip(',')}}}" if lbl else ""
+            out.append(f"{p}_{name}_sum{sel} {d['sum']}")
+            out.append(f"{p}_{name}_count{sel} {d['count']}")
+
+    stages = summary["stages"]
+    summary_metric("stage_seconds", "Per-document stage duration in the current run", [(n, s["sec"]) for n, s in stages.items()])
+    summary_metric(
+        "stage_bytes_per_second",
+        "Per-document throughput of upload / download / unzip",
+        [(n, s["bytes_per_sec"]) for n, s in stages.items() if "bytes_per_sec" in s],
+    )
+    summary_metric(
+        "parse_seconds_per_page",
+        "Remote parse time per page (client-observed)",
+        [(n, s["sec_per_page"]) for n, s in stages.items() if "sec_per_page" in s],
+    )
+    if summary.get("total_sec"):
+        summary_metric("doc_seconds", "End-to-end time per document", [("", summary["total_sec"])])
+
+    out.append(f"# HELP {p}_docs Documents finished in the current run by status")
+    out.append(f"# TYPE {p}_docs gauge")
+    for st, n in sorted(summary["docs"].items()):
+        out.append(f'{p}_docs{{status="{_prom_escape(st)}"}} {n}')
+    out.append(f"# HELP {p}_run_docs_per_minute Completed documents per minute in the current run")
+    out.append(f"# TYPE {p}_run_docs_per_minute gauge")
+    out.append(f"{p}_run_docs_per_minute {summary['docs_per_min'] or 0}")
+    out.append(f"# HELP {p}_run_wall_seconds Wall time covered by the current run")
+    out.append(f"# TYPE {p}_run_wall_seconds gauge")
+    out.append(f"{p}_run_wall_seconds {summary['wall_sec']}")
+    # run_id 只放在 info 指标上：其余序列跨运行保持同一组标签
+    out.append(f"# HELP {p}_run_info Current run (value is always 1)")
+    out.append(f"# TYPE {p}_run_info gauge")
+    out.append(f'{p}_run_info{{run_id="{_prom_escape(run_id)}"}} 1')
+    out.append(f"# HELP {p}_last_update_timestamp_seconds Last time the textfile was written")
+    out.append(f"# TYPE {p}_last_update_timestamp_seconds gauge")
+    out.append(f"{p}_last_update_timestamp_seconds {time.time():.0f}")
+    return "\n".join(out) + "\n"
+
+
+def write_textfile(path: str, text: str) -> None:
+    """原子写（tmp + replace），采集方不会读到半个文件"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+class RunMetrics:
+    """
+    一次运行的指标收集：
+    - 每个文档结束时 record() 追加一行 JSONL（metrics_dir/run_<run_id>.jsonl）
+    - Prometheus textfile 按 textfile_interval_sec 限频刷新（重新汇总要遍历全部记录，不能每个文档都做）
+    - close() 追加一行 type=summary 的汇总（各阶段 p50/p95、最慢文档）并写最终 textfile，返回该汇总
+    线程安全：流水线模式下各阶段线程可并发 record；汇总与写 textfile 在锁外进行，不阻塞其它线程记录。
+    """
+
+    def __init__(
+        self,
+        metrics_dir: str,
+        textfile: str = "",
+        run_id: str = "",
+        slowest: int = 10,
+        textfile_interval_sec: float = 15,
+    ):
+        self.run_id = run_id or time.strftime("%Y%m%d_%H%M%S")
+        self.metrics_dir = metrics_dir
+        self.jsonl_path = os.path.join(metrics_dir, f"run_{self.run_id}.jsonl")
+        self.textfile = textfile or os.path.join(metrics_dir, f"{PROM_PREFIX}.prom")
+        self.slowest = slowest
+        self.textfile_interval_sec = textfile_interval_sec
+        os.makedirs(metrics_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        # 同一时刻只有一个线程写 textfile；写完 close() 的最终版本后不再刷新
+        self._write_lock = threading.Lock()
+        self._closed = False
+        self._next_write = 0.0
+        self._records: List[Dict[str, Any]] = []
+        self._f = open(self.jsonl_path, "a", encoding="utf-8")
+
+    def new_doc(self, pdf_path: str, doc_key: str = "") -> DocMetrics:
+        return DocMetrics(pdf_path, doc_key, run=self)
+
+    def record(self, doc: DocMetrics, status: str, error: str = "") -> Dict[str, Any]:
+        rec = doc.to_record(status, error=error, run_id=self.run_id)
+        line = json.dumps(rec, ensure_ascii=False)
+        snapshot = None
+        with self._lock:
+            self._records.append(rec)
+            if not self._f.closed:
+                self._f.write(line + "\n")
+                self._f.flush()
+            now = time.monotonic()
+            if now >= self._next_write:
+                self._next_write = now + self.textfile_interval_sec
+                snapshot = list(self._records)
+        if snapshot is not None:
+            self._refresh_textfile(snapshot)
+        return rec
+
+    def _refresh_textfile(self, records: List[Dict[str, Any]]) -> None:
+        # 另一线程正在写时直接跳过：下一个到期的 record / close() 会写上更新的数据
+        if not self._write_lock.acquire(blocking=False):
+            return
+        try:
+            if not self._closed:
+                write_textfile(self.textfile, render_prometheus(summarize(records, self.slowest), self.run_id))
+        finally:
+            self._write_lock.release()
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            return summarize(self._records, self.slowest)
+
+    def close(self) -> Dict[str, Any]:
+        with self._lock:
+            summary = summarize(self._records, self.slowest)
+            if not self._f.closed:
+                self._f.write(json.dumps({"type": "summary", "run_id": self.run_id, **summary}, ensure_ascii=False) + "\n")
+                self._f.close()
+        with self._write_lock:
+            self._closed = True
+            write_textfile(self.textfile, render_prometheus(summary, self.run_id))
+        return summary
+
+
+def open_run_metrics(cfg) -> Optional[RunMetrics]:
+    """按 Config 创建本次运行的指标收集；未启用时返回 None"""
+    if not cfg.metrics_enabled:
+        return None
+    metrics_dir = cfg.metrics_dir or os.path.join(cfg.output_root_dir, "_metrics")
+    return RunMetrics(
+        metrics_dir,
+        textfile=cfg.metrics_textfile,
+        slowest=cfg.metrics_slowest,
+        textfile_interval_sec=cfg.metrics_textfile_interval_sec,
+    )
+
+
+def load_records(paths: Iterable[str]) -> List[Dict[str, Any]]:
+    records = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    rec = json.loads(line)
+                    if rec.get("type") == "doc":
+                        records.append(rec)
+    return records
+
+
+def main(argv: List[str]) -> int:
+    """
+    用法：
+      python run_metrics.py run_20250101_010000.jsonl [更多 jsonl ...]   重新汇总（可合并多次运行）
+      python run_metrics.py --slowest 20 run_*.jsonl
+    """
+    args = argv[1:]
+    slowest = 10
+    if len(args) >= 2 and args[0] == "--slowest":
+        slowest = int(args[1])
+        args = args[2:]
+    if not args:
+        print(main.__doc__)
+        return 1
+    for line in format_summary(summarize(load_records(args), slowest)):
+        print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+# 远端任务状态（本地记录）
+TASK_SUBMITTED = "submitted"  # 已提交/已上传，尚未拿到终态
+TASK_DONE = "done"
+TASK_FAILED = "failed"
+TASK_TIMEOUT = "timeout"      # 本地等待超过截止时间（远端可能仍在跑，重新挂接时会再查）
+TASK_EXPIRED = "expired"      # 提交太久，结果视为过期，需要重新提交
+
+# 重新挂接时仍需查询的状态
+REATTACHABLE_STATES = (TASK_SUBMITTED, TASK_TIMEOUT)
+
+
+class TaskRegistry:
+    """
+    持久化记录每个提交到 MinerU 的远端任务（SQLite），进程重启后可重新挂接：
+    - kind: "batch"（本地文件上传，按 batch_id + result_key 定位）或 "task"（URL 任务，按 task_id）
+    - result_key: batch 内文件标识，与 MinerUClient.result_key 一致（data_id，缺省为 file_name）
+    - source: 源 PDF 路径（URL 任务为 URL）
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS remote_tasks (
+                    kind          TEXT NOT NULL,
+                    remote_id     TEXT NOT NULL,
+                    result_key    TEXT NOT NULL DEFAULT '',
+                    source        TEXT NOT NULL,
+                    model_version TEXT NOT NULL DEFAULT '',
+                    state         TEXT NOT NULL,
+                    submitted_at  REAL NOT NULL,
+                    updated_at    REAL NOT NULL,
+                    PRIMARY KEY (kind, remote_id, result_key)
+                )
+                """
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def record(self, kind: str, remote_id: str, result_key: str, source: str, model_version: str = "") -> None:
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO remote_tasks
+                    (kind, remote_id, result_key, source, model_version, state, submitted_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (kind, str(remote_id), result_key or "", source, model_version, TASK_SUBMITTED, now, now),
+            )
+
+    def mark(self, kind: str, remote_id: str, result_key: Optional[str], state: str) -> None:
+        """更新终态；result_key=None 表示该 remote_id 下的全部记录"""
+        now = time.time()
+        with self._lock, self._conn:
+            if result_key is None:
+                self._conn.execute(
+                    "UPDATE remote_tasks SET state = ?, updated_at = ? WHERE kind = ? AND remote_id = ?",
+                    (state, now, kind, str(remote_id)),
+                )
+            else:
+                self._conn.execute(
+                    """
+                    UPDATE remote_tasks SET state = ?, updated_at = ?
+                    WHERE kind = ? AND remote_id = ? AND result_key = ?
+                    """,
+                    (state, now, kind, str(remote_id), result_key or ""),
+                )
+
+    def pending(self) -> List[Dict[str, Any]]:
+        """需要重新挂接的任务（按提交时间先后）"""
+        marks = ",".join("?" for _ in REATTACHABLE_STATES)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT * FROM remote_tasks WHERE state IN ({marks}) ORDER BY submitted_at",
+                REATTACHABLE_STATES,
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+
+def open_task_registry(cfg) -> Optional[TaskRegistry]:
+    """按 Config 打开 output_root_dir 下的任务登记表；未启用时返回 None"""
+    if not cfg.reattach_enabled:
+        return None
+    return TaskRegistry(os.path.join(cfg.output_root_dir, "_tasks.sqlite"))
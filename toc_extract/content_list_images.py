@@ -1,10 +1,15 @@
 from __future__ import annotations
 
+import json
 import os
+import posixpath
 import re
-from typing import Any, Dict, Iterable, List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
 
+from utils.artifact_index import ArtifactIndex
 from utils.io import load_json, find_jsons_in_dir
+from utils.zip_source import ZipSource
 
 
 def sanitize_filename(s: str) -> str:
@@ -16,13 +21,25 @@ def sanitize_filename(s: str) -> str:
     return s.strip("_")
 
 
-def iter_content_list_jsons(unzip_dir: str) -> Iterable[str]:
-    """在 unzip_dir 内递归找 content_list*.json"""
+def iter_content_list_jsons(unzip_dir: str, index: Optional[ArtifactIndex] = None) -> Iterable[str]:
+    """在 unzip_dir 内递归找 content_list*.json；给了 index 时直接用索引，不再遍历目录"""
+    if index is not None:
+        yield from index.content_list_paths()
+        return
     for dirpath, _, _ in os.walk(unzip_dir):
         for p in find_jsons_in_dir(dirpath, name_contains="content_list", endswith=".json"):
             yield p
 
 
+def iter_content_lists_from_zip(
+    src: ZipSource, index: Optional[ArtifactIndex] = None
+) -> Iterable[Tuple[str, Any]]:
+    """直接从结果 zip 中读取 content_list*.json，yield (成员名, 解析后的数据)"""
+    members = index.content_lists if index is not None else src.find_members(name_contains="content_list")
+    for member in members:
+        yield member, src.load_json(member, default=None)
+
+
 def _first_str(x: Any) -> str:
     if isinstance(x, list) and x:
         return str(x[0]).strip()
@@ -70,18 +87,28 @@ def _hash_from_img_path(img_path: str) -> str:
     return os.path.splitext(base)[0]
 
 
-def collect_images_from_content_list(unzip_dir: str) -> List[Dict[str, Any]]:
+def iter_media_blocks(content_lists: Iterable[Tuple[str, Any]]) -> Iterable[Tuple[str, List[Dict[str, Any]]]]:
+    """(content_list 路径/成员名, 已解析数据) -> (路径/成员名, 图片/表格块)，跳过空数据"""
+    for json_path, data in content_lists:
+        if not data:
+            continue
+        yield json_path, parse_media_blocks_from_content_list(data)
+
+
+def _iter_media_in_dir(unzip_dir: str, index: Optional[ArtifactIndex]) -> Iterable[Tuple[str, List[Dict[str, Any]]]]:
+    return iter_media_blocks(
+        (json_path, load_json(json_path, default=None)) for json_path in iter_content_list_jsons(unzip_dir, index)
+    )
+
+
+def collect_images_from_media(media: Iterable[Tuple[str, List[Dict[str, Any]]]]) -> List[Dict[str, Any]]:
     """
-    收集 content_list 里所有 image/table 图片块，用于生成 image.xlsx。
+    从 (content_list 路径/成员名, 图片/表格块) 序列中收集所有 image/table 图片块。
     返回按出现顺序的列表，每个元素包含：
-      kind, img_path, caption, page_idx, hash
+      kind, img_path, caption, page_idx, hash, content_list_json
     """
     items: List[Dict[str, Any]] = []
-    for json_path in iter_content_list_jsons(unzip_dir):
-        data = load_json(json_path, default=None)
-        if not data:
-            continue
-        blocks = parse_media_blocks_from_content_list(data)
+    for json_path, blocks in media:
         for b in blocks:
             img_path = b["img_path"]
             items.append(
@@ -97,29 +124,236 @@ def collect_images_from_content_list(unzip_dir: str) -> List[Dict[str, Any]]:
     return items
 
 
-def rename_images_by_caption_from_content_list(unzip_dir: str) -> Tuple[Dict[str, str], List[str]]:
+def collect_images_from_content_lists(content_lists: Iterable[Tuple[str, Any]]) -> List[Dict[str, Any]]:
+    """同 collect_images_from_media，输入为 (路径/成员名, content_list 数据)"""
+    return collect_images_from_media(iter_media_blocks(content_lists))
+
+
+def collect_images_from_content_list(
+    unzip_dir: str,
+    index: Optional[ArtifactIndex] = None,
+    media: Optional[Iterable[Tuple[str, List[Dict[str, Any]]]]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    收集 content_list 里所有 image/table 图片块，用于生成 image.xlsx。
+    media：已解析好的图片块（如 ParsedDocument.iter_media()），给出时不再读 json。
+    返回按出现顺序的列表，每个元素包含：
+      kind, img_path, caption, page_idx, hash
+    """
+    if media is None:
+        media = _iter_media_in_dir(unzip_dir, index)
+    return collect_images_from_media(media)
+
+
+def rename_images_by_caption_from_content_list(
+    unzip_dir: str,
+    index: Optional[ArtifactIndex] = None,
+    media: Optional[Iterable[Tuple[str, List[Dict[str, Any]]]]] = None,
+    dry_run: bool = False,
+    workers: int = 8,
+) -> Tuple[Dict[str, str], List[str]]:
+    """
+    按 caption 重命名解压目录里的图片（image/table 块），返回 (mapping: 旧相对路径 -> 新相对路径, errors)。
+    分两步：
+      1) 规划：每个涉及的目录只列一次（os.scandir），在内存里按 plan_image_renames 规则分配新名字
+      2) 执行：先写改名日志（IMAGE_RENAME_JOURNAL），再批量 os.rename，完成后删除日志
+    dry_run=True 只规划，不改动磁盘，返回将会得到的 mapping。
+    上次执行被中断时（日志还在），先把已完成的改名回滚，再重新规划，结果与一次跑完相同。
+    """
+    if media is None:
+        media = _iter_media_in_dir(unzip_dir, index)
+
+    if not dry_run:
+        recover_image_renames(unzip_dir, action="rollback")
+
+    renames, errors = plan_image_renames_in_dir(unzip_dir, media)
+    if dry_run:
+        return {old_rel: new_rel for old_rel, new_rel in renames}, errors
+
+    mapping, apply_errors = apply_image_renames(unzip_dir, renames, workers=workers)
+    return mapping, errors + apply_errors
+
+
+# 图片改名日志（解压目录下）：执行期间存在，记录本次全部 (old_rel, new_rel)
+IMAGE_RENAME_JOURNAL = ".image_renames.json"
+
+
+def _list_dir_keys(unzip_dir: str, rel_dirs: Iterable[str]) -> Tuple[Set[str], Set[str]]:
+    """
+    每个相对目录 scandir 一次，返回 (全部条目, 其中的文件)，均为 _name_key 形式的相对路径。
+    前者对应 os.path.exists（冲突检查），后者对应 os.path.isfile（源图片是否存在）。
+    """
+    entries: Set[str] = set()
+    files: Set[str] = set()
+    for rel_dir in rel_dirs:
+        try:
+            it = os.scandir(os.path.join(unzip_dir, rel_dir) if rel_dir else unzip_dir)
+        except OSError:
+            continue
+        with it:
+            for e in it:
+                key = _name_key(posixpath.join(rel_dir, e.name) if rel_dir else e.name)
+                entries.add(key)
+                try:
+                    if e.is_file():
+                        files.add(key)
+                except OSError:
+                    pass
+    return entries, files
+
+
+def plan_image_renames_in_dir(
+    unzip_dir: str,
+    media: Iterable[Tuple[str, List[Dict[str, Any]]]],
+) -> Tuple[List[Tuple[str, str]], List[str]]:
+    """
+    解压目录版的改名规划：images/ 与各图片所在目录各列一次，之后全部在内存里完成
+    （不再逐个 isfile / exists）。返回 ([(old_rel, new_rel)], errors)。
+    """
+    media = [(json_path, list(blocks)) for json_path, blocks in media]
+    rel_dirs = {"images"}
+    for _, blocks in media:
+        for b in blocks:
+            rel_dirs.add(posixpath.dirname(posixpath.normpath(b["img_path"])))
+
+    existing, files = _list_dir_keys(unzip_dir, sorted(rel_dirs))
+    return plan_image_renames(
+        media, existing, lambda rel: os.path.join(unzip_dir, rel), sources=files
+    )
+
+
+def _write_rename_journal(unzip_dir: str, renames: List[Tuple[str, str]]) -> str:
+    path = os.path.join(unzip_dir, IMAGE_RENAME_JOURNAL)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"renames": renames}, f, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return path
+
+
+def apply_image_renames(
+    unzip_dir: str,
+    renames: List[Tuple[str, str]],
+    workers: int = 8,
+) -> Tuple[Dict[str, str], List[str]]:
+    """
+    执行 plan_image_renames 的结果：先落日志，再 os.rename，全部结束后删日志。
+    新名字都不占用本次任何源文件名时，各改名互不依赖，用 workers 个线程并行；否则按规划顺序串行。
+    返回 (mapping, errors)：改名失败的条目不进 mapping（与逐个改名时相同）。
+    """
     mapping: Dict[str, str] = {}
     errors: List[str] = []
+    moves = [(o, n) for o, n in renames if _name_key(o) != _name_key(n)]
+    if not moves:
+        return {o: n for o, n in renames}, errors
+
+    journal = _write_rename_journal(unzip_dir, renames)
+
+    def _move(pair: Tuple[str, str]) -> Optional[str]:
+        src_abs = os.path.join(unzip_dir, pair[0])
+        dst_abs = os.path.join(unzip_dir, pair[1])
+        try:
+            os.rename(src_abs, dst_abs)
+            return None
+        except Exception as e:
+            return f"重命名失败: {src_abs} -> {dst_abs}, err={e}"
+
+    freed = {_name_key(o) for o, _ in moves}
+    independent = not any(_name_key(n) in freed for _, n in moves)
+    if independent and workers > 1 and len(moves) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as ex:
+            results = dict(zip(moves, ex.map(_move, moves)))
+    else:
+        results = {pair: _move(pair) for pair in moves}
+
+    for pair in renames:
+        err = results.get(pair)
+        if err is None:
+            mapping[pair[0]] = pair[1]
+        else:
+            errors.append(err)
 
-    used: Dict[str, int] = {}
+    try:
+        os.remove(journal)
+    except OSError:
+        pass
+    return mapping, errors
 
-    for json_path in iter_content_list_jsons(unzip_dir):
-        data = load_json(json_path, default=None)
-        if not data:
+
+def recover_image_renames(unzip_dir: str, action: str = "rollback") -> int:
+    """
+    处理上次被中断的图片改名（解压目录下存在 IMAGE_RENAME_JOURNAL 时）：
+      - action="rollback"：按相反顺序把已改名的图片改回原名；原名已被重新解压出来时删除改名后的副本（大小相同才删）
+      - action="finish"：按顺序把尚未改名的图片改完
+    返回处理的图片数；没有日志时返回 0。
+    """
+    if action not in ("rollback", "finish"):
+        raise ValueError(f"未知的 action：{action}")
+    path = os.path.join(unzip_dir, IMAGE_RENAME_JOURNAL)
+    if not os.path.isfile(path):
+        return 0
+    renames = [tuple(p) for p in (load_json(path, default=None) or {}).get("renames", [])]
+
+    n = 0
+    pairs = reversed(renames) if action == "rollback" else renames
+    for old_rel, new_rel in pairs:
+        if _name_key(old_rel) == _name_key(new_rel):
             continue
+        old_abs = os.path.join(unzip_dir, old_rel)
+        new_abs = os.path.join(unzip_dir, new_rel)
+        src, dst = (new_abs, old_abs) if action == "rollback" else (old_abs, new_abs)
+        if not os.path.isfile(src):
+            continue
+        if not os.path.exists(dst):
+            os.rename(src, dst)
+            n += 1
+        elif action == "rollback" and os.path.isfile(dst) and os.path.getsize(dst) == os.path.getsize(src):
+            os.remove(src)
+            n += 1
+    os.remove(path)
+    return n
+
+
+def _name_key(rel: str) -> str:
+    """相对路径的比较键：统一分隔符；Windows 下文件名不区分大小写"""
+    key = posixpath.normpath(rel.replace("\\", "/"))
+    return key.lower() if os.name == "nt" else key
+
+
+def plan_image_renames(
+    media: Iterable[Tuple[str, List[Dict[str, Any]]]],
+    existing: Set[str],
+    describe: Callable[[str], str],
+    sources: Optional[Set[str]] = None,
+) -> Tuple[List[Tuple[str, str]], List[str]]:
+    """
+    只在内存里规划图片改名（解压目录与 zip 直读共用）：
+    - existing: 当前已存在的相对路径集合（_name_key 形式），新名字不能与其冲突；规划过程中会随改名更新
+    - sources: 可作为源图片的文件集合（缺省同 existing；目录条目只算占用、不算图片）
+    - media: (content_list 路径/成员名, 图片/表格块) 序列
+    - describe: 把相对路径转成报错里展示的位置（绝对路径 / zip 成员引用）
+    返回 ([(old_rel, new_rel)], errors)，按块出现顺序；新旧相同的条目也在其中（不需要实际改名）
+    """
+    if sources is None:
+        sources = existing
+    renames: List[Tuple[str, str]] = []
+    errors: List[str] = []
+    used: Dict[str, int] = {}
 
-        blocks = parse_media_blocks_from_content_list(data)
+    for json_path, blocks in media:
         for b in blocks:
             old_rel = b["img_path"]
             kind = b["kind"]
             caption = (b.get("caption") or "").strip()
 
-            src_abs = os.path.join(unzip_dir, old_rel)
-            if not os.path.isfile(src_abs):
-                errors.append(f"图片不存在: {src_abs} (from {json_path})")
+            src_key = _name_key(old_rel)
+            if src_key not in sources:
+                errors.append(f"图片不存在: {describe(old_rel)} (from {json_path})")
                 continue
 
-            ext = os.path.splitext(src_abs)[1]
+            ext = os.path.splitext(old_rel)[1]
             h = _hash_from_img_path(old_rel)
 
             if caption:
@@ -135,18 +369,49 @@ def rename_images_by_caption_from_content_list(unzip_dir: str) -> Tuple[Dict[str
             used[base] = n
             new_base = base if n == 1 else f"{base}_{n}"
             new_rel = f"images/{new_base}{ext}"
-            dst_abs = os.path.join(unzip_dir, new_rel)
 
-            while os.path.exists(dst_abs) and os.path.abspath(dst_abs) != os.path.abspath(src_abs):
+            while _name_key(new_rel) in existing and _name_key(new_rel) != src_key:
                 used[base] += 1
                 new_base = f"{base}_{used[base]}"
                 new_rel = f"images/{new_base}{ext}"
-                dst_abs = os.path.join(unzip_dir, new_rel)
 
+            new_key = _name_key(new_rel)
+            existing.discard(src_key)
+            existing.add(new_key)
+            if sources is not existing:
+                sources.discard(src_key)
+                sources.add(new_key)
+            renames.append((old_rel, new_rel))
+
+    return renames, errors
+
+
+def rename_images_by_caption_from_zip(
+    src: ZipSource,
+    out_dir: Optional[str] = None,
+    media: Optional[Iterable[Tuple[str, List[Dict[str, Any]]]]] = None,
+) -> Tuple[Dict[str, str], List[str]]:
+    """
+    zip 直读版的按 caption 改名：不解压整个 zip，
+    - 改名规则与 mapping 与 rename_images_by_caption_from_content_list 一致
+    - out_dir 非空时，只把需要的图片以新名字写到 out_dir/images/ 下；为空则不落盘
+    - media 可传入已解析的图片块（如 ParsedDocument.iter_media()），避免重复读 zip
+    """
+    if media is None:
+        media = iter_media_blocks(iter_content_lists_from_zip(src))
+
+    existing = {_name_key(n) for n in src.names()}
+    renames, errors = plan_image_renames(media, existing, src.ref)
+
+    mapping: Dict[str, str] = {}
+    for old_rel, new_rel in renames:
+        if out_dir:
+            dst_abs = os.path.join(out_dir, new_rel)
             try:
-                os.rename(src_abs, dst_abs)
-                mapping[old_rel] = new_rel
+                src.extract_member(old_rel, dst_abs)
             except Exception as e:
-                errors.append(f"重命名失败: {src_abs} -> {dst_abs}, err={e}")
+                errors.append(f"导出图片失败: {src.ref(old_rel)} -> {dst_abs}, err={e}")
+                continue
+        mapping[old_rel] = new_rel
 
-    return mapping, errors
\ No newline at end of file
+    return mapping, errors
@@ -1,6 +1,7 @@
-from typing import Dict, List, Sequence
+from typing import Dict, Iterable, Sequence
 
-import pandas as pd
+from utils.excel import peek_rows, write_rows_to_xlsx
+from utils.row_writers import MultiRowWriter
 
 DEFAULT_COLUMNS: Sequence[str] = (
     "order_index",
@@ -14,21 +15,47 @@ DEFAULT_COLUMNS: Sequence[str] = (
     "image",
 )
 
+# parquet 中按整数存的列
+INT_COLUMNS: Sequence[str] = ("order_index", "level")
+
 
 def export_rows_to_excel(
-    rows: List[Dict],
+    rows: Iterable[Dict],
     output_excel_path: str,
     columns_order: Sequence[str] = DEFAULT_COLUMNS,
+    backend: str = "auto",
 ) -> str:
-    if not rows:
+    """
+    按 columns_order 流式写出 rows（可为生成器，不整体放进内存），缺的列留空。
+    backend 见 utils.excel.XlsxRowWriter（默认装了 xlsxwriter 用它，否则 openpyxl write_only）。
+    """
+    first, rows = peek_rows(rows)
+    if first is None:
         raise ValueError("rows 为空，未导出任何内容")
 
-    df = pd.DataFrame(rows)
+    write_rows_to_xlsx(rows, output_excel_path, columns_order, backend=backend)
+    return output_excel_path
+
 
-    for col in columns_order:
-        if col not in df.columns:
-            df[col] = ""
+def export_rows(
+    rows: Iterable[Dict],
+    output_base_path: str,
+    columns_order: Sequence[str] = DEFAULT_COLUMNS,
+    formats: Iterable[str] = ("xlsx",),
+    int_columns: Sequence[str] = INT_COLUMNS,
+) -> Dict[str, str]:
+    """
+    同一份行流一次写成 formats 中的全部格式（xlsx / csv / jsonl / parquet，见 utils.row_writers），
+    output_base_path 如 out_dir/toc_results.xlsx，按格式替换扩展名；parquet 中 int_columns 为整数列。
+
+    【输出】
+      - Dict[str, str]: 格式 -> 输出文件路径
+    """
+    first, rows = peek_rows(rows)
+    if first is None:
+        raise ValueError("rows 为空，未导出任何内容")
 
-    df = df[list(columns_order)]
-    df.to_excel(output_excel_path, index=False)
-    return output_excel_path
\ No newline at end of file
+    with MultiRowWriter(output_base_path, columns_order, formats, int_columns=int_columns) as w:
+        for r in rows:
+            w.write_row(r)
+    return w.paths
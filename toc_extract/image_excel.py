@@ -1,13 +1,19 @@
 from __future__ import annotations
 
+import hashlib
+import io
 import os
 import re
-from typing import Any, Dict, List, Tuple
+import zipfile
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, Optional, Tuple
 
-from openpyxl import Workbook
-from openpyxl.drawing.image import Image as XLImage
 from openpyxl.utils import get_column_letter
 
+from utils.excel import XlsxRowWriter, peek_rows
+from utils.row_writers import MultiRowWriter
+
 
 # 输出列（按你要求）
 COLUMNS = (
@@ -20,6 +26,9 @@ COLUMNS = (
     "image",         # 嵌入图片
 )
 
+# parquet 中按整数存的列
+INT_COLUMNS = ("order_index",)
+
 # 连续 6 个及以上英文字母（大小写） -> 过滤整行
 RE_LONG_ALPHA = re.compile(r"[A-Za-z]{6,}")
 
@@ -94,29 +103,97 @@ def parse_image_title_fields(image_title: str) -> Tuple[str, str, str]:
     return clause_sort, clause_id, clause_text
 
 
-def export_image_rows_with_embedded_images(
-    rows: List[Dict[str, Any]],
-    output_xlsx_path: str,
-    *,
-    sheet_name: str = "images",
-    image_col_name: str = "image",
+def prepare_image_bytes(raw: bytes, target_px: Tuple[int, int], quality: int = 85) -> bytes:
+    """
+    嵌入前处理单张图片：
+      - 像素数超过 target_px 时重采样到 target_px（显示时本来就会被拉伸到该尺寸）
+      - 重新压缩：有透明通道的存 PNG（optimize），其余转 RGB 存 JPEG(quality)
+      - 没有缩小且重压缩后反而更大时，保留原图字节
+    """
+    from PIL import Image as PILImage
+
+    tw, th = max(1, int(target_px[0])), max(1, int(target_px[1]))
+    with PILImage.open(io.BytesIO(raw)) as im:
+        src_format = (im.format or "").lower()
+        resized = im.width * im.height > tw * th
+        if resized and src_format == "jpeg":
+            # JPEG 可在解码时直接按 1/2、1/4、1/8 缩小，大图省时省内存
+            im.draft("RGB", (tw, th))
+        im.load()
+        if resized:
+            im = im.resize((tw, th), PILImage.LANCZOS, reducing_gap=3.0)
+
+        has_alpha = im.mode in ("RGBA", "LA") or (im.mode == "P" and "transparency" in im.info)
+        out = io.BytesIO()
+        if has_alpha:
+            im.save(out, format="PNG", optimize=True)
+        else:
+            if im.mode != "RGB":
+                im = im.convert("RGB")
+            im.save(out, format="JPEG", quality=quality, optimize=True)
+        data = out.getvalue()
+
+    if not resized and len(data) >= len(raw) and src_format in ("jpeg", "png", "gif"):
+        return raw
+    return data
+
+
+def dedupe_xlsx_media(xlsx_path: str) -> Tuple[int, int]:
+    """
+    openpyxl 每嵌一次图就写一份 xl/media/imageN；这里把内容相同的 media 只保留第一份，
+    并把 drawing 关系（.rels）里的 Target 指向它。返回 (删除的 media 数, 节省的字节数)。
+    """
+    with zipfile.ZipFile(xlsx_path, "r") as zin:
+        infos = zin.infolist()
+        canonical: Dict[str, str] = {}   # 重复 media 名 -> 保留的 media 名
+        first_by_digest: Dict[str, str] = {}
+        saved_bytes = 0
+        for info in infos:
+            name = info.filename
+            if not name.startswith("xl/media/"):
+                continue
+            digest = hashlib.sha1(zin.read(name)).hexdigest() + os.path.splitext(name)[1]
+            if digest in first_by_digest:
+                canonical[name] = first_by_digest[digest]
+                saved_bytes += info.file_size
+            else:
+                first_by_digest[digest] = name
+
+        if not canonical:
+            return 0, 0
+
+        # Target 可能是绝对（/xl/media/x）或相对（../media/x）路径，按文件名替换
+        by_base = {n.rsplit("/", 1)[1]: c.rsplit("/", 1)[1] for n, c in canonical.items()}
+        target_re = re.compile(r'Target="([^"]*media/)([^"/]+)"')
+
+        tmp_path = xlsx_path + ".tmp"
+        with zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_DEFLATED) as zout:
+            for info in infos:
+                name = info.filename
+                if name in canonical:
+                    continue
+                data = zin.read(name)
+                if name.endswith(".rels") and b"media/" in data:
+                    text = data.decode("utf-8")
+                    text = target_re.sub(
+                        lambda m: f'Target="{m.group(1)}{by_base.get(m.group(2), m.group(2))}"', text
+                    )
+                    data = text.encode("utf-8")
+                zout.writestr(info, data)
+
+    os.replace(tmp_path, xlsx_path)
+    return len(canonical), saved_bytes
+
+
+def iter_image_output_rows(
+    rows: Iterable[Dict[str, Any]],
     image_title_col: str = "image_title",
-    image_display_px: Tuple[int, int] = (320, 200),
-    verbose: bool = True,
-) -> str:
+) -> Iterator[Dict[str, Any]]:
     """
-    将 rows 导出到 image.xlsx：
+    image.xlsx 的行预处理（逐行，不物化）：
       - 新增 clause_sort / clause_id / clause_text 三列（从 image_title 解析）
       - 过滤：image_title 中出现连续 >=6 英文字母的行不输出
-      - 将 image 指向的图片嵌入到单元格
     """
-    if not rows:
-        raise ValueError("rows 为空，无法导出 image.xlsx")
-
-    os.makedirs(os.path.dirname(output_xlsx_path) or ".", exist_ok=True)
-
-    # 先做过滤 + 衍生字段
-    filtered_rows: List[Dict[str, Any]] = []
     for r in rows:
         image_title = _normalize_spaces(str(r.get(image_title_col, "") or ""))
         if not image_title:
@@ -134,18 +211,71 @@ def export_image_rows_with_embedded_images(
         rr["clause_sort"] = clause_sort
         rr["clause_id"] = clause_id
         rr["clause_text"] = clause_text
-        filtered_rows.append(rr)
+        yield rr
+
+
+def export_image_rows(
+    rows: Iterable[Dict[str, Any]],
+    output_base_path: str,
+    formats: Iterable[str],
+    *,
+    image_title_col: str = "image_title",
+) -> Dict[str, str]:
+    """
+    与 image.xlsx 相同的行（同样的过滤与衍生列、COLUMNS 顺序），写成 csv / jsonl / parquet 等列式格式；
+    image 列为图片路径（不嵌图）。output_base_path 如 out_dir/image.xlsx，按格式替换扩展名。
 
-    if not filtered_rows:
+    【输出】
+      - Dict[str, str]: 格式 -> 输出文件路径
+    """
+    first, out_rows = peek_rows(iter_image_output_rows(rows, image_title_col))
+    if first is None:
         raise ValueError("过滤后 rows 为空（可能全部被英文>=6过滤），未导出任何内容")
 
-    wb = Workbook()
-    ws = wb.active
-    ws.title = sheet_name
+    with MultiRowWriter(output_base_path, COLUMNS, formats, int_columns=INT_COLUMNS) as w:
+        for r in out_rows:
+            w.write_row(r)
+    return w.paths
 
-    # 写表头
-    for col_idx, col_name in enumerate(COLUMNS, 1):
-        ws.cell(row=1, column=col_idx, value=col_name)
+
+def export_image_rows_with_embedded_images(
+    rows: Iterable[Dict[str, Any]],
+    output_xlsx_path: str,
+    *,
+    sheet_name: str = "images",
+    image_col_name: str = "image",
+    image_title_col: str = "image_title",
+    image_display_px: Tuple[int, int] = (320, 200),
+    verbose: bool = True,
+    image_reader: Optional[Callable[[str], Optional[bytes]]] = None,
+    image_dpi: int = 96,
+    image_quality: int = 85,
+    image_workers: int = 4,
+    optimize_images: bool = True,
+    backend: str = "auto",
+) -> str:
+    """
+    将 rows 导出到 image.xlsx：
+      - 行先经 iter_image_output_rows：新增 clause_sort / clause_id / clause_text 三列，
+        过滤 image_title 中出现连续 >=6 英文字母的行
+      - 将 image 指向的图片嵌入到单元格
+      - image_reader：可选，按 image 列的值返回图片字节（如 ZipSource.read_ref，直接从 zip 读）；
+        返回 None 时再按本地路径读取
+      - optimize_images=True：嵌入前把图片重采样到 image_display_px * image_dpi / 96 并重新压缩
+        （prepare_image_bytes，线程池 image_workers 并行）；内容相同的图片只处理、只存一份
+      - rows 可为生成器：行经 utils.excel.XlsxRowWriter 流式写出（backend 同该类），
+        常驻内存的只有预取窗口内的行和处理后的不同图片
+    """
+    os.makedirs(os.path.dirname(output_xlsx_path) or ".", exist_ok=True)
+
+    # 输入行计数（过滤与衍生字段见 iter_image_output_rows，逐行处理）
+    n_in = 0
+
+    def _counted() -> Iterator[Dict[str, Any]]:
+        nonlocal n_in
+        for r in rows:
+            n_in += 1
+            yield r
 
     # 列宽（可调）
     col_widths = {
@@ -157,61 +287,121 @@ def export_image_rows_with_embedded_images(
         "F": 50,  # clause_text
         "G": 30,  # image
     }
-    for col_letter, w in col_widths.items():
-        ws.column_dimensions[col_letter].width = w
 
     img_w, img_h = image_display_px
     image_col_idx = COLUMNS.index(image_col_name) + 1
     image_col_letter = get_column_letter(image_col_idx)
 
+    # 图片在线程池里预取：读字节 -> 按内容去重 -> 缩放/重压缩；行按顺序写，预取窗口有界
+    def _read(img_path: str) -> Optional[bytes]:
+        data = image_reader(img_path) if image_reader is not None else None
+        if data is None and os.path.isfile(img_path):
+            try:
+                with open(img_path, "rb") as f:
+                    data = f.read()
+            except OSError:
+                return None
+        return data
+
+    scale = max(1, image_dpi) / 96.0
+    target_px = (round(img_w * scale), round(img_h * scale))
+
+    # sha1 -> 处理后的字节（或处理时的异常，交给写入时报 [IMG_ERROR]）；只随“不同图片”数增长
+    prepared: Dict[str, Any] = {}
+    raw_size: Dict[str, int] = {}
+
+    def _load(img_path: str) -> Optional[str]:
+        raw = _read(img_path)
+        if raw is None:
+            return None
+        digest = hashlib.sha1(raw).hexdigest()
+        if digest not in prepared:
+            if not optimize_images:
+                data: Any = raw
+            else:
+                try:
+                    data = prepare_image_bytes(raw, target_px, quality=image_quality)
+                except Exception as e:
+                    data = e
+            prepared.setdefault(digest, data)
+            raw_size.setdefault(digest, len(raw))
+        return digest
+
     ok_count = 0
     miss_count = 0
     err_count = 0
-
-    for i, r in enumerate(filtered_rows, 1):
-        excel_row = i + 1
-
-        # 写文本列（除 image）
-        for col_idx, col_name in enumerate(COLUMNS, 1):
-            if col_name == image_col_name:
-                continue
-            ws.cell(row=excel_row, column=col_idx, value=r.get(col_name, ""))
-
+    writer: Optional[XlsxRowWriter] = None
+
+    def _write(r: Dict[str, Any], fut: Optional[Future]) -> None:
+        nonlocal ok_count, miss_count, err_count, writer
+        if writer is None:
+            writer = XlsxRowWriter(
+                output_xlsx_path, COLUMNS, sheet_name=sheet_name, widths=col_widths, header_style=False, backend=backend
+            )
+        excel_row = writer.next_row
         img_path = (str(r.get(image_col_name, "") or "")).strip()
-        anchor = f"{image_col_letter}{excel_row}"
-
-        # 行高：points（≈ px * 0.75）
-        ws.row_dimensions[excel_row].height = max(80, img_h * 0.75)
+        values = [r.get(c, "") for c in COLUMNS]
 
+        digest = fut.result() if fut is not None else None
         if not img_path:
-            ws.cell(row=excel_row, column=image_col_idx, value="")
+            values[image_col_idx - 1] = ""
             miss_count += 1
-            continue
-
-        if not os.path.isfile(img_path):
-            ws.cell(row=excel_row, column=image_col_idx, value=f"[MISSING] {img_path}")
+        elif digest is None:
+            values[image_col_idx - 1] = f"[MISSING] {img_path}"
             miss_count += 1
-            continue
-
-        # 4) 嵌入图片
-        try:
-            xl_img = XLImage(img_path)
-            xl_img.width = img_w
-            xl_img.height = img_h
-            ws.add_image(xl_img, anchor)
+        else:
+            # 4) 嵌入图片；同时写路径，便于溯源（不影响图片显示）
+            try:
+                img_bytes = prepared[digest]
+                if isinstance(img_bytes, Exception):
+                    raise img_bytes
+                writer.add_image(img_bytes, excel_row, image_col_letter, img_w, img_h)
+                values[image_col_idx - 1] = img_path
+                ok_count += 1
+            except Exception as e:
+                values[image_col_idx - 1] = f"[IMG_ERROR] {img_path} | {type(e).__name__}: {e}"
+                err_count += 1
 
-            # 同时写路径，便于溯源（不影响图片显示）
-            ws.cell(row=excel_row, column=image_col_idx, value=img_path)
-            ok_count += 1
-        except Exception as e:
-            ws.cell(row=excel_row, column=image_col_idx, value=f"[IMG_ERROR] {img_path} | {type(e).__name__}: {e}")
-            err_count += 1
+        # 行高：points（≈ px * 0.75）
+        writer.write_values(values, height=max(80, img_h * 0.75))
+
+    window = max(1, image_workers) * 4
+    futures: Dict[str, Future] = {}
+    pending: Deque[Tuple[Dict[str, Any], Optional[Future]]] = deque()
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, image_workers)) as ex:
+            for r in iter_image_output_rows(_counted(), image_title_col):
+                img_path = (str(r.get(image_col_name, "") or "")).strip()
+                fut = None
+                if img_path:
+                    fut = futures.get(img_path)
+                    if fut is None:
+                        fut = futures[img_path] = ex.submit(_load, img_path)
+                pending.append((r, fut))
+                if len(pending) >= window:
+                    _write(*pending.popleft())
+            while pending:
+                _write(*pending.popleft())
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if n_in == 0:
+        raise ValueError("rows 为空，无法导出 image.xlsx")
+    if writer is None:
+        raise ValueError("过滤后 rows 为空（可能全部被英文>=6过滤），未导出任何内容")
 
-    wb.save(output_xlsx_path)
+    dup_parts, dup_bytes = dedupe_xlsx_media(output_xlsx_path) if ok_count > 1 else (0, 0)
+    bytes_in = sum(raw_size.values())
+    bytes_out = sum(len(b) for b in prepared.values() if isinstance(b, bytes))
 
     if verbose:
         print(f"[image_excel] wrote: {output_xlsx_path}")
         print(f"[image_excel] embedded_ok={ok_count} missing={miss_count} errors={err_count}")
-        print(f"[image_excel] rows_in={len(rows)} rows_out(after_filter)={len(filtered_rows)}")
+        print(f"[image_excel] rows_in={n_in} rows_out(after_filter)={writer.rows_written}")
+        print(
+            f"[image_excel] unique_images={len(prepared)} source={bytes_in / 1024 ** 2:.1f}MB "
+            f"embedded={bytes_out / 1024 ** 2:.1f}MB dedup_media={dup_parts} (-{dup_bytes / 1024 ** 2:.1f}MB)"
+        )
 
-    return output_xlsx_path
\ No newline at end of file
+    return output_xlsx_path
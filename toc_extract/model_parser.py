@@ -1,5 +1,8 @@
 import re
-from typing import Any, Dict, List
+from collections.abc import Iterator
+from typing import Any, Dict, List, Optional
+
+from utils.io import iter_json_array
 
 
 def extract_titles_by_pattern(model_data: Any) -> List[Dict[str, str]]:
@@ -13,16 +16,19 @@ def extract_titles_by_pattern(model_data: Any) -> List[Dict[str, str]]:
       - 顶层 list
       - 每个 page 是 list
       - block dict 中用 key 'content' 存文本
+
+    model_data 也可以是 iter_json_array(path, depth=2) 的流式迭代器（page 为 block 迭代器），
+    此时逐页逐块处理，不需要整棵树在内存里。
     """
     candidates: List[Dict[str, str]] = []
     title_pattern = re.compile(r'^(\d+(?:\.\d+)*)\s+(.*?)(?:\s+\d+)?$')
     exclude_keywords = ["GB/T", "ICS", "Term", "Definitions", "目次", "前言", "引言"]
 
-    if not isinstance(model_data, list):
+    if not isinstance(model_data, (list, Iterator)):
         return []
 
     for page in model_data:
-        if not isinstance(page, list):
+        if not isinstance(page, (list, Iterator)):
             continue
         for block in page:
             if not isinstance(block, dict):
@@ -54,6 +60,26 @@ def extract_titles_by_pattern(model_data: Any) -> List[Dict[str, str]]:
     return candidates
 
 
+def extract_titles_from_model_json(path: str) -> Optional[List[Dict[str, str]]]:
+    """
+    流式版 extract_titles_by_pattern：直接读 model.json 文件，逐页逐块抽取标题。
+    文件读取/解析失败或没有任何 page 时返回 None（与 load_json 后“读取失败或为空”一致）。
+    """
+    pages = 0
+
+    def _counted(stream):
+        nonlocal pages
+        for page in stream:
+            pages += 1
+            yield page
+
+    try:
+        items = extract_titles_by_pattern(_counted(iter_json_array(path, depth=2)))
+    except (OSError, ValueError):
+        return None
+    return items if pages else None
+
+
 def clean_toc_list(candidates: List[Dict[str, str]]) -> List[Dict[str, str]]:
     """
     清洗目录列表：
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from pdf_rename.content_list_parser import extract_title_and_stdno_from_content_list
+from toc_extract.content_list_images import parse_media_blocks_from_content_list
+from toc_extract.model_parser import extract_titles_by_pattern, extract_titles_from_model_json
+from utils.artifact_index import ArtifactIndex
+from utils.io import load_json
+from utils.zip_source import ZipSource
+
+_UNSET = object()
+
+
+class ContentList:
+    """
+    单个 content_list.json：数据只读一次，派生结构（第 0 页块、图片/表格块、标题/标准号）按需构建并缓存。
+    name 为相对路径或 zip 成员名；source 每次访问时经 resolve 拼出实际路径，输出目录改名后随之更新。
+    """
+
+    def __init__(self, name: str, data: Any, resolve: Optional[Callable[[str], str]] = None):
+        self.name = name
+        self.data = data
+        self._resolve = resolve or (lambda s: s)
+        self._page0: Any = _UNSET
+        self._media: Optional[List[Dict[str, Any]]] = None
+        self._title_std: Any = _UNSET
+
+    @property
+    def source(self) -> str:
+        return self._resolve(self.name)
+
+    @property
+    def page0_blocks(self) -> Any:
+        """page_idx == 0 的块（标题/标准号只看第一页）；数据不是 list 时原样返回"""
+        if self._page0 is _UNSET:
+            if isinstance(self.data, list):
+                self._page0 = [b for b in self.data if isinstance(b, dict) and b.get("page_idx") == 0]
+            else:
+                self._page0 = self.data
+        return self._page0
+
+    @property
+    def media_blocks(self) -> List[Dict[str, Any]]:
+        if self._media is None:
+            self._media = parse_media_blocks_from_content_list(self.data)
+        return self._media
+
+    @property
+    def title_and_std_no(self) -> Tuple[Optional[str], Optional[str]]:
+        if self._title_std is _UNSET:
+            self._title_std = extract_title_and_stdno_from_content_list(self.page0_blocks)
+        return self._title_std
+
+
+class ParsedDocument:
+    """
+    一个文档的解析结果，后处理各步骤共用（每个 json 只 load 一次）：
+    - content_lists：全部 content_list.json（首次访问时读取）
+    - iter_media()：按 content_list 分组的图片/表格块，供图片改名与 image.xlsx 使用
+    - model_data / toc_candidates：model.json 及其中的目录候选（首次访问时读取/抽取）；
+      stream_model=True 且尚未整体读取 model_data 时，toc_candidates 流式解析 model.json
+    sources 为相对路径或 zip 成员名，读取时经 resolve 转成实际路径（输出目录改名后仍有效）。
+    """
+
+    def __init__(
+        self,
+        content_list_sources: List[str],
+        model_source: str = "",
+        loader: Callable[..., Any] = load_json,
+        resolve: Optional[Callable[[str], str]] = None,
+        stream_model: bool = False,
+    ):
+        self.content_list_sources = list(content_list_sources)
+        self.model_source = model_source
+        self._loader = loader
+        self._resolve = resolve or (lambda s: s)
+        self._stream_model = stream_model
+        self._content_lists: Optional[List[ContentList]] = None
+        self._model_data: Any = _UNSET
+        self._toc_candidates: Any = _UNSET
+
+    @classmethod
+    def from_index(cls, index: ArtifactIndex) -> "ParsedDocument":
+        """解压目录：路径按 index.root 拼接（index.root 改写后随之生效）"""
+        model = index.model_jsons[0] if index.model_jsons else ""
+        return cls(index.content_lists, model, loader=load_json, resolve=index.path, stream_model=True)
+
+    @classmethod
+    def from_zip(cls, src: ZipSource, index: Optional[ArtifactIndex] = None) -> "ParsedDocument":
+        """结果 zip：直接按成员名读取"""
+        if index is None:
+            index = ArtifactIndex.from_names(src.zip_path, src.names())
+        model = index.model_jsons[0] if index.model_jsons else ""
+        return cls(index.content_lists, model, loader=src.load_json)
+
+    def attach_zip(self, src: ZipSource) -> None:
+        """结果 zip 重新打开后（如输出目录改名），尚未读取的成员改从 src 读取；已读取的内容保留"""
+        self._loader = src.load_json
+
+    @property
+    def content_lists(self) -> List[ContentList]:
+        if self._content_lists is None:
+            self._content_lists = []
+            for s in self.content_list_sources:
+                data = self._loader(self._resolve(s), default=None)
+                self._content_lists.append(ContentList(s, data, resolve=self._resolve))
+        return self._content_lists
+
+    def iter_media(self) -> Iterable[Tuple[str, List[Dict[str, Any]]]]:
+        """yield (content_list 路径/成员名, 图片/表格块)，跳过读取失败或为空的 content_list"""
+        for cl in self.content_lists:
+            if cl.data:
+                yield cl.source, cl.media_blocks
+
+    @property
+    def model_path(self) -> str:
+        return self._resolve(self.model_source) if self.model_source else ""
+
+    @property
+    def model_data(self) -> Any:
+        if self._model_data is _UNSET:
+            self._model_data = self._loader(self.model_path, default=None) if self.model_source else None
+        return self._model_data
+
+    @property
+    def toc_candidates(self) -> Optional[List[Dict[str, str]]]:
+        """
+        model.json 中的目录标题候选（extract_titles_by_pattern 的结果）；
+        model.json 不存在、读取失败或为空时为 None
+        """
+        if self._toc_candidates is _UNSET:
+            if not self.model_source:
+                self._toc_candidates = None
+            elif self._stream_model and self._model_data is _UNSET:
+                self._toc_candidates = extract_titles_from_model_json(self.model_path)
+            else:
+                data = self.model_data
+                self._toc_candidates = extract_titles_by_pattern(data) if data else None
+        return self._toc_candidates
@@ -1,15 +1,18 @@
-import json
 import os
 import re
-from typing import Dict, List, Tuple, Any, Set
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Deque, Dict, Iterable, Iterator, List, Optional, Tuple, Any, Set
 
-import pandas as pd
+from toc_extract.export_excel import INT_COLUMNS
+from toc_extract.toc_manifest import TocManifest
+from utils.row_writers import MultiRowWriter, normalize_formats
+from utils.io import read_json
 
 
 def load_data(filepath: str) -> Any:
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return read_json(filepath)
     except Exception as e:
         print(f"读取文件失败 {filepath}: {e}")
         return []
@@ -53,6 +56,8 @@ def extract_titles_by_pattern(data: Any) -> List[Dict[str, str]]:
         if not isinstance(page, list):
             continue
         for block in page:
+            if not isinstance(block, dict):
+                continue
             raw_content = block.get('content')
             text = str(raw_content).strip() if raw_content is not None else ""
 
@@ -104,91 +109,244 @@ def calculate_parent_id(label: str) -> str:
     return "/" if '.' not in label else label.rsplit('.', 1)[0]
 
 
-def process_folder_to_excel(root_folder: str, output_excel_path: str) -> None:
+COLUMNS_ORDER: List[str] = [
+    "order_index",
+    "std_no",
+    "std_title",
+    "clause_id",
+    "clause_text",
+    "level",
+    "parent_id",
+    "model_json_path",
+]
+
+
+def iter_model_json_paths(root_folder: str) -> Iterator[str]:
+    """按 os.walk 顺序产出 root_folder 下所有 model*.json 路径"""
+    for dirpath, dirnames, filenames in os.walk(root_folder):
+        for filename in filenames:
+            low = filename.lower()
+            if "model" in low and low.endswith(".json"):
+                yield os.path.join(dirpath, filename)
+
+
+def extract_clean_items(full_path: str) -> Optional[List[Dict[str, str]]]:
+    """单个 model json：读取 + 抽取 + 清洗；读取失败或为空返回 None"""
+    data = load_data(full_path)
+    if not data:
+        return None
+    return clean_toc_list(extract_titles_by_pattern(data))
+
+
+def extract_clean_items_safe(full_path: str) -> Optional[List[Dict[str, str]]]:
+    """同 extract_clean_items，但单个文件的任何异常只打印并返回 None，不影响其余文件"""
+    try:
+        return extract_clean_items(full_path)
+    except Exception as e:
+        print(f"解析文件失败 {full_path}: {e}")
+        return None
+
+
+def _extract_chunk(paths: List[str]) -> List[Optional[List[Dict[str, str]]]]:
+    """进程池任务：一次处理一批文件，减少进程间往返"""
+    return [extract_clean_items_safe(p) for p in paths]
+
+
+def iter_extracted(
+    paths: Iterable[str],
+    workers: int = 1,
+    chunk_size: int = 16,
+) -> Iterator[Tuple[str, Optional[List[Dict[str, str]]]]]:
+    """
+    按输入顺序产出 (path, clean_items)。
+    workers>1 时用进程池并行解析：每 chunk_size 个文件一个任务，
+    同时在途的任务不超过 workers*2 个，结果按提交顺序取回（内存有界、顺序确定）。
+    """
+    if workers <= 1:
+        for p in paths:
+            yield p, extract_clean_items_safe(p)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        pending: Deque[Tuple[List[str], Any]] = deque()
+        chunk: List[str] = []
+
+        def _submit(batch: List[str]) -> None:
+            pending.append((batch, ex.submit(_extract_chunk, batch)))
+
+        for p in paths:
+            chunk.append(p)
+            if len(chunk) >= chunk_size:
+                _submit(chunk)
+                chunk = []
+                while len(pending) >= workers * 2:
+                    batch, fut = pending.popleft()
+                    yield from zip(batch, fut.result())
+        if chunk:
+            _submit(chunk)
+        while pending:
+            batch, fut = pending.popleft()
+            yield from zip(batch, fut.result())
+
+
+def iter_toc_rows(
+    root_folder: str,
+    workers: int = 1,
+    chunk_size: int = 16,
+    manifest: Optional[TocManifest] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    遍历 root_folder 下的 model*.json，按文件顺序产出 Excel 行：
+      1) std_no 输出为 “标题号 + 标题”（例如: "1.2 范围"）
+      2) 去重：同一个 root_folder 内 (clause_id, clause_text) 只输出第一次出现
+    并行（workers>1）时结果按文件顺序合并，去重结果与串行完全一致。
+    manifest 非空时增量：只解析新增/变化的文件，其余复用清单里缓存的条目。
+    """
+    seen: Set[Tuple[str, str]] = set()  # (clause_id, clause_text) 去重
+    total = 0
+
+    paths = iter_model_json_paths(root_folder)
+    if manifest is None:
+        extracted = iter_extracted(paths, workers, chunk_size)
+    else:
+        extracted = manifest.iter_items(
+            root_folder, paths, lambda stale: iter_extracted(stale, workers, chunk_size)
+        )
+
+    for full_path, clean_items in extracted:
+        print(f"处理中: {full_path}")
+        if clean_items is None:
+            continue
+
+        # 原有：从文件夹名提取（保留列 std_title 以便溯源）
+        _std_no_from_folder, std_title = extract_std_info_from_path(os.path.dirname(full_path))
+
+        if not clean_items:
+            print("  - 警告: 未识别到有效目录")
+            continue
+
+        for index, item in enumerate(clean_items):
+            clause_id = item["label"]
+            clause_text = item["title"]
+
+            # 2) 去重：避免重复输出
+            key = (clause_id, clause_text)
+            if key in seen:
+                continue
+            seen.add(key)
+
+            level = clause_id.count(".") + 1
+            parent_id = calculate_parent_id(clause_id)
+
+            # 1) std_no 输出为 “标题号+标题”
+            std_no_out = f"{clause_id} {clause_text}".strip()
+
+            total += 1
+            yield {
+                "order_index": index + 1,
+                "std_no": std_no_out,
+                "std_title": std_title,
+                "clause_id": clause_id,
+                "clause_text": clause_text,
+                "level": level,
+                "parent_id": parent_id,
+                "model_json_path": full_path,
+            }
+
+        print(f"  - 已提取 {len(clean_items)} 条记录（去重后累计 {total}）")
+
+
+def _discard_outputs(writer: MultiRowWriter) -> None:
+    try:
+        writer.close()
+    except Exception as e:
+        print(f"关闭输出文件失败: {e}")
+    for path in writer.paths.values():
+        if os.path.exists(path):
+            os.remove(path)
+            print(f"已删除不完整的输出: {path}")
+
+
+def process_folder_to_excel(
+    root_folder: str,
+    output_excel_path: str,
+    workers: int = 1,
+    chunk_size: int = 16,
+    manifest_path: str = "",
+    formats: Iterable[str] = ("xlsx",),
+) -> None:
     """
     需求适配：
       1) Excel 的 std_no 输出为 “标题号 + 标题”（例如: "1.2 范围"）
       2) 去重：同一个 root_folder 内避免重复输出
+    workers>1 时用进程池并行解析 model json；行边产生边写入（utils.row_writers），内存不随行数增长。
+    formats：输出格式，可多选 xlsx / csv / jsonl / parquet，文件名为 output_excel_path 换扩展名；
+    超过 Excel 行数上限的全库目录请用 csv / jsonl / parquet。
+    manifest_path 非空时按清单增量重建（只解析新增/变化的 model json，已删除的不再输出）。
+    注意：Windows 下用 workers>1 时，调用方脚本需放在 if __name__ == "__main__": 下。
     """
     print(f"正在遍历文件夹: {root_folder}")
+    formats = normalize_formats(formats)
 
-    rows: List[Dict[str, Any]] = []
-    seen: Set[Tuple[str, str]] = set()  # (clause_id, clause_text) 去重
-
-    for dirpath, dirnames, filenames in os.walk(root_folder):
-        for filename in filenames:
-            low = filename.lower()
-            if "model" in low and low.endswith(".json"):
-                full_path = os.path.join(dirpath, filename)
-                print(f"处理中: {full_path}")
-
-                # 原有：从文件夹名提取（保留列 std_title 以便溯源）
-                _std_no_from_folder, std_title = extract_std_info_from_path(dirpath)
-
-                data = load_data(full_path)
-                if not data:
-                    continue
-
-                raw_items = extract_titles_by_pattern(data)
-                clean_items = clean_toc_list(raw_items)
-
-                if not clean_items:
-                    print("  - 警告: 未识别到有效目录")
-                    continue
-
-                for index, item in enumerate(clean_items):
-                    clause_id = item["label"]
-                    clause_text = item["title"]
-
-                    # 2) 去重：避免重复输出
-                    key = (clause_id, clause_text)
-                    if key in seen:
-                        continue
-                    seen.add(key)
-
-                    level = clause_id.count(".") + 1
-                    parent_id = calculate_parent_id(clause_id)
-
-                    # 1) std_no 输出为 “标题号+标题”
-                    std_no_out = f"{clause_id} {clause_text}".strip()
-
-                    rows.append(
-                        {
-                            "order_index": index + 1,
-                            "std_no": std_no_out,
-                            "std_title": std_title,
-                            "clause_id": clause_id,
-                            "clause_text": clause_text,
-                            "level": level,
-                            "parent_id": parent_id,
-                            "model_json_path": full_path,
-                        }
-                    )
-
-                print(f"  - 已提取 {len(clean_items)} 条记录（去重后累计 {len(rows)}）")
-
-    if not rows:
+    manifest = TocManifest(manifest_path) if manifest_path else None
+    writer: Optional[MultiRowWriter] = None
+    try:
+        for row in iter_toc_rows(root_folder, workers=workers, chunk_size=chunk_size, manifest=manifest):
+            if writer is None:
+                writer = MultiRowWriter(output_excel_path, COLUMNS_ORDER, formats, int_columns=INT_COLUMNS)
+            writer.write_row(row)
+    except BaseException:
+        # 中途失败：关闭并删除不完整的输出文件，不留下半截结果
+        if writer is not None:
+            _discard_outputs(writer)
+        raise
+    finally:
+        if manifest is not None:
+            st = manifest.last_stats
+            if st:
+                print(
+                    f"增量清单: 共 {st['files']} 个, 复用 {st['reused']}, 仅 mtime 变化 {st['rehashed']}, "
+                    f"重新解析 {st['parsed']}, 已删除 {st['removed']}"
+                )
+            manifest.close()
+
+    if writer is None:
         print("未提取到任何数据。")
         return
 
-    print(f"\n正在保存结果到: {output_excel_path} ...")
-    os.makedirs(os.path.dirname(output_excel_path) or ".", exist_ok=True)
-
-    df = pd.DataFrame(rows)
-    columns_order = [
-        "order_index",
-        "std_no",
-        "std_title",
-        "clause_id",
-        "clause_text",
-        "level",
-        "parent_id",
-        "model_json_path",
-    ]
-    df = df[columns_order]
+    print(f"\n正在保存结果到: {', '.join(writer.paths.values())} ...（rows={writer.rows_written}）")
 
     try:
-        df.to_excel(output_excel_path, index=False)
+        writer.close()
         print("全部完成！")
     except Exception as e:
-        print(f"保存 Excel 失败: {e} (请检查文件是否被占用)")
\ No newline at end of file
+        print(f"保存 Excel 失败: {e} (请检查文件是否被占用)")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+
+    ap = argparse.ArgumentParser(description="遍历目录下的 model*.json，导出全库目录 Excel")
+    ap.add_argument("root_folder")
+    ap.add_argument("output_excel_path")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="解析进程数（1 为串行）")
+    ap.add_argument("--chunk-size", type=int, default=16, help="每个进程任务处理的文件数")
+    ap.add_argument("--manifest", default="", help="增量清单 SQLite 路径（为空则全量解析）")
+    ap.add_argument(
+        "--formats", nargs="*", default=["xlsx"], help="输出格式，可多选：xlsx csv jsonl parquet（parquet 需要 pyarrow）"
+    )
+    args = ap.parse_args(argv)
+
+    process_folder_to_excel(
+        args.root_folder,
+        args.output_excel_path,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        manifest_path=args.manifest,
+        formats=args.formats,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from utils.files import file_sha256
+
+Items = Optional[List[Dict[str, str]]]
+
+
+def _encode_items(items: Items) -> Optional[bytes]:
+    if items is None:
+        return None
+    return zlib.compress(json.dumps(items, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+
+def _decode_items(blob: Optional[bytes]) -> Items:
+    if blob is None:
+        return None
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+
+class TocManifest:
+    """
+    全库目录（pe2）增量重建用的清单（SQLite）：
+    - 每个 model json 记录 path / size / mtime_ns / sha256，以及抽取清洗后的条目（zlib 压缩的 JSON）
+    - 再次运行时 size+mtime 未变的直接复用；变了再算 sha256，内容相同只刷新 stat，不同才重新解析
+    - 已删除的文件从清单中移除
+    跨文件的 (clause_id, clause_text) 去重不缓存，每次按文件顺序重新合并，结果与全量解析一致。
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS model_files (
+                    path       TEXT PRIMARY KEY,
+                    size       INTEGER NOT NULL,
+                    mtime_ns   INTEGER NOT NULL,
+                    sha256     TEXT NOT NULL,
+                    items      BLOB,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+        # 最近一次 iter_items 的统计：files / reused / rehashed / parsed / removed
+        self.last_stats: Dict[str, int] = {}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _get(self, key: str) -> Optional[sqlite3.Row]:
+        with self._lock:
+            return self._conn.execute("SELECT * FROM model_files WHERE path = ?", (key,)).fetchone()
+
+    def _put(self, key: str, st: os.stat_result, sha256: str, items: Items) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO model_files (path, size, mtime_ns, sha256, items, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (key, st.st_size, st.st_mtime_ns, sha256, _encode_items(items), time.time()),
+            )
+
+    def _touch(self, key: str, st: os.stat_result) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE model_files SET size = ?, mtime_ns = ?, updated_at = ? WHERE path = ?",
+                (st.st_size, st.st_mtime_ns, time.time(), key),
+            )
+
+    def _prune(self, root_folder: str, keep: set) -> int:
+        """删除 root_folder 下、本次已不存在的文件记录"""
+        prefix = os.path.join(os.path.abspath(root_folder), "")
+        with self._lock:
+            known = [r[0] for r in self._conn.execute("SELECT path FROM model_files")]
+        gone = [k for k in known if k.startswith(prefix) and k not in keep]
+        if gone:
+            with self._lock, self._conn:
+                self._conn.executemany("DELETE FROM model_files WHERE path = ?", [(k,) for k in gone])
+        return len(gone)
+
+    def iter_items(
+        self,
+        root_folder: str,
+        paths: Iterable[str],
+        extract: Callable[[List[str]], Iterable[Tuple[str, Items]]],
+    ) -> Iterator[Tuple[str, Items]]:
+        """
+        【输入】
+          - root_folder (str): 本次遍历的根目录（只清理该目录下已删除文件的记录）
+          - paths (Iterable[str]): 当前全部 model json 路径（决定输出顺序）
+          - extract: 对“新增/变化”的路径列表做解析，产出 (path, clean_items)，如 pe2.iter_extracted
+
+        【输出】
+          - Iterator[(path, clean_items)]：按 paths 顺序；clean_items 为 None 表示读取失败或为空
+        """
+        paths = list(paths)
+        keys = {p: os.path.abspath(p) for p in paths}
+        stats = {"files": len(paths), "reused": 0, "rehashed": 0, "parsed": 0, "removed": 0}
+
+        stale: List[str] = []
+        stat_of: Dict[str, os.stat_result] = {}
+        sha_of: Dict[str, str] = {}
+        for p in paths:
+            st = os.stat(p)
+            stat_of[p] = st
+            row = self._get(keys[p])
+            if row is not None and row["size"] == st.st_size and row["mtime_ns"] == st.st_mtime_ns:
+                stats["reused"] += 1
+                continue
+            sha = file_sha256(p)
+            if row is not None and row["sha256"] == sha:
+                # 只是 mtime 变了（复制/touch），内容没变
+                self._touch(keys[p], st)
+                stats["rehashed"] += 1
+                continue
+            sha_of[p] = sha
+            stale.append(p)
+
+        for p, items in extract(stale):
+            self._put(keys[p], stat_of[p], sha_of[p], items)
+            stats["parsed"] += 1
+
+        stats["removed"] = self._prune(root_folder, set(keys.values()))
+        self.last_stats = stats
+
+        for p in paths:
+            row = self._get(keys[p])
+            yield p, _decode_items(row["items"]) if row is not None else None
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List
+
+# 作为“图片文件”统计的扩展名（toc_results.xlsx 的 image 列）
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".bmp", ".gif", ".webp")
+
+
+def _is_content_list(low_name: str) -> bool:
+    return low_name.endswith(".json") and "content_list" in low_name
+
+
+def _is_model_json(low_name: str) -> bool:
+    return low_name.endswith(".json") and "model" in low_name and "model_list" not in low_name
+
+
+@dataclass
+class ArtifactIndex:
+    """
+    一个文档解压目录（或结果 zip）里后处理要用到的文件清单，只扫描一次：
+    - content_lists：*content_list*.json
+    - model_jsons：文件名含 model 的 json（排除 model_list）
+    - images：图片文件
+    都是相对 root 的 "/" 分隔路径，顺序与 os.walk 自顶向下遍历一致（来自 zip 清单时为 zip 内顺序）。
+    root 可在输出目录改名后直接改写，相对路径不受影响。
+    """
+
+    root: str
+    files: List[str] = field(default_factory=list)
+    content_lists: List[str] = field(default_factory=list)
+    model_jsons: List[str] = field(default_factory=list)
+    images: List[str] = field(default_factory=list)
+
+    @classmethod
+    def from_names(cls, root: str, names: Iterable[str]) -> "ArtifactIndex":
+        """
+        【输入】
+          - root (str): 解压目录（zip 时可为 zip 路径，仅用于拼路径/展示）
+          - names (Iterable[str]): 相对 root 的文件路径（"/" 或系统分隔符均可）
+
+        【输出】
+          - ArtifactIndex
+        """
+        idx = cls(root=root)
+        for name in names:
+            rel = name.replace("\\", "/")
+            low = rel.rsplit("/", 1)[-1].lower()
+            idx.files.append(rel)
+            if _is_content_list(low):
+                idx.content_lists.append(rel)
+            if _is_model_json(low):
+                idx.model_jsons.append(rel)
+            if low.endswith(IMAGE_EXTS):
+                idx.images.append(rel)
+        return idx
+
+    @classmethod
+    def scan(cls, root: str) -> "ArtifactIndex":
+        """
+        【功能】
+          对 root 做一次 os.scandir 递归遍历（目录内先文件、后子目录，与 os.walk 顺序一致）。
+          root 不存在时返回空索引。
+        """
+        names: List[str] = []
+
+        def _walk(dirpath: str, prefix: str) -> None:
+            try:
+                entries = list(os.scandir(dirpath))
+            except OSError:
+                return
+            subdirs = []
+            for e in entries:
+                if e.is_dir(follow_symlinks=False):
+                    subdirs.append(e)
+                elif e.is_file():
+                    names.append(prefix + e.name)
+            for d in subdirs:
+                _walk(d.path, prefix + d.name + "/")
+
+        _walk(root, "")
+        return cls.from_names(root, names)
+
+    @classmethod
+    def from_manifest(cls, root: str, manifest: List[Dict[str, Any]]) -> "ArtifactIndex":
+        """由 downloader.unzip 返回的清单构建，不再访问磁盘"""
+        return cls.from_names(root, (m["name"] for m in manifest))
+
+    def path(self, rel: str) -> str:
+        """相对路径 -> root 下的完整路径"""
+        return os.path.join(self.root, *rel.split("/"))
+
+    def content_list_paths(self) -> List[str]:
+        return [self.path(rel) for rel in self.content_lists]
+
+    def model_json_path(self) -> str:
+        """第一个 model*.json 的完整路径；没有时返回空串"""
+        return self.path(self.model_jsons[0]) if self.model_jsons else ""
+
+    def image_names(self, subdir: str = "images") -> List[str]:
+        """subdir 目录下（不递归）的图片文件名"""
+        prefix = subdir.rstrip("/") + "/"
+        return [rel[len(prefix):] for rel in self.images if rel.startswith(prefix) and "/" not in rel[len(prefix):]]
@@ -1,9 +1,22 @@
 from __future__ import annotations
 
+import io
 import os
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
 
-import pandas as pd
+try:  # 可选依赖：装了 xlsxwriter 就用它的 constant_memory 模式（更快）
+    import xlsxwriter as _xlsxwriter
+except ImportError:  # pragma: no cover
+    _xlsxwriter = None
+
+# 默认的 xlsx 写入后端："xlsxwriter" / "openpyxl"（write_only）
+EXCEL_BACKEND = "xlsxwriter" if _xlsxwriter is not None else "openpyxl"
+
+# 单个工作表最多 1048576 行（含表头）
+EXCEL_MAX_ROWS = 1048576
+
+# 与 pandas.DataFrame.to_excel 的表头样式一致：加粗、细边框、水平居中、顶端对齐
+_HEADER_STYLE = {"bold": True, "border": 1, "align": "center", "valign": "top"}
 
 
 def append_row(rows: List[Dict[str, Any]], row: Dict[str, Any]) -> None:
@@ -19,36 +32,226 @@ def append_row(rows: List[Dict[str, Any]], row: Dict[str, Any]) -> None:
     rows.append(row)
 
 
+class XlsxRowWriter:
+    """
+    流式写 xlsx（单个工作表）：行边产生边写入磁盘，内存不随行数增长。
+    - backend="xlsxwriter"：xlsxwriter constant_memory 模式
+    - backend="openpyxl"：openpyxl write_only 模式
+    - backend="auto"：装了 xlsxwriter 用它，否则 openpyxl
+    行必须按顺序写；行高、图片要在写该行之前/同时给出。
+    用法：
+        with XlsxRowWriter(path, columns, widths={"A": 12}) as w:
+            for row in rows:
+                w.write_row(row)
+    """
+
+    def __init__(
+        self,
+        path: str,
+        columns: Sequence[str],
+        *,
+        sheet_name: str = "Sheet1",
+        widths: Optional[Mapping[str, float]] = None,
+        header_style: bool = True,
+        backend: str = "auto",
+    ):
+        if backend == "auto":
+            backend = EXCEL_BACKEND
+        if backend not in ("xlsxwriter", "openpyxl"):
+            raise ValueError(f"未知的 Excel 写入后端：{backend}")
+        if backend == "xlsxwriter" and _xlsxwriter is None:
+            raise ImportError("backend='xlsxwriter' 需要先安装 xlsxwriter")
+
+        self.path = path
+        self.columns = list(columns)
+        self.backend = backend
+        self.rows_written = 0  # 不含表头
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        if backend == "xlsxwriter":
+            # strings_to_urls=False：与 openpyxl/pandas 一致，不把看起来像 URL 的字符串转成超链接
+            self._wb = _xlsxwriter.Workbook(path, {"constant_memory": True, "strings_to_urls": False})
+            self._ws = self._wb.add_worksheet(sheet_name)
+            self._header_fmt = self._wb.add_format(_HEADER_STYLE) if header_style else None
+        else:
+            from openpyxl import Workbook
+
+            self._wb = Workbook(write_only=True)
+            self._ws = self._wb.create_sheet(sheet_name)
+            self._header_fmt = None
+
+        for letter, width in (widths or {}).items():
+            self._set_width(letter, width)
+        self._row_idx = 1  # 下一行的行号（1 起）
+        self._write_header(header_style)
+
+    def __enter__(self) -> "XlsxRowWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def _set_width(self, letter: str, width: float) -> None:
+        if self.backend == "xlsxwriter":
+            self._ws.set_column(f"{letter}:{letter}", width)
+        else:
+            self._ws.column_dimensions[letter].width = width
+
+    def _write_header(self, header_style: bool) -> None:
+        if self.backend == "xlsxwriter":
+            self._ws.write_row(0, 0, self.columns, self._header_fmt)
+        elif header_style:
+            from openpyxl.cell import WriteOnlyCell
+            from openpyxl.styles import Alignment, Border, Font, Side
+
+            thin = Side(style="thin")
+            font = Font(bold=True)
+            border = Border(left=thin, right=thin, top=thin, bottom=thin)
+            align = Alignment(horizontal="center", vertical="top")
+            cells = []
+            for name in self.columns:
+                c = WriteOnlyCell(self._ws, value=name)
+                c.font, c.border, c.alignment = font, border, align
+                cells.append(c)
+            self._ws.append(cells)
+        else:
+            self._ws.append(self.columns)
+        self._row_idx = 2
+
+    @property
+    def next_row(self) -> int:
+        """下一次 write_row 写入的 Excel 行号（1 起，表头为第 1 行）"""
+        return self._row_idx
+
+    def write_values(self, values: Sequence[Any], height: Optional[float] = None) -> int:
+        """
+        按 columns 顺序写一行值；None 写为空单元格。height 为行高（points）。
+        【输出】
+          - int: 写入的 Excel 行号
+        """
+        r = self._row_idx
+        if r > EXCEL_MAX_ROWS:
+            raise ValueError(f"超过 Excel 单表行数上限 {EXCEL_MAX_ROWS}：{self.path}（请改用 csv/jsonl/parquet 输出）")
+        if self.backend == "xlsxwriter":
+            if height is not None:
+                self._ws.set_row(r - 1, height)
+            self._ws.write_row(r - 1, 0, list(values))
+        else:
+            if height is not None:
+                self._ws.row_dimensions[r].height = height
+            self._ws.append(list(values))
+        self._row_idx += 1
+        self.rows_written += 1
+        return r
+
+    def write_row(self, row: Mapping[str, Any], height: Optional[float] = None) -> int:
+        """按 columns 取值写一行 dict；缺失的列写为空"""
+        return self.write_values([row.get(c) for c in self.columns], height=height)
+
+    def add_image(self, data: bytes, row: int, column: str, width: int, height: int) -> None:
+        """
+        在 column+row（如 "G", 5）处嵌入图片，显示为 width x height 像素。
+        必须在写该行之前或写该行时调用（xlsxwriter constant_memory 不能回写已完成的行）。
+        """
+        if self.backend == "xlsxwriter":
+            from PIL import Image as PILImage
+
+            with PILImage.open(io.BytesIO(data)) as im:
+                ow, oh = im.size
+                dpi = im.info.get("dpi") or (96, 96)
+            # xlsxwriter 按图片 DPI 换算显示尺寸：显示宽 = 原宽 * 96/dpi * x_scale
+            x_dpi = float(dpi[0] or 96)
+            y_dpi = float(dpi[1] or 96)
+            self._ws.insert_image(
+                f"{column}{row}",
+                "image",
+                {
+                    "image_data": io.BytesIO(data),
+                    "x_scale": width / (ow * 96.0 / x_dpi),
+                    "y_scale": height / (oh * 96.0 / y_dpi),
+                },
+            )
+        else:
+            from openpyxl.drawing.image import Image as XLImage
+
+            xl_img = XLImage(io.BytesIO(data))
+            xl_img.width = width
+            xl_img.height = height
+            self._ws.add_image(xl_img, f"{column}{row}")
+
+    def close(self) -> None:
+        if self._wb is None:
+            return
+        wb, self._wb = self._wb, None
+        if self.backend == "xlsxwriter":
+            wb.close()
+        else:
+            wb.save(self.path)
+
+
+def write_rows_to_xlsx(
+    rows: Iterable[Mapping[str, Any]],
+    output_excel_path: str,
+    columns: Sequence[str],
+    *,
+    sheet_name: str = "Sheet1",
+    widths: Optional[Mapping[str, float]] = None,
+    backend: str = "auto",
+) -> int:
+    """
+    【输入】
+      - rows (Iterable[Mapping]): 行迭代器（可为生成器，逐行写出，不整体放进内存）
+      - output_excel_path (str): 输出 xlsx 路径
+      - columns (Sequence[str]): 列顺序；行里缺的列写为空，多余的列忽略
+
+    【输出】
+      - int: 写入的行数（不含表头）
+    """
+    with XlsxRowWriter(output_excel_path, columns, sheet_name=sheet_name, widths=widths, backend=backend) as w:
+        for row in rows:
+            w.write_row(row)
+        return w.rows_written
+
+
+def peek_rows(rows: Iterable[Mapping[str, Any]]) -> Tuple[Optional[Mapping[str, Any]], Iterator[Mapping[str, Any]]]:
+    """取出第一行（用于判空/推断列），返回 (第一行或 None, 包含第一行的完整迭代器)"""
+    it = iter(rows)
+    for first in it:
+        def _chain() -> Iterator[Mapping[str, Any]]:
+            yield first
+            yield from it
+
+        return first, _chain()
+    return None, iter(())
+
+
 def save_rows_to_excel(
-    rows: List[Dict[str, Any]],
+    rows: Iterable[Dict[str, Any]],
     output_excel_path: str,
     columns: List[str] | None = None,
 ) -> Tuple[bool, str]:
     """
-    将 rows 写入 Excel。
+    将 rows 写入 Excel（流式，见 XlsxRowWriter）。
 
     输入:
-      - rows: 每个元素是一行 dict
+      - rows: 每个元素是一行 dict；可以是 list 或生成器
       - output_excel_path: 输出 xlsx 路径
-      - columns: 可选，指定列顺序；不传则用 DataFrame 自动推断
+      - columns: 可选，指定列顺序；不传时 list 取全部行的键（按首次出现顺序），生成器取第一行的键
 
     输出:
       - (ok, msg)
     """
-    if not rows:
-        return False, "rows 为空，未写入 Excel"
+    if columns is None and isinstance(rows, list):
+        columns = list(dict.fromkeys(k for r in rows for k in r))
 
-    out_dir = os.path.dirname(output_excel_path)
-    if out_dir:
-        os.makedirs(out_dir, exist_ok=True)
-
-    df = pd.DataFrame(rows)
-    if columns:
-        # 若缺列会自动补 NaN；若多列会被忽略
-        df = df.reindex(columns=columns)
+    first, rows = peek_rows(rows)
+    if first is None:
+        return False, "rows 为空，未写入 Excel"
+    if not columns:
+        columns = list(first)
 
     try:
-        df.to_excel(output_excel_path, index=False)
-        return True, f"已写入 Excel: {output_excel_path}（rows={len(rows)}）"
+        n = write_rows_to_xlsx(rows, output_excel_path, columns)
+        return True, f"已写入 Excel: {output_excel_path}（rows={n}）"
     except Exception as e:
-        return False, f"写入 Excel 失败: {e}"
\ No newline at end of file
+        return False, f"写入 Excel 失败: {e}"
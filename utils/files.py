@@ -1,10 +1,23 @@
 from __future__ import annotations
 
+import hashlib
 import os
 import shutil
 from typing import Tuple
 
 
+def file_sha256(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """流式计算文件 sha256（不整体读入内存）"""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
+
+
 def copy_file_to_dir(src_path: str, dst_dir: str, overwrite: bool = True) -> Tuple[bool, str, str]:
     """
     将 src_path 复制到 dst_dir 下，返回 (ok, msg, dst_path)。
@@ -1,7 +1,58 @@
+import codecs
 import json
+import mmap
 import os
 from pathlib import Path
-from typing import Iterable, List, Optional, Any
+from typing import Iterable, Iterator, List, Optional, Any
+
+try:  # 可选依赖：装了 orjson 就用它解析（更快、中间对象更少）
+    import orjson as _orjson
+except ImportError:  # pragma: no cover
+    _orjson = None
+
+# 当前使用的 JSON 解析后端："orjson" / "json"
+JSON_BACKEND = "orjson" if _orjson is not None else "json"
+
+# 不小于该大小的文件用 mmap 交给 orjson，避免再复制一份 bytes
+MMAP_MIN_BYTES = 4 * 1024 * 1024
+
+
+def loads_json(data: Any) -> Any:
+    """
+    【输入】
+      - data (bytes / bytearray / memoryview / str): JSON 文本
+
+    【输出】
+      - Any: 解析结果。优先用 orjson；orjson 不接受的内容（如 NaN、超 64 位整数）回退到标准库 json
+    """
+    if _orjson is not None:
+        try:
+            return _orjson.loads(data)
+        except _orjson.JSONDecodeError:
+            pass
+    if isinstance(data, memoryview):
+        data = data.tobytes()
+    return json.loads(data)
+
+
+def read_json(path: str) -> Any:
+    """
+    【功能】
+      以二进制读取并解析 JSON 文件；大文件且有 orjson 时走 mmap。失败直接抛异常。
+
+    【输入】
+      - path (str): JSON 文件路径
+
+    【输出】
+      - Any: 解析结果
+    """
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if _orjson is not None and size >= MMAP_MIN_BYTES:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                with memoryview(mm) as view:
+                    return loads_json(view)
+        return loads_json(f.read())
 
 
 def load_json(path: str, default: Any = None) -> Any:
@@ -11,16 +62,116 @@ def load_json(path: str, default: Any = None) -> Any:
       - default (Any): 当读取/解析失败时返回的默认值（例如 None、[]、{}）
 
     【输出】
-      - Any: 解析成功则返回 json.load(...) 的结果（可能是 dict/list/str/int 等）
+      - Any: 解析成功则返回解析结果（可能是 dict/list/str/int 等；后端见 JSON_BACKEND）
              解析失败则返回 default
     """
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
+        return read_json(path)
     except Exception:
         return default
 
 
+class _JsonTextStream:
+    """按块读取 JSON 文本，配合 JSONDecoder.raw_decode 逐个解析数组元素"""
+
+    def __init__(self, f, chunk_size: int):
+        self._f = f
+        self._chunk_size = chunk_size
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._raw = json.JSONDecoder()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, min_chunk: int = 0) -> bool:
+        if self.eof:
+            return False
+        chunk = self._f.read(max(self._chunk_size, min_chunk))
+        self.eof = not chunk
+        self.buf = self.buf[self.pos:] + self._decoder.decode(chunk, final=self.eof)
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """跳过空白，返回下一个字符；到文件尾返回空串"""
+        while True:
+            n = len(self.buf)
+            while self.pos < n and self.buf[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < n:
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, ch: str) -> None:
+        got = self.peek()
+        if got != ch:
+            raise ValueError(f"JSON 流格式错误：期望 {ch!r}，实际 {got!r}")
+        self.pos += 1
+
+    def value(self) -> Any:
+        self.peek()
+        want = 0
+        while True:
+            try:
+                obj, end = self._raw.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+                want = max(want * 2, self._chunk_size)
+                self._fill(want)
+                continue
+            if end == len(self.buf) and not self.eof:
+                # 数字等值可能被块边界截断，读到下一个分隔符再确认
+                want = max(want * 2, self._chunk_size)
+                self._fill(want)
+                continue
+            self.pos = end
+            return obj
+
+
+def _iter_array(stream: _JsonTextStream, depth: int) -> Iterator[Any]:
+    stream.expect("[")
+    if stream.peek() == "]":
+        stream.pos += 1
+        return
+    while True:
+        if depth > 1 and stream.peek() == "[":
+            sub = _iter_array(stream, depth - 1)
+            yield sub
+            for _ in sub:  # 调用方未消费完的子数组在这里跳过
+                pass
+        else:
+            yield stream.value()
+        ch = stream.peek()
+        stream.pos += 1
+        if ch == "]":
+            return
+        if ch != ",":
+            raise ValueError(f"JSON 流格式错误：期望 ',' 或 ']'，实际 {ch!r}")
+
+
+def iter_json_array(path: str, depth: int = 1, chunk_size: int = 1024 * 1024) -> Iterator[Any]:
+    """
+    【功能】
+      流式遍历“顶层为数组”的 JSON 文件，逐个产出元素，不构建整棵树。
+
+    【输入】
+      - path (str): JSON 文件路径（顶层必须是数组，否则抛 ValueError）
+      - depth (int):
+          * 1：逐个产出顶层元素（如 model.json 的每一页）
+          * 2：顶层元素本身是数组时，产出的是它的元素迭代器（逐块产出页内 block），
+               必须按顺序消费完再取下一个；不是数组的元素照常整体产出
+      - chunk_size (int): 每次读取的字节数
+
+    【输出】
+      - Iterator[Any]: 元素生成器；内存占用只与单个元素（depth=2 时为单个 block）大小有关
+    """
+    with open(path, "rb") as f:
+        stream = _JsonTextStream(f, chunk_size)
+        yield from _iter_array(stream, depth)
+
+
 def ensure_dir(path: str) -> str:
     """
     【输入】
@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import csv
+import json
+import os
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence
+
+from utils.excel import XlsxRowWriter
+
+try:  # 可选依赖：写 parquet 需要 pyarrow
+    import pyarrow as _pa
+    import pyarrow.parquet as _pq
+except ImportError:  # pragma: no cover
+    _pa = None
+    _pq = None
+
+# 支持的输出格式（文件扩展名）
+OUTPUT_FORMATS = ("xlsx", "csv", "jsonl", "parquet")
+
+
+def normalize_formats(formats: Iterable[str]) -> List[str]:
+    """
+    【输入】
+      - formats (Iterable[str]): 如 ("xlsx", "parquet") 或 "xlsx,csv"
+
+    【输出】
+      - List[str]: 去重、小写后的格式列表（保持顺序）；含未知格式或缺少依赖时抛错
+    """
+    if isinstance(formats, str):
+        formats = formats.split(",")
+    res: List[str] = []
+    for f in formats:
+        f = f.strip().lower().lstrip(".")
+        if not f or f in res:
+            continue
+        if f not in OUTPUT_FORMATS:
+            raise ValueError(f"未知的输出格式：{f}（可选：{', '.join(OUTPUT_FORMATS)}）")
+        if f == "parquet" and _pa is None:
+            raise ImportError("输出 parquet 需要先安装 pyarrow")
+        res.append(f)
+    return res
+
+
+def output_path(base_path: str, fmt: str) -> str:
+    """toc_results.xlsx / toc_results -> toc_results.<fmt>"""
+    root, ext = os.path.splitext(base_path)
+    if ext.lower().lstrip(".") not in OUTPUT_FORMATS:
+        root = base_path
+    return f"{root}.{fmt}"
+
+
+class CsvRowWriter:
+    """逐行写 CSV（UTF-8 带 BOM，Excel 直接打开不乱码）；None 写为空"""
+
+    def __init__(self, path: str, columns: Sequence[str]):
+        self.path = path
+        self.columns = list(columns)
+        self.rows_written = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._f = open(path, "w", encoding="utf-8-sig", newline="")
+        self._w = csv.writer(self._f)
+        self._w.writerow(self.columns)
+
+    def write_row(self, row: Mapping[str, Any]) -> None:
+        self._w.writerow(["" if row.get(c) is None else row.get(c) for c in self.columns])
+        self.rows_written += 1
+
+    def close(self) -> None:
+        if not self._f.closed:
+            self._f.close()
+
+
+class JsonlRowWriter:
+    """逐行写 JSON Lines（每行一个对象，键按 columns 顺序）"""
+
+    def __init__(self, path: str, columns: Sequence[str]):
+        self.path = path
+        self.columns = list(columns)
+        self.rows_written = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._f = open(path, "w", encoding="utf-8")
+
+    def write_row(self, row: Mapping[str, Any]) -> None:
+        obj = {c: row.get(c) for c in self.columns}
+        self._f.write(json.dumps(obj, ensure_ascii=False, default=str) + "\n")
+        self.rows_written += 1
+
+    def close(self) -> None:
+        if not self._f.closed:
+            self._f.close()
+
+
+class ParquetRowWriter:
+    """
+    分批写 Parquet（pyarrow）：int_columns 为 int64（空串/None 写为 null），其余列为 string。
+    每 batch_size 行写一个 row group，内存只随批大小增长。
+    """
+
+    def __init__(
+        self,
+        path: str,
+        columns: Sequence[str],
+        int_columns: Sequence[str] = (),
+        batch_size: int = 65536,
+    ):
+        if _pa is None:
+            raise ImportError("输出 parquet 需要先安装 pyarrow")
+        self.path = path
+        self.columns = list(columns)
+        self.rows_written = 0
+        self._int_columns = set(int_columns)
+        self._batch_size = max(1, batch_size)
+        self._schema = _pa.schema(
+            [(c, _pa.int64() if c in self._int_columns else _pa.string()) for c in self.columns]
+        )
+        self._buf: Dict[str, List[Any]] = {c: [] for c in self.columns}
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._writer = _pq.ParquetWriter(path, self._schema, compression="zstd")
+
+    def _cell(self, col: str, v: Any) -> Any:
+        if v is None:
+            return None
+        if col in self._int_columns:
+            return None if v == "" else int(v)
+        return v if isinstance(v, str) else str(v)
+
+    def write_row(self, row: Mapping[str, Any]) -> None:
+        for c in self.columns:
+            self._buf[c].append(self._cell(c, row.get(c)))
+        self.rows_written += 1
+        if len(self._buf[self.columns[0]]) >= self._batch_size:
+            self._flush()
+
+    def _flush(self) -> None:
+        if not self._buf[self.columns[0]]:
+            return
+        table = _pa.Table.from_pydict(self._buf, schema=self._schema)
+        self._writer.write_table(table)
+        self._buf = {c: [] for c in self.columns}
+
+    def close(self) -> None:
+        if self._writer is None:
+            return
+        self._flush()
+        self._writer.close()
+        self._writer = None
+
+
+def open_row_writer(
+    path: str,
+    fmt: str,
+    columns: Sequence[str],
+    int_columns: Sequence[str] = (),
+    xlsx_options: Optional[Mapping[str, Any]] = None,
+) -> Any:
+    """
+    【输入】
+      - path (str): 输出文件路径
+      - fmt (str): OUTPUT_FORMATS 之一
+      - columns (Sequence[str]): 列顺序
+      - int_columns (Sequence[str]): parquet 中按整数存的列
+      - xlsx_options: 透传给 XlsxRowWriter（sheet_name / widths / backend 等）
+
+    【输出】
+      - 行写入器：write_row(dict) / close() / rows_written / path
+    """
+    if fmt == "xlsx":
+        return XlsxRowWriter(path, columns, **dict(xlsx_options or {}))
+    if fmt == "csv":
+        return CsvRowWriter(path, columns)
+    if fmt == "jsonl":
+        return JsonlRowWriter(path, columns)
+    if fmt == "parquet":
+        return ParquetRowWriter(path, columns, int_columns=int_columns)
+    raise ValueError(f"未知的输出格式：{fmt}")
+
+
+class MultiRowWriter:
+    """
+    同一份行流一次写成多种格式：base_path 去掉扩展名后按格式拼路径（toc_results.xlsx / .parquet ...）。
+    """
+
+    def __init__(
+        self,
+        base_path: str,
+        columns: Sequence[str],
+        formats: Iterable[str] = ("xlsx",),
+        int_columns: Sequence[str] = (),
+        xlsx_options: Optional[Mapping[str, Any]] = None,
+    ):
+        self.formats = normalize_formats(formats)
+        if not self.formats:
+            raise ValueError("未指定任何输出格式")
+        self.paths: Dict[str, str] = {f: output_path(base_path, f) for f in self.formats}
+        self._writers: List[Any] = []
+        try:
+            for f in self.formats:
+                self._writers.append(open_row_writer(self.paths[f], f, columns, int_columns, xlsx_options))
+        except Exception:
+            self.close()
+            raise
+        self.rows_written = 0
+
+    def __enter__(self) -> "MultiRowWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def write_row(self, row: Mapping[str, Any]) -> None:
+        for w in self._writers:
+            w.write_row(row)
+        self.rows_written += 1
+
+    def close(self) -> None:
+        err: Optional[BaseException] = None
+        for w in self._writers:
+            try:
+                w.close()
+            except Exception as e:  # 一个格式写失败不影响其余格式落盘
+                err = err or e
+        self._writers = []
+        if err is not None:
+            raise err
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import io
+import os
+import shutil
+import threading
+import zipfile
+from typing import Any, List, Optional
+
+from utils.io import loads_json
+
+# zip 成员引用的分隔符：<zip_path>!/<member>，用于在行数据里表示“zip 里的某个文件”
+ZIP_MEMBER_SEP = "!/"
+
+
+def member_ref(zip_path: str, member: str) -> str:
+    """
+    【输入】
+      - zip_path (str): zip 文件路径
+      - member (str): zip 内成员名（如 images/xxx.jpg）
+
+    【输出】
+      - str: "<zip_path>!/<member>" 形式的引用字符串
+    """
+    return f"{zip_path}{ZIP_MEMBER_SEP}{member}"
+
+
+class ZipSource:
+    """
+    以随机访问方式读取 MinerU 结果 zip（不整体解压）：
+    - names()/find_members()：列成员（只读中央目录，一次）
+    - load_json()/read()：按需读取单个成员
+    - extract_member()：只把需要的成员写到磁盘（可改名）
+    读取操作加锁，可在线程池中共用同一个实例。
+    """
+
+    def __init__(self, zip_path: str):
+        self.zip_path = zip_path
+        self._zf = zipfile.ZipFile(zip_path, "r")
+        self._lock = threading.Lock()
+        # 只保留文件成员（跳过目录项），统一用 "/" 分隔
+        self._names: List[str] = [i.filename for i in self._zf.infolist() if not i.is_dir()]
+        self._name_set = set(self._names)
+
+    def __enter__(self) -> "ZipSource":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._zf.close()
+
+    def names(self) -> List[str]:
+        """
+        【输出】
+          - List[str]: zip 内所有文件成员名（保持 zip 内顺序）
+        """
+        return list(self._names)
+
+    def has(self, member: str) -> bool:
+        return member.replace("\\", "/") in self._name_set
+
+    def find_members(self, name_contains: str = "", endswith: str = ".json") -> List[str]:
+        """
+        【功能】
+          与 utils.io.find_jsons_in_dir 相同的过滤规则（按文件名，不区分大小写），但作用于 zip 内全部成员。
+
+        【输出】
+          - List[str]: 符合条件的成员名列表（保持 zip 内顺序）
+        """
+        res: List[str] = []
+        for name in self._names:
+            low = os.path.basename(name).lower()
+            if not low.endswith(endswith.lower()):
+                continue
+            if name_contains and (name_contains.lower() not in low):
+                continue
+            res.append(name)
+        return res
+
+    def read(self, member: str) -> bytes:
+        with self._lock:
+            return self._zf.read(member.replace("\\", "/"))
+
+    def read_or_none(self, member: str) -> Optional[bytes]:
+        try:
+            return self.read(member)
+        except (KeyError, zipfile.BadZipFile, OSError):
+            return None
+
+    def open_bytes(self, member: str) -> io.BytesIO:
+        return io.BytesIO(self.read(member))
+
+    def load_json(self, member: str, default: Any = None) -> Any:
+        """
+        【输出】
+          - Any: 解析成功返回 JSON 对象；成员不存在/解析失败返回 default
+                 （与 utils.io.load_json 同一解析路径：优先 orjson）
+        """
+        raw = self.read_or_none(member)
+        if raw is None:
+            return default
+        try:
+            return loads_json(raw)
+        except Exception:
+            return default
+
+    def extract_member(self, member: str, dst_path: str) -> str:
+        """
+        【功能】
+          把单个成员写到 dst_path（可与成员名不同，即“解压即改名”）。
+
+        【输出】
+          - str: dst_path
+        """
+        os.makedirs(os.path.dirname(dst_path) or ".", exist_ok=True)
+        with self._lock:
+            with self._zf.open(member.replace("\\", "/")) as src, open(dst_path, "wb") as dst:
+                shutil.copyfileobj(src, dst, 1024 * 256)
+        return dst_path
+
+    def ref(self, member: str) -> str:
+        return member_ref(self.zip_path, member)
+
+    def read_ref(self, ref: str) -> Optional[bytes]:
+        """
+        按 member_ref() 生成的引用读取成员字节；引用不属于本 zip 时返回 None。
+        可直接作为 image_excel 的 image_reader 使用。
+        """
+        prefix = self.zip_path + ZIP_MEMBER_SEP
+        if not ref.startswith(prefix):
+            return None
+        return self.read_or_none(ref[len(prefix):])